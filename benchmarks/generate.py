@@ -0,0 +1,93 @@
+"""
+Builds a synthetic Taskminal database with realistic tasks, time sessions and comments, for benchmarking.
+Task names and comments are assembled from fixtures/words.json. The same seed always builds the same database.
+
+Run it from the repository root:
+
+    python -m benchmarks.generate NAME [--tasks N] [--sessions N] [--comments N] [--seed N]
+"""
+import argparse
+import json
+import random
+import sys
+import time
+from contextlib import redirect_stdout
+from pathlib import Path
+from typing import Dict, Iterator, List, Tuple
+
+from taskminal.main import close_connection, connect_to_db, init_new_database
+
+FIXTURES = Path(__file__).with_name("fixtures") / "words.json"
+# Sessions are spread over this many days before now.
+HISTORY_DAYS = 3 * 365
+
+
+def _tasks(words: Dict[str, List[str]], rng: random.Random, count: int) -> Iterator[Tuple[int, str, int]]:
+    for id in range(1, count + 1):
+        yield (id, f"{rng.choice(words['verbs'])} {rng.choice(words['objects'])} #{id}", int(rng.random() < 0.6))
+
+
+def _sessions(rng: random.Random, tasks: int, per_task: float, now: int) -> Iterator[Tuple[int, int, int]]:
+    for id in range(1, tasks + 1):
+        start = now - rng.randrange(HISTORY_DAYS * 86400)
+        for _ in range(int(rng.expovariate(1 / per_task))):
+            # Most sessions last minutes, a few last hours and some cross midnight.
+            length = int(min(rng.lognormvariate(7.5, 1), 12 * 3600))
+            if start + length >= now:
+                break
+            yield (id, start, start + length)
+            start += length + int(rng.expovariate(1 / 86400))
+
+
+def _comments(words: Dict[str, List[str]], rng: random.Random, tasks: int, per_task: float) -> Iterator[Tuple[int, str]]:
+    for id in range(1, tasks + 1):
+        for _ in range(int(rng.expovariate(1 / per_task))):
+            yield (id, rng.choice(words["comments"]))
+
+
+def generate_database(name: str, tasks: int = 10000, sessions: float = 10, comments: float = 2, seed: int = 0) -> Dict[str, int]:
+    """
+    Creates (or overwrites) a database filled with synthetic data, inserted in a single transaction.
+
+    :param name str: Name of the database, created next to the program like any other. ".db" is appended if missing.
+    :param tasks int: Number of tasks.
+    :param sessions float: Average closed time sessions per task.
+    :param comments float: Average comments per task.
+    :param seed int: Seed of the random generator.
+    :rtype Dict[str, int]: Number of rows in each table.
+    """
+    if name.endswith(".db") is False:
+        name += ".db"
+    with open(FIXTURES, encoding="utf-8") as f:
+        words = json.load(f)
+    rng = random.Random(seed)
+    now = int(time.time())
+    with redirect_stdout(sys.stderr):
+        init_new_database(name, True)
+    conn = connect_to_db(name, "bulk")
+    conn.executemany("INSERT INTO tasks(id, name, completed) VALUES(?,?,?)", _tasks(words, rng, tasks))
+    conn.executemany("INSERT INTO time(task_id, start_date, end_date) VALUES(?,?,?)", _sessions(rng, tasks, sessions, now))
+    conn.executemany("INSERT INTO comments(task_id, body) VALUES(?,?)", _comments(words, rng, tasks, comments))
+    conn.commit()
+    conn.execute("ANALYZE")
+    counts = {table: conn.execute(f"SELECT COUNT(*) FROM {table}").fetchone()[0] for table in ("tasks", "time", "comments")}
+    close_connection(conn)
+    return counts
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("name", help="Name of the database to create. Overwrites it if it exists.")
+    parser.add_argument("--tasks", type=int, default=10000, help="Number of tasks. Defaults to 10000.")
+    parser.add_argument("--sessions", type=float, default=10, help="Average time sessions per task. Defaults to 10.")
+    parser.add_argument("--comments", type=float, default=2, help="Average comments per task. Defaults to 2.")
+    parser.add_argument("--seed", type=int, default=0, help="Seed of the random generator. Defaults to 0.")
+    args = parser.parse_args()
+    start = time.perf_counter()
+    counts = generate_database(args.name, args.tasks, args.sessions, args.comments, args.seed)
+    json.dump(dict(counts, seconds=time.perf_counter() - start), sys.stdout, indent=2)
+    print()
+
+
+if __name__ == "__main__":
+    main()
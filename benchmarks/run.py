@@ -0,0 +1,156 @@
+"""
+Times the main Taskminal operations against a synthetic database and prints the results as JSON,
+so runs can be compared across commits.
+
+Run it from the repository root:
+
+    python -m benchmarks.run [--tasks N] [--sessions N] [--comments N] [-r REPEAT] [-o OUTPUT]
+"""
+import argparse
+import json
+import os
+import platform
+import random
+import sqlite3
+import statistics
+import subprocess
+import sys
+import time
+from contextlib import redirect_stdout
+from pathlib import Path
+from typing import Callable, Dict, List
+
+import taskminal.main
+from taskminal.main import (add_comment, close_connection, connect_to_db, get_time, hour_histogram, month_report_rows, month_totals,
+                            print_task_list, search, start_task, stop_task)
+from taskminal.report import Report
+from benchmarks.generate import generate_database
+
+DATABASE = "bench_suite.db"
+# Operations on single tasks are run this many times per sample, on random tasks.
+SINGLE_OPERATIONS = 200
+
+
+def _list(conn: sqlite3.Connection, rng: random.Random, tasks: int):
+    print_task_list(conn)
+
+
+def _report(conn: sqlite3.Connection, rng: random.Random, tasks: int):
+    with open(os.devnull, "w") as f:
+        Report(f).write_months(month_report_rows(conn), month_totals(conn))
+
+
+def _histogram(conn: sqlite3.Connection, rng: random.Random, tasks: int):
+    hour_histogram(conn)
+
+
+def _start_stop(conn: sqlite3.Connection, rng: random.Random, tasks: int):
+    for _ in range(SINGLE_OPERATIONS):
+        id = rng.randint(1, tasks)
+        start_task(conn, id)
+        stop_task(conn, id)
+
+
+def _get_time(conn: sqlite3.Connection, rng: random.Random, tasks: int):
+    for _ in range(SINGLE_OPERATIONS):
+        get_time(conn, rng.randint(1, tasks))
+
+
+def _add_comment(conn: sqlite3.Connection, rng: random.Random, tasks: int):
+    for _ in range(SINGLE_OPERATIONS):
+        add_comment(conn, rng.randint(1, tasks), "Benchmark comment")
+
+
+def _search(conn: sqlite3.Connection, rng: random.Random, tasks: int):
+    for word in ("fix", "release notes", "invoice"):
+        search(conn, word)
+
+
+# Name of each benchmark, and the function it times.
+BENCHMARKS: Dict[str, Callable[[sqlite3.Connection, random.Random, int], None]] = {
+    "list": _list,
+    "report": _report,
+    "histogram": _histogram,
+    "start_stop": _start_stop,
+    "get_time": _get_time,
+    "add_comment": _add_comment,
+    "search": _search,
+}
+
+
+def _commit() -> str:
+    """
+    Returns the git commit being benchmarked, or an empty string outside a git checkout.
+    """
+    try:
+        return subprocess.run(["git", "rev-parse", "HEAD"], capture_output=True, text=True, cwd=Path(__file__).parent).stdout.strip()
+    except OSError:
+        return ""
+
+
+def run(names: List[str], tasks: int, repeat: int, seed: int = 0) -> Dict[str, Dict[str, float]]:
+    """
+    Times each benchmark on the benchmark database.
+
+    :param names List[str]: Benchmarks to run, from BENCHMARKS.
+    :param tasks int: Number of tasks in the benchmark database.
+    :param repeat int: Samples taken of each benchmark.
+    :param seed int: Seed used to pick random tasks.
+    :rtype Dict[str, Dict[str, float]]: Minimum, median and maximum seconds of each benchmark.
+    """
+    results = {}
+    rng = random.Random(seed)
+    for name in names:
+        samples = []
+        for _ in range(repeat):
+            conn = connect_to_db(DATABASE)
+            with open(os.devnull, "w") as devnull, redirect_stdout(devnull):
+                start = time.perf_counter()
+                BENCHMARKS[name](conn, rng, tasks)
+                samples.append(time.perf_counter() - start)
+            close_connection(conn)
+        results[name] = {"min_s": min(samples), "median_s": statistics.median(samples), "max_s": max(samples)}
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("benchmarks", nargs="*", help=f"Benchmarks to run: {', '.join(BENCHMARKS)}. Defaults to all of them.")
+    parser.add_argument("--tasks", type=int, default=10000, help="Number of tasks in the generated database. Defaults to 10000.")
+    parser.add_argument("--sessions", type=float, default=10, help="Average time sessions per task. Defaults to 10.")
+    parser.add_argument("--comments", type=float, default=2, help="Average comments per task. Defaults to 2.")
+    parser.add_argument("-r", "--repeat", type=int, default=3, help="Samples taken of each benchmark. Defaults to 3.")
+    parser.add_argument("-o", "--output", default="-", help="File to write the results to, or - for stdout. Defaults to stdout.")
+    parser.add_argument("--keep", action="store_true", help="Keep the generated database instead of deleting it afterwards.")
+    args = parser.parse_args()
+    unknown = [name for name in args.benchmarks if name not in BENCHMARKS]
+    if unknown:
+        parser.error(f"unknown benchmarks: {', '.join(unknown)}")
+
+    start = time.perf_counter()
+    counts = generate_database(DATABASE, args.tasks, args.sessions, args.comments)
+    generation = time.perf_counter() - start
+    try:
+        results = run(args.benchmarks or list(BENCHMARKS), args.tasks, args.repeat)
+    finally:
+        if args.keep is False:
+            os.remove(Path(taskminal.main.__file__).with_name(DATABASE))
+    output = {
+        "commit": _commit(),
+        "python": platform.python_version(),
+        "sqlite": sqlite3.sqlite_version,
+        "rows": counts,
+        "generation_s": generation,
+        "repeat": args.repeat,
+        "results": results,
+    }
+    if args.output == "-":
+        json.dump(output, sys.stdout, indent=2)
+        print()
+    else:
+        with open(args.output, "w") as f:
+            json.dump(output, f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
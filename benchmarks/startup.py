@@ -0,0 +1,92 @@
+"""
+Measures the time from launching taskminal until its first byte of output, for the commands most often called
+from shell prompts and keybindings. Results are printed as JSON so runs can be compared across commits.
+
+Run it from the repository root:
+
+    python -m benchmarks.startup [-n RUNS] [--daemon]
+"""
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+import time
+from contextlib import redirect_stdout
+from pathlib import Path
+from typing import Dict, List
+
+import taskminal.main
+from taskminal.main import add_task, close_connection, connect_to_db, init_new_database
+
+DATABASE = "bench_startup.db"
+
+# Name of each measurement and the arguments it runs taskminal with.
+COMMANDS: Dict[str, List[str]] = {
+    "interpreter": [],
+    "help": ["--help"],
+    "start": ["start", "1"],
+    "stop": ["stop", "1"],
+    "add": ["add", "Benchmark task"],
+    "list": ["list", "-nc"],
+}
+
+
+def time_to_first_output(argv: List[str], env: Dict[str, str]) -> float:
+    """
+    Launches a command and returns the seconds until it writes its first byte to stdout.
+
+    :param argv List[str]: Arguments given to taskminal. An empty list only starts the interpreter.
+    :param env Dict[str, str]: Environment of the launched process.
+    :rtype float: Seconds until the first byte of output.
+    """
+    if argv:
+        command = [sys.executable, "-m", "taskminal.main"] + argv
+    else:
+        command = [sys.executable, "-c", "print()"]
+    start = time.perf_counter()
+    with subprocess.Popen(command, stdout=subprocess.PIPE, stderr=subprocess.DEVNULL, env=env) as process:
+        process.stdout.read(1)
+        elapsed = time.perf_counter() - start
+        process.stdout.read()
+    return elapsed
+
+
+def run(runs: int, daemon: bool) -> Dict[str, Dict[str, float]]:
+    """
+    Measures every command in COMMANDS against a fresh benchmark database.
+
+    :param runs int: Times each command is launched.
+    :param daemon bool: Let commands go through a running daemon instead of disabling it.
+    :rtype Dict[str, Dict[str, float]]: Minimum, median and maximum milliseconds of each command.
+    """
+    with redirect_stdout(sys.stderr):
+        init_new_database(DATABASE, True)
+        conn = connect_to_db(DATABASE)
+        add_task(conn, "Benchmark task")
+        close_connection(conn)
+    env = dict(os.environ, TASKMINAL_DB=DATABASE)
+    if daemon is False:
+        env["TASKMINAL_NO_DAEMON"] = "1"
+    results = {}
+    try:
+        for name, argv in COMMANDS.items():
+            samples = [time_to_first_output(argv, env) * 1000 for _ in range(runs)]
+            results[name] = {"min_ms": min(samples), "median_ms": statistics.median(samples), "max_ms": max(samples)}
+    finally:
+        os.remove(Path(taskminal.main.__file__).with_name(DATABASE))
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("-n", "--runs", type=int, default=20, help="Times each command is launched. Defaults to 20.")
+    parser.add_argument("--daemon", action="store_true", help="Go through a running daemon instead of disabling it.")
+    args = parser.parse_args()
+    json.dump({"python": sys.version.split()[0], "runs": args.runs, "results": run(args.runs, args.daemon)}, sys.stdout, indent=2)
+    print()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,174 @@
+import sqlite3
+from pathlib import Path
+from sqlite3 import Connection, Error
+from typing import Optional, Tuple
+
+from taskminal.migrations import migrate
+
+
+def archive_path(conn: Connection) -> Optional[Path]:
+    """
+    Returns the path of the archive of a database: the database file with an .archive extension instead of .db.
+    It's a regular Taskminal database, but it isn't listed by listdb nor included in combined reports.
+
+    :param conn Connection: Connection to the database.
+    :rtype Optional[Path]: Path of the archive file, which may not exist yet, or None for in-memory databases.
+    """
+    main = next(row[2] for row in conn.execute("PRAGMA database_list") if row[1] == "main")
+    return Path(main).with_suffix(".archive") if main else None
+
+
+def _prepare_archive(path: Path):
+    """
+    Creates the archive if it doesn't exist, or migrates it to the current schema if it does.
+
+    :param path Path: Path of the archive file.
+    """
+    from taskminal.main import create_tables
+
+    conn = sqlite3.connect(path)
+    try:
+        if conn.execute("SELECT COUNT(*) FROM sqlite_master").fetchone()[0] == 0:
+            create_tables(conn)
+        else:
+            migrate(conn)
+    finally:
+        conn.close()
+
+
+def _id_offset(conn: Connection, table: str, ids: str) -> int:
+    """
+    Returns how much ids have to be shifted to be copied into the archive without clashing with rows archived earlier.
+    SQLite reuses the highest ids after they're deleted, so an id may already be in use in the archive.
+
+    :param conn Connection: Connection with the archive attached.
+    :param table str: Table the rows are copied to.
+    :param ids str: Query returning the ids of the rows to copy.
+    :rtype int: 0 if every id is free, the highest id in the archive table otherwise.
+    """
+    sql = f"""SELECT CASE WHEN EXISTS(SELECT 1 FROM archive.{table} WHERE id IN ({ids}))
+                     THEN (SELECT MAX(id) FROM archive.{table}) ELSE 0 END"""
+    return conn.execute(sql).fetchone()[0]
+
+
+def archive_tasks(conn: Connection, cutoff: int, vacuum: bool = True) -> Optional[Tuple[int, int, int]]:
+    """
+    Moves completed tasks not worked on since cutoff, along with their sessions and comments, to the archive database, in a single transaction.
+    Tasks with an open session are never archived. Afterwards, statistics are refreshed with ANALYZE and the database is compacted with VACUUM.
+
+    :param conn Connection: Current sqlite3 connection.
+    :param cutoff int: Unix timestamp. Tasks whose last session started or ended before it are archived, as are completed tasks never started.
+    :param vacuum bool: Compact the database file after archiving.
+    :rtype Optional[Tuple[int, int, int]]: Number of tasks, sessions and comments archived, or None if archiving failed.
+    """
+    from taskminal.main import begin_immediate
+
+    if conn.in_transaction:
+        print("Can't archive while a transaction is open.")
+        return None
+    path = archive_path(conn)
+    if path is None:
+        print("In-memory databases can't be archived.")
+        return None
+    try:
+        _prepare_archive(path)
+        conn.execute("ATTACH DATABASE ? AS archive", (str(path),))
+    except Error as e:
+        print(e)
+        return None
+    tasks = "SELECT id FROM temp.archived"
+    try:
+        begin_immediate(conn)
+        conn.execute("DROP TABLE IF EXISTS temp.archived")
+        conn.execute("""CREATE TEMP TABLE archived AS
+                        SELECT id FROM main.tasks
+                        WHERE completed = 1 AND last_active < ?
+                        AND NOT EXISTS(SELECT 1 FROM main.time WHERE time.task_id = tasks.id AND time.end_date IS NULL)""", (cutoff,))
+        task_offset = _id_offset(conn, "tasks", tasks)
+        time_offset = _id_offset(conn, "time", f"SELECT id FROM main.time WHERE task_id IN ({tasks})")
+        comment_offset = _id_offset(conn, "comments", f"SELECT id FROM main.comments WHERE task_id IN ({tasks})")
+        # The archive's own triggers fill in its totals, report cache and search index.
+        counts = (
+            conn.execute(f"""INSERT INTO archive.tasks(id, name, completed)
+                             SELECT id + ?, name, completed FROM main.tasks WHERE id IN ({tasks})""", (task_offset,)).rowcount,
+            conn.execute(f"""INSERT INTO archive.time(id, task_id, start_date, end_date)
+                             SELECT id + ?, task_id + ?, start_date, end_date FROM main.time WHERE task_id IN ({tasks})""",
+                         (time_offset, task_offset)).rowcount,
+            conn.execute(f"""INSERT INTO archive.comments(id, task_id, body)
+                             SELECT id + ?, task_id + ?, body FROM main.comments WHERE task_id IN ({tasks})""",
+                         (comment_offset, task_offset)).rowcount,
+        )
+        # Archiving isn't a change sync should send to other databases, so it isn't recorded,
+        # and changes not synced yet are forgotten rather than sent as deletions.
+        conn.execute("INSERT OR REPLACE INTO main.sync_state(key, value) VALUES('local', '1')")
+        for table, column in (("tasks", "id"), ("time", "task_id"), ("comments", "task_id")):
+            conn.execute(f"""DELETE FROM main.changes WHERE tbl = '{table}'
+                             AND gid IN (SELECT gid FROM main.{table} WHERE {column} IN ({tasks}))""")
+        # Sessions and comments are deleted along with their tasks by ON DELETE CASCADE.
+        conn.execute(f"DELETE FROM main.tasks WHERE id IN ({tasks})")
+        conn.execute("DELETE FROM main.sync_state WHERE key = 'local'")
+        conn.commit()
+        conn.execute("DROP TABLE temp.archived")
+        conn.execute("ANALYZE")
+        conn.commit()
+    except Error as e:
+        conn.rollback()
+        print(e)
+        return None
+    finally:
+        conn.execute("DETACH DATABASE archive")
+    if vacuum:
+        conn.execute("VACUUM")
+    print(f"Archived {counts[0]} tasks, {counts[1]} sessions and {counts[2]} comments to {path.name}.")
+    return counts
+
+
+def attach_archive(conn: Connection, start: Optional[int] = None) -> bool:
+    """
+    Makes the archive visible to the report queries, if there's one and it holds sessions started after start.
+    Temporary views named tasks and time, which take precedence over the real tables, show the rows of both databases.
+    Archived ids are negated so they never match ids of the active database.
+    Until detach_archive is called, tasks and time can't be written to.
+
+    :param conn Connection: Current sqlite3 connection.
+    :param start Optional[int]: Start of the reported range, as a unix timestamp. None means the whole history.
+    :rtype bool: True if the archive was attached.
+    """
+    path = archive_path(conn)
+    if path is None or path.exists() is False or conn.in_transaction:
+        return False
+    conn.execute("ATTACH DATABASE ? AS archive", (str(path),))
+    latest = conn.execute("SELECT MAX(start_date) FROM archive.time").fetchone()[0]
+    if latest is None or (start is not None and latest < start):
+        conn.execute("DETACH DATABASE archive")
+        return False
+    conn.execute("""CREATE TEMP VIEW tasks AS
+                    SELECT id, name, completed, total_seconds, sessions, last_active FROM main.tasks
+                    UNION ALL
+                    SELECT -id, name, completed, total_seconds, sessions, last_active FROM archive.tasks""")
+    conn.execute("""CREATE TEMP VIEW time AS
+                    SELECT id, task_id, start_date, end_date FROM main.time
+                    UNION ALL
+                    SELECT -id, -task_id, start_date, end_date FROM archive.time""")
+    return True
+
+
+def detach_archive(conn: Connection):
+    """
+    Undoes attach_archive.
+
+    :param conn Connection: Current sqlite3 connection.
+    """
+    conn.execute("DROP VIEW IF EXISTS temp.tasks")
+    conn.execute("DROP VIEW IF EXISTS temp.time")
+    conn.execute("DETACH DATABASE archive")
+
+
+def has_archive(conn: Connection) -> bool:
+    """
+    Checks whether attach_archive is in effect, in which case the report cache, which only covers the active database, can't be used.
+
+    :param conn Connection: Current sqlite3 connection.
+    :rtype bool: True if the archive is attached.
+    """
+    return any(row[1] == "archive" for row in conn.execute("PRAGMA database_list"))
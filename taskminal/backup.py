@@ -0,0 +1,111 @@
+import sqlite3
+from datetime import datetime
+from pathlib import Path
+from sqlite3 import Connection, Error
+from typing import List, Optional
+
+from taskminal.migrations import migrate
+
+
+def backup_folder() -> Path:
+    """
+    Returns the folder timestamped snapshots are written to unless another one is chosen, backups next to the program.
+
+    :rtype Path: Path of the folder, which may not exist yet.
+    """
+    return Path(__file__).with_name("backups")
+
+
+def _database_stem(conn: Connection) -> str:
+    main = next(row[2] for row in conn.execute("PRAGMA database_list") if row[1] == "main")
+    return Path(main).stem if main else "memory"
+
+
+def snapshots(folder: Path, stem: str) -> List[Path]:
+    """
+    Returns the timestamped snapshots of a database in a folder, oldest first.
+
+    :param folder Path: Folder holding the snapshots.
+    :param stem str: Name of the database, without the .db extension.
+    :rtype List[Path]: Paths of the snapshots.
+    """
+    return sorted(folder.glob(f"{stem}-????????-??????.db"))
+
+
+def backup_database(conn: Connection, output: Optional[Path] = None, folder: Optional[Path] = None, keep: Optional[int] = None,
+                    pages: int = 256, sleep: float = 0.05) -> Optional[Path]:
+    """
+    Copies the database to a file while it's in use, with the SQLite backup API.
+    The copy is made pages at a time, sleeping in between, so other processes can keep starting and stopping tasks meanwhile.
+    If they write to the database, the copy starts over, so it always ends up consistent.
+    The copy is written to a temporary file first, so an interrupted backup never leaves a partial snapshot behind.
+
+    :param conn Connection: Connection to the database to back up.
+    :param output Optional[Path]: File to write the copy to. None writes a timestamped snapshot to folder.
+    :param folder Optional[Path]: Folder of the timestamped snapshots. None uses backup_folder.
+    :param keep Optional[int]: Only keep this many timestamped snapshots of this database, at least 1, deleting the oldest ones. None keeps them all.
+    :param pages int: Pages copied per step. 0 or less copies the whole database in a single step, locking it until done.
+    :param sleep float: Seconds to sleep between steps.
+    :rtype Optional[Path]: Path of the copy, or None if it failed.
+    """
+    stem = _database_stem(conn)
+    if output is None:
+        folder = folder or backup_folder()
+        output = folder / f"{stem}-{datetime.now().strftime('%Y%m%d-%H%M%S')}.db"
+    partial = output.with_name(output.name + ".partial")
+    try:
+        output.parent.mkdir(parents=True, exist_ok=True)
+        target = sqlite3.connect(partial)
+        try:
+            conn.backup(target, pages=pages, sleep=sleep)
+        finally:
+            target.close()
+        partial.replace(output)
+    except (Error, OSError) as e:
+        try:
+            partial.unlink()
+        except FileNotFoundError:
+            pass
+        print(e)
+        return None
+    print(f"Backup written to {output}.")
+    if folder is not None and keep is not None:
+        for old in snapshots(folder, stem)[:-keep]:
+            old.unlink()
+            print(f"Removed old backup {old}.")
+    return output
+
+
+def restore_database(conn: Connection, source: Path, pages: int = 256, sleep: float = 0.05) -> bool:
+    """
+    Replaces the contents of the database with a backup, with the SQLite backup API, then migrates it to the current schema.
+    The backup is checked first, and left untouched.
+
+    :param conn Connection: Connection to the database to overwrite.
+    :param source Path: Backup to restore.
+    :param pages int: Pages copied per step. 0 or less copies the whole backup in a single step.
+    :param sleep float: Seconds to sleep between steps.
+    :rtype bool: True if the backup was restored.
+    """
+    if source.is_file() is False:
+        print(f"Can't find backup {source}")
+        return False
+    backup = None
+    try:
+        backup = sqlite3.connect(f"{source.resolve().as_uri()}?mode=ro", uri=True)
+        if backup.execute("PRAGMA quick_check").fetchone()[0] != "ok":
+            print(f"{source} is corrupt.")
+            return False
+        if backup.execute("SELECT COUNT(*) FROM sqlite_master WHERE type = 'table' AND name = 'tasks'").fetchone()[0] == 0:
+            print(f"{source} isn't a Taskminal database.")
+            return False
+        backup.backup(conn, pages=pages, sleep=sleep)
+        migrate(conn)
+    except Error as e:
+        print(e)
+        return False
+    finally:
+        if backup is not None:
+            backup.close()
+    print(f"Restored {source}.")
+    return True
@@ -0,0 +1,81 @@
+import argparse
+import shlex
+from sqlite3 import Connection, Error
+from typing import TextIO
+
+from taskminal.main import TaskminalConnection, run_command
+
+# Commands that don't work on the active database, or can't run inside a transaction, and so can't run inside a batch.
+# daemon and tuning don't touch the database at all, and status --watch would never return, holding the batch's transaction open.
+UNBATCHABLE = {"createdb", "set", "listdb", "cleanup", "batch", "daemon", "tuning", "archive", "backup", "restore", "sync", "status"}
+
+
+def _parse(parser: argparse.ArgumentParser, line: str) -> argparse.Namespace:
+    """
+    Parses a single batch line with the command line parser.
+
+    :param parser argparse.ArgumentParser: The taskminal argument parser.
+    :param line str: Command, written as it would be after "taskminal" on the shell.
+    :rtype argparse.Namespace: Parsed arguments.
+    """
+    try:
+        args = parser.parse_args(shlex.split(line))
+    except SystemExit:
+        # argparse already printed the reason to stderr.
+        raise ValueError("invalid command") from None
+    if args.command in UNBATCHABLE:
+        raise ValueError(f"{args.command} can't run in a batch")
+    return args
+
+
+def run_batch(conn: TaskminalConnection, source: TextIO, parser: argparse.ArgumentParser, transaction_size: int = 0, stop_on_error: bool = False) -> int:
+    """
+    Runs one command per line of source on a single connection. Blank lines and lines starting with # are skipped.
+    Commands are grouped in transactions of transaction_size commands, and each one runs inside a savepoint,
+    so a failing command is rolled back without losing the rest of its transaction.
+
+    :param conn TaskminalConnection: Current sqlite3 connection, as returned by connect_to_db.
+    :param source TextIO: Open file handle with the commands.
+    :param parser argparse.ArgumentParser: The taskminal argument parser.
+    :param transaction_size int: Commands per transaction. 0 runs the whole batch in a single transaction.
+    :param stop_on_error bool: Stop at the first failing command and roll back the open transaction.
+    :rtype int: Number of failed commands.
+    """
+    ran = failed = pending = 0
+    conn.in_batch = True
+    try:
+        for lineno, line in enumerate(source, 1):
+            line = line.strip()
+            if line == "" or line.startswith("#"):
+                continue
+            ran += 1
+            if conn.in_transaction is False:
+                conn.execute("BEGIN")
+            conn.execute("SAVEPOINT command")
+            try:
+                ok = run_command(conn, _parse(parser, line))
+                error = "command failed"
+            except (Error, OSError, ValueError) as e:
+                ok = False
+                error = str(e)
+            if ok:
+                conn.execute("RELEASE command")
+            else:
+                conn.execute("ROLLBACK TO command")
+                conn.execute("RELEASE command")
+                failed += 1
+                print(f"Line {lineno}: {error}: {line}")
+                if stop_on_error:
+                    Connection.rollback(conn)
+                    print("Stopped, the open transaction was rolled back.")
+                    break
+            pending += 1
+            if transaction_size > 0 and pending >= transaction_size:
+                Connection.commit(conn)
+                pending = 0
+    finally:
+        conn.in_batch = False
+    if conn.in_transaction:
+        conn.commit()
+    print(f"Ran {ran} commands, {failed} failed.")
+    return failed
@@ -0,0 +1,95 @@
+import os
+import sys
+from concurrent.futures import ProcessPoolExecutor
+from itertools import repeat
+from pathlib import Path
+from typing import Dict, List, Optional, Tuple
+
+
+def database_names() -> List[str]:
+    """
+    Returns the filename of every database in the same folder as the program, sorted.
+
+    :rtype List[str]: Filenames of the .db files.
+    """
+    return sorted(path.name for path in Path(__file__).parent.glob("*.db"))
+
+
+def _database_totals(name: str, start: Optional[int], end: Optional[int]) -> Tuple[str, Dict[str, int], Optional[str]]:
+    """
+    Runs in a worker process: opens one database and adds up its time per month in SQL, archived sessions included.
+
+    :param name str: Filename of the database.
+    :param start Optional[int]: Only count sessions started at or after this unix timestamp.
+    :param end Optional[int]: Only count sessions started before this unix timestamp.
+    :rtype Tuple[str, Dict[str, int], Optional[str]]: The database name, its total seconds per month, and the error message if it couldn't be read.
+    """
+    from contextlib import redirect_stdout
+    from io import StringIO
+    from sqlite3 import Error
+    from taskminal.archive import attach_archive
+    from taskminal.main import close_connection, connect_to_db, month_totals
+
+    out = StringIO()
+    conn = None
+    try:
+        # connect_to_db prints its errors and exits, which would be lost in a worker.
+        with redirect_stdout(out):
+            conn = connect_to_db(name)
+        attach_archive(conn, start)
+        return name, month_totals(conn, start, end), None
+    except (Error, SystemExit) as e:
+        return name, {}, out.getvalue().strip() or str(e)
+    finally:
+        close_connection(conn)
+
+
+def combined_totals(names: List[str], workers: Optional[int] = None, start: Optional[int] = None,
+                    end: Optional[int] = None) -> Dict[str, Dict[str, int]]:
+    """
+    Adds up the time per month of several databases, reading them in parallel with one worker process per database.
+    Databases that can't be read are reported on stderr, so they don't end up in reports written to stdout, and left out.
+
+    :param names List[str]: Filenames of the databases. ".db" is appended to names without it.
+    :param workers Optional[int]: Maximum number of worker processes. None uses as many as there are CPUs.
+    :param start Optional[int]: Only count sessions started at or after this unix timestamp.
+    :param end Optional[int]: Only count sessions started before this unix timestamp.
+    :rtype Dict[str, Dict[str, int]]: Total seconds of each database, keyed by month (YYYY-MM, local time) and then by database, both sorted.
+    """
+    months: Dict[str, Dict[str, int]] = {}
+    found = []
+    for name in names:
+        name = name if name.endswith(".db") else name + ".db"
+        if Path(__file__).with_name(name).is_file():
+            found.append(name)
+        else:
+            print(f"Skipping {name}: can't find database", file=sys.stderr)
+    if len(found) == 0:
+        return months
+    with ProcessPoolExecutor(min(len(found), workers or os.cpu_count() or 1)) as pool:
+        for name, totals, error in pool.map(_database_totals, found, repeat(start), repeat(end)):
+            if error is not None:
+                print(f"Skipping {name}: {error}", file=sys.stderr)
+                continue
+            for month, seconds in totals.items():
+                months.setdefault(month, {})[name] = seconds
+    return {month: months[month] for month in sorted(months)}
+
+
+def generate_combined_report(names: List[str], output: Optional[str] = None, fmt: str = "html",
+                             start: Optional[int] = None, end: Optional[int] = None):
+    """
+    Writes a report with the time logged per month in each of several databases, plus the total of each month.
+    HTML reports written to a file are opened in the browser afterwards.
+
+    :param names List[str]: Filenames of the databases.
+    :param output Optional[str]: Path of the report file, or "-" to write it to stdout. None writes HTML to report.html and every other format to stdout.
+    :param fmt str: "html", "json", "csv" or "ndjson". Other formats than html write one record per month and database.
+    :param start Optional[int]: Only count sessions started at or after this unix timestamp.
+    :param end Optional[int]: Only count sessions started before this unix timestamp.
+    """
+    from taskminal.report import COMBINED_COLUMNS, write_report
+
+    months = combined_totals(names, start=start, end=end)
+    rows = ((month, name, seconds) for month, databases in months.items() for name, seconds in databases.items())
+    write_report(output, fmt, lambda report: report.write_combined(months), COMBINED_COLUMNS, lambda: rows)
@@ -0,0 +1,166 @@
+import os
+from configparser import ConfigParser
+from pathlib import Path
+from sqlite3 import Connection, OperationalError
+from typing import Dict, Optional, Union
+
+# Built-in tuning profiles. Custom profiles can be added to the config file as [tuning:NAME] sections,
+# and are based on the default profile.
+PROFILES: Dict[str, Dict[str, Union[str, int]]] = {
+    # SQLite's own defaults, plus a busy timeout so concurrent commands wait for each other instead of failing.
+    # The journal mode is left as the database has it: switching out of WAL fails while any other connection is open.
+    "default": {"synchronous": "full", "busy_timeout": 5000},
+    # Write-ahead logging: readers don't block the writer, and commits are much cheaper. A crash can lose the last commit.
+    "wal": {"journal_mode": "wal", "synchronous": "normal", "busy_timeout": 5000, "temp_store": "memory"},
+    # Large imports and batches. Doesn't sync at all, so a power loss can corrupt the database.
+    "bulk": {"journal_mode": "wal", "synchronous": "off", "busy_timeout": 5000, "temp_store": "memory", "cache_size": -65536},
+    # Reports over long histories: large page cache and memory-mapped reads.
+    "report": {"journal_mode": "wal", "synchronous": "normal", "busy_timeout": 5000, "temp_store": "memory", "cache_size": -262144, "mmap_size": 268435456},
+}
+
+# Accepted values of each tuning setting. Integer settings are validated with int().
+CHOICES = {
+    "journal_mode": ("delete", "truncate", "persist", "memory", "wal", "off"),
+    "synchronous": ("off", "normal", "full", "extra"),
+    "temp_store": ("default", "file", "memory"),
+}
+INTEGERS = ("cache_size", "mmap_size", "busy_timeout")
+
+
+def config_path() -> Path:
+    """
+    Returns the path of the config file, taskminal.ini next to the program unless TASKMINAL_CONFIG is set.
+
+    :rtype Path: Path of the config file.
+    """
+    if os.environ.get("TASKMINAL_CONFIG"):
+        return Path(os.environ["TASKMINAL_CONFIG"])
+    return Path(__file__).with_name("taskminal.ini")
+
+
+def load_config() -> ConfigParser:
+    """
+    Reads the config file. If there's none, the active database is taken from the db.txt file used by older versions.
+
+    :rtype ConfigParser: Contents of the config file. Always has a [taskminal] section.
+    """
+    config = ConfigParser()
+    config.read(config_path(), encoding="utf-8")
+    if config.has_section("taskminal") is False:
+        config.add_section("taskminal")
+        legacy = Path(__file__).with_name("db.txt")
+        if legacy.is_file():
+            config.set("taskminal", "database", legacy.read_text())
+    return config
+
+
+def save_config(config: ConfigParser):
+    """
+    Writes the config file, and removes the db.txt file used by older versions.
+
+    :param config ConfigParser: Config to write.
+    """
+    with open(config_path(), "w", encoding="utf-8") as f:
+        config.write(f)
+    legacy = Path(__file__).with_name("db.txt")
+    if legacy.is_file():
+        legacy.unlink()
+
+
+def active_database() -> Optional[str]:
+    """
+    Returns the filename of the active database, as chosen with the set command.
+    The TASKMINAL_DB environment variable takes precedence over it.
+
+    :rtype Optional[str]: Filename of the active database, or None if there isn't one.
+    """
+    if os.environ.get("TASKMINAL_DB"):
+        return os.environ["TASKMINAL_DB"]
+    return load_config().get("taskminal", "database", fallback=None)
+
+
+def set_active_database(name: str):
+    """
+    Stores the active database in the config file.
+
+    :param name str: Filename of the database.
+    """
+    config = load_config()
+    config.set("taskminal", "database", name)
+    save_config(config)
+
+
+def tuning_name(config: Optional[ConfigParser] = None) -> str:
+    """
+    Returns the name of the active tuning profile. The TASKMINAL_TUNING environment variable takes precedence over the config file.
+
+    :param config Optional[ConfigParser]: Config already read with load_config. None reads the config file.
+    :rtype str: Name of the tuning profile, "default" if none was chosen.
+    """
+    if os.environ.get("TASKMINAL_TUNING"):
+        return os.environ["TASKMINAL_TUNING"]
+    return (config or load_config()).get("taskminal", "tuning", fallback="default")
+
+
+def get_tuning(name: Optional[str] = None) -> Optional[Dict[str, Union[str, int]]]:
+    """
+    Returns the settings of a tuning profile, validated.
+
+    :param name Optional[str]: Name of the profile. None returns the active profile.
+    :rtype Optional[Dict[str, Union[str, int]]]: Setting names and values, or None if the profile doesn't exist or has invalid values.
+    """
+    config = load_config()
+    name = name or tuning_name(config)
+    section = f"tuning:{name}"
+    if name not in PROFILES and config.has_section(section) is False:
+        print(f"Unknown tuning profile: {name}")
+        return None
+    settings = dict(PROFILES.get(name, PROFILES["default"]))
+    if config.has_section(section):
+        settings.update(config.items(section))
+    for key, value in settings.items():
+        if key in INTEGERS:
+            try:
+                settings[key] = int(value)
+            except ValueError:
+                print(f"Invalid value for {key} in tuning profile {name}: {value}")
+                return None
+        elif key in CHOICES and str(value).lower() in CHOICES[key]:
+            settings[key] = str(value).lower()
+        else:
+            print(f"Invalid setting in tuning profile {name}: {key} = {value}")
+            return None
+    return settings
+
+
+def set_tuning(name: str) -> bool:
+    """
+    Stores the tuning profile used by every connection in the config file.
+
+    :param name str: Name of a built-in profile or of a [tuning:NAME] section in the config file.
+    :rtype bool: True if the profile exists and was saved.
+    """
+    if get_tuning(name) is None:
+        return False
+    config = load_config()
+    config.set("taskminal", "tuning", name)
+    save_config(config)
+    return True
+
+
+def apply_tuning(conn: Connection, settings: Dict[str, Union[str, int]]):
+    """
+    Applies tuning settings to a connection, as PRAGMA statements.
+
+    :param conn Connection: Current sqlite3 connection.
+    :param settings Dict[str, Union[str, int]]: Validated settings, as returned by get_tuning.
+    """
+    # The busy timeout goes first, so switching the journal mode waits for other connections.
+    for key in sorted(settings, key=lambda key: key != "busy_timeout"):
+        try:
+            conn.execute(f"PRAGMA {key} = {settings[key]}").fetchall()
+        except OperationalError:
+            # Leaving WAL needs every other connection to be closed, even idle ones, which the busy timeout doesn't wait for.
+            # The database keeps its current mode, and the switch is tried again on the next connection.
+            if key != "journal_mode":
+                raise
@@ -0,0 +1,236 @@
+import json
+import os
+import socket
+import stat
+import sys
+from pathlib import Path
+from typing import Callable, List, Optional, Tuple
+
+# Commands the daemon runs on behalf of the client. Everything else, including any command that reads
+# or writes local files, always runs in the client process.
+DAEMON_COMMANDS = {"new", "add", "list", "delete", "remove", "start", "stop", "done", "comment", "search"}
+
+
+def socket_path() -> Path:
+    """
+    Returns the path of the daemon's Unix domain socket, inside a folder only the current user can access.
+    Can be overridden with the TASKMINAL_SOCKET environment variable.
+
+    :rtype Path: Path of the socket file.
+    """
+    if os.environ.get("TASKMINAL_SOCKET"):
+        return Path(os.environ["TASKMINAL_SOCKET"])
+    folder = os.environ.get("XDG_RUNTIME_DIR") or os.environ.get("TMPDIR") or "/tmp"
+    return Path(folder) / f"taskminal-{os.getuid()}" / "daemon.sock"
+
+
+def _is_private(path: Path, kind: Callable[[int], bool]) -> bool:
+    """
+    Checks that a path is of the expected kind and belongs to the current user, so commands,
+    which include task names and comments, are never sent to a socket another user created.
+
+    :param path Path: Path to check. Symbolic links aren't followed.
+    :param kind Callable[[int], bool]: stat.S_ISSOCK, stat.S_ISDIR...
+    :rtype bool: True if the path exists, is of that kind and belongs to the current user.
+    """
+    try:
+        info = path.lstat()
+    except OSError:
+        return False
+    return kind(info.st_mode) and info.st_uid == os.getuid()
+
+
+def _request(message: dict, timeout: Optional[float] = None) -> Optional[dict]:
+    """
+    Sends a message to the daemon and waits for its answer.
+
+    :param message dict: JSON serializable request.
+    :param timeout Optional[float]: Seconds to wait for the answer. None waits forever.
+    :rtype Optional[dict]: The daemon's answer, or None if it isn't running.
+    """
+    if hasattr(socket, "AF_UNIX") is False:
+        return None
+    path = socket_path()
+    if _is_private(path, stat.S_ISSOCK) is False:
+        return None
+    with socket.socket(socket.AF_UNIX, socket.SOCK_STREAM) as client:
+        client.settimeout(timeout)
+        try:
+            client.connect(str(path))
+        except OSError:
+            return None
+        client.sendall(json.dumps(message).encode() + b"\n")
+        client.shutdown(socket.SHUT_WR)
+        chunks = []
+        while True:
+            chunk = client.recv(65536)
+            if not chunk:
+                break
+            chunks.append(chunk)
+    return json.loads(b"".join(chunks)) if chunks else None
+
+
+def forward(argv: List[str]) -> bool:
+    """
+    Runs a command on the daemon if it's running, and prints its output.
+
+    :param argv List[str]: Command line arguments, without the program name.
+    :rtype bool: True if the daemon ran the command, False if it should run locally instead.
+    """
+    if len(argv) == 0 or argv[0] not in DAEMON_COMMANDS:
+        return False
+    # The daemon reads its own config file, which may not define the same databases and tuning profiles.
+    if os.environ.get("TASKMINAL_CONFIG"):
+        return False
+    # The daemon doesn't see the client's environment, so the overrides are sent along with the command.
+    answer = _request({"argv": argv, "database": os.environ.get("TASKMINAL_DB"), "tuning": os.environ.get("TASKMINAL_TUNING")})
+    if answer is None:
+        return False
+    sys.stdout.write(answer["output"])
+    sys.stderr.write(answer["error"])
+    if answer["status"] != 0:
+        sys.exit(answer["status"])
+    return True
+
+
+def _file_id(name: str) -> Optional[Tuple[int, int]]:
+    """
+    Returns what identifies a database file on disk, which changes when it's replaced by another file with the same name.
+
+    :param name str: Filename of the database, as passed to connect_to_db.
+    :rtype Optional[Tuple[int, int]]: Device and inode of the file, or None if it doesn't exist.
+    """
+    try:
+        info = os.stat(Path(__file__).with_name(name))
+    except OSError:
+        return None
+    return info.st_dev, info.st_ino
+
+
+def serve():
+    """
+    Runs the daemon in the foreground until it's stopped. Keeps a parser and a connection to the active database open
+    between commands, reconnecting when the active database changes or a command asks for another database or tuning profile.
+    """
+    import socketserver
+    from contextlib import redirect_stderr, redirect_stdout
+    from io import StringIO
+    from taskminal.config import active_database
+    from taskminal.main import build_parser, close_connection, connect_to_db, run_command
+
+    parser = build_parser()
+    state = {"name": None, "tuning": None, "file": None, "conn": None}
+
+    def reset():
+        close_connection(state["conn"])
+        state.update(name=None, tuning=None, file=None, conn=None)
+
+    class Handler(socketserver.StreamRequestHandler):
+        def handle(self):
+            message = json.loads(self.rfile.readline())
+            if message.get("action") == "stop":
+                self.reply(0, "Daemon stopped.\n", "")
+                self.server.running = False
+                return
+            if message.get("action") == "reconnect":
+                reset()
+                self.reply(0, "", "")
+                return
+            if message.get("action") == "status":
+                self.reply(0, f"Daemon running, active database: {state['name']}\n", "")
+                return
+            out, err = StringIO(), StringIO()
+            status = 0
+            with redirect_stdout(out), redirect_stderr(err):
+                try:
+                    args = parser.parse_args(message["argv"])
+                    name = message.get("database") or active_database()
+                    tuning = message.get("tuning")
+                    if name is None:
+                        print("There's no active database.")
+                    else:
+                        # A database replaced or deleted since it was opened, by createdb -f for example, is opened again.
+                        file = _file_id(name)
+                        if file is None or (name, tuning, file) != (state["name"], state["tuning"], state["file"]):
+                            # The old connection is closed first: a profile can't leave WAL mode while it's open.
+                            reset()
+                            conn = connect_to_db(name, tuning)
+                            state.update(name=name, tuning=tuning, file=_file_id(name), conn=conn)
+                        run_command(state["conn"], args)
+                except SystemExit as e:
+                    status = e.code if isinstance(e.code, int) else 1
+                except Exception as e:
+                    print(e, file=sys.stderr)
+                    status = 1
+            self.reply(status, out.getvalue(), err.getvalue())
+
+        def reply(self, status: int, output: str, error: str):
+            self.wfile.write(json.dumps({"status": status, "output": output, "error": error}).encode())
+
+    path = socket_path()
+    if "TASKMINAL_SOCKET" not in os.environ:
+        try:
+            path.parent.mkdir(mode=0o700, exist_ok=True)
+        except OSError as e:
+            print(e)
+            return
+        if _is_private(path.parent, stat.S_ISDIR) is False or path.parent.stat().st_mode & 0o077:
+            print(f"{path.parent} must be a folder only you can access.")
+            return
+    if path.exists() or path.is_symlink():
+        if _is_private(path, stat.S_ISSOCK) is False:
+            print(f"{path} already exists and isn't your daemon's socket.")
+            return
+        if _request({"action": "status"}, timeout=1) is not None:
+            print("The daemon is already running.")
+            return
+        path.unlink()
+    old_umask = os.umask(0o077)
+    try:
+        server = socketserver.UnixStreamServer(str(path), Handler)
+    finally:
+        os.umask(old_umask)
+    server.running = True
+    print(f"Listening on {path}")
+    try:
+        while server.running:
+            server.handle_request()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+        path.unlink()
+        close_connection(state["conn"])
+
+
+def stop() -> bool:
+    """
+    Asks the running daemon to stop.
+
+    :rtype bool: True if the daemon was running.
+    """
+    answer = _request({"action": "stop"}, timeout=5)
+    if answer is None:
+        print("The daemon isn't running.")
+        return False
+    print(answer["output"], end="")
+    return True
+
+
+def reconnect():
+    """
+    Tells the running daemon, if any, to close its connection, so the next command opens the database again.
+    Used by the commands that replace or delete database files.
+    """
+    _request({"action": "reconnect"}, timeout=5)
+
+
+def status() -> bool:
+    """
+    Prints whether the daemon is running.
+
+    :rtype bool: True if the daemon is running.
+    """
+    answer = _request({"action": "status"}, timeout=5)
+    print(answer["output"] if answer else "The daemon isn't running.\n", end="")
+    return answer is not None
@@ -1,15 +1,39 @@
 import os
 import sqlite3
-from sqlite3 import Error, Connection
-import argparse
+from sqlite3 import Error, Connection, Cursor
 import sys
 from datetime import datetime, timedelta
-from typing import List, Optional
+from time import sleep
+from typing import TYPE_CHECKING, Dict, List, Optional, Tuple
 from pathlib import Path
-import webbrowser
-from calendar import month_name
 
-from taskminal.report import Report
+from taskminal.migrations import LATEST_ACTIVITY, migrate
+
+if TYPE_CHECKING:
+    import argparse
+    from taskminal.profiling import Profiler
+    from taskminal.repository import Comment, OpenSession, Task
+
+# Set by main when profiling, so every connection opened while running the command is traced.
+PROFILER: Optional["Profiler"] = None
+
+
+class TaskminalConnection(Connection):
+    """
+    sqlite3 connection returned by connect_to_db. While in_batch is set, commit() and rollback() do nothing,
+    so every helper called by a batch runs inside the batch's transaction, and the batch decides what to keep.
+    """
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.in_batch = False
+
+    def commit(self):
+        if self.in_batch is False:
+            super().commit()
+
+    def rollback(self):
+        if self.in_batch is False:
+            super().rollback()
 
 
 def init_new_database(name: str = "taskminal.db", force: bool = False) -> bool:
@@ -28,34 +52,13 @@ def init_new_database(name: str = "taskminal.db", force: bool = False) -> bool:
             return False
         else:
             os.remove(Path(__file__).with_name(name))
+            for suffix in ("-wal", "-shm"):
+                if os.path.isfile(Path(__file__).with_name(name + suffix)):
+                    os.remove(Path(__file__).with_name(name + suffix))
     conn = None
     try:
         conn = sqlite3.connect(Path(__file__).with_name(name))
-
-        sql = """ CREATE TABLE IF NOT EXISTS tasks (
-                            id integer PRIMARY KEY,
-                            name text NOT NULL,
-                            completed integer DEFAULT FALSE);"""
-
-        cursor = conn.cursor()
-        cursor.execute(sql)
-        conn.execute("PRAGMA foreign_keys = 1")
-
-        cursor.execute("""
-                       CREATE TABLE IF NOT EXISTS time(
-                        id integer PRIMARY KEY,
-                        task_id integer,
-                        start_date text,
-                        end_date text,
-                        FOREIGN KEY(task_id) REFERENCES tasks(id) ON DELETE CASCADE);""")
-
-        cursor.execute("""
-                       CREATE TABLE IF NOT EXISTS comments(
-                        id integer PRIMARY KEY,
-                        task_id integer,
-                        body text,
-                        FOREIGN KEY(task_id) REFERENCES tasks(id) ON DELETE CASCADE);""")
-
+        create_tables(conn)
         print("Database created sucessfully")
     except Error as e:
         print(e)
@@ -67,17 +70,59 @@ def init_new_database(name: str = "taskminal.db", force: bool = False) -> bool:
         return result
 
 
-def connect_to_db(name: str) -> Connection:
+def create_tables(conn: Connection):
     """
-    Tries to connect with the indicated database. Finishes execution if it can't connect.
+    Creates the tables of a new database, then migrates them to the current schema.
+
+    :param conn Connection: Connection to an empty database.
+    """
+    sql = """ CREATE TABLE IF NOT EXISTS tasks (
+                        id integer PRIMARY KEY,
+                        name text NOT NULL,
+                        completed integer DEFAULT FALSE);"""
+
+    cursor = conn.cursor()
+    cursor.execute(sql)
+    conn.execute("PRAGMA foreign_keys = 1")
+
+    cursor.execute("""
+                   CREATE TABLE IF NOT EXISTS time(
+                    id integer PRIMARY KEY,
+                    task_id integer,
+                    start_date text,
+                    end_date text,
+                    FOREIGN KEY(task_id) REFERENCES tasks(id) ON DELETE CASCADE);""")
+
+    cursor.execute("""
+                   CREATE TABLE IF NOT EXISTS comments(
+                    id integer PRIMARY KEY,
+                    task_id integer,
+                    body text,
+                    FOREIGN KEY(task_id) REFERENCES tasks(id) ON DELETE CASCADE);""")
+
+    migrate(conn)
+
+
+def connect_to_db(name: str, tuning: Optional[str] = None) -> Connection:
+    """
+    Tries to connect with the indicated database, and applies a tuning profile to the connection. Finishes execution if it can't connect.
 
     :param name str: Filename of the desired database. Expects an sqlite3 file.
+    :param tuning Optional[str]: Name of the tuning profile. None uses the active profile.
     :rtype Connection: A functional sqlite3 connection, if the database connected.
     """
+    from taskminal.config import apply_tuning, get_tuning
     conn = None
+    settings = get_tuning(tuning)
+    if settings is None:
+        sys.exit(1)
     try:
-        conn = sqlite3.connect(Path(__file__).with_name(name))
+        conn = sqlite3.connect(Path(__file__).with_name(name), factory=TaskminalConnection)
+        if PROFILER is not None:
+            PROFILER.attach(conn)
         conn.execute("PRAGMA foreign_keys = 1")
+        apply_tuning(conn, settings)
+        migrate(conn)
         return conn
     except Error as e:
         print(e)
@@ -90,13 +135,11 @@ def list_databases() -> List:
 
     :rtype List: List of the filename of each .db file in the main folder, as strings.
     """
-    cur = ""
-    if os.path.isfile(Path(__file__).with_name("db.txt")):
-        with open(Path(__file__).with_name("db.txt"), 'r') as f:
-            cur = f.read()
+    from taskminal.config import active_database
+    cur = active_database()
     dir = Path(__file__).parents[0]
     files = list(Path(dir).glob('*.db'))
-    if cur != "":
+    if cur:
         print(f"Active: {cur}")
     for f in files:
         print(f)
@@ -147,121 +190,580 @@ def remove_task_by_index(conn: Connection, index: int) -> bool:
 
 
 # FIXME: Should return just a single task.
-def toggle_task(conn: Connection, id: int) -> List:
+def toggle_task(conn: Connection, id: int) -> List["Task"]:
     """
     If the selected task is marked as completed, sets its as not completed and viceversa.
 
     :param conn Connection: Current sqlite3 connection.
     :param id int: Index of the task to toggle.
-    :rtype List: List of tasks with the selected ID. FIXME: Should return just the single task.
+    :rtype List[Task]: List of tasks with the selected ID. FIXME: Should return just the single task.
     """
-    sql = """UPDATE tasks SET completed = CASE WHEN completed = 0 THEN 1 else 0 END WHERE id = ?; """
-    cursor = conn.cursor()
-    cursor.execute(sql, (id,))
+    sql = "UPDATE tasks SET completed = CASE WHEN completed = 0 THEN 1 ELSE 0 END WHERE id = ?"
+    conn.execute(sql, (id,))
     conn.commit()
     return get_task_by_index(conn, id)
 
 
+def begin_immediate(conn: Connection, attempts: int = 3):
+    """
+    Starts a write transaction right away, instead of on the first write, so no other process can write
+    between the statements run in it. Does nothing if a transaction is already open, as in batch mode.
+    If the database stays locked for longer than the busy timeout, tries again a few times before giving up.
+
+    :param conn Connection: Current sqlite3 connection.
+    :param attempts int: Number of times to try to take the write lock.
+    """
+    if conn.in_transaction:
+        return
+    for attempt in range(attempts):
+        try:
+            conn.execute("BEGIN IMMEDIATE")
+            return
+        except sqlite3.OperationalError as e:
+            if "locked" not in str(e) or attempt == attempts - 1:
+                raise
+            sleep(0.05 * 2 ** attempt)
+
+
 # FIXME: Should return a single task with the id.
 # FIXME: Change Optional[List] to List | None
-def start_task(conn: Connection, id: int) -> Optional[List]:
+def start_task(conn: Connection, id: int) -> Optional[List["Task"]]:
     """
-    Marks the starttime of the selected task as the current datetime, unless it's already not null.
+    Opens a new session of the selected task starting at the current datetime, unless it already has an open one.
+    The session is inserted by a single statement, and the unique time_open index makes a concurrent start of the same task a no-op.
 
     :param conn Connection: Current sqlite3 connection.
     :param id int: ID of the selected task.
-    :rtype Optional[List]: List of tasks with the selected index, or None if the task was already started.
+    :rtype Optional[List[Task]]: List of tasks with the selected index, or None if the task doesn't exist or was already started.
     """
-    if len(get_task_by_index(conn, id)) == 0:
+    from taskminal.repository import task_exists
+    sql = "INSERT OR IGNORE INTO time(start_date, task_id) SELECT ?, id FROM tasks WHERE id = ?"
+    now = int(datetime.now().timestamp())
+    try:
+        begin_immediate(conn)
+        opened = conn.execute(sql, (now, id)).rowcount == 1
+        exists = opened or task_exists(conn, id)
+        conn.commit()
+    except Error as e:
+        conn.rollback()
+        print(e)
+        return
+    if exists is False:
         print("Task does not exist.")
         return
-    sql = "SELECT * from time where task_id=? and end_date is null"
-    cursor = conn.cursor()
-    cursor.execute(sql, (id,))
-    result = cursor.fetchall()
-    if len(result) != 0:
+    if opened is False:
         print("This task is already open")
         return
-    sql = "INSERT INTO time(start_date,task_id) VALUES(?,?)"
-    now = datetime.now()
-    now = now.strftime("%m/%d/%Y, %H:%M:%S")
-    cursor.execute(sql, (now, id))
-    conn.commit()
     print("This task is now open")
     return get_task_by_index(conn, id)
 
 
 # FIXME: Change Optional[List] to List | None
-def stop_task(conn: Connection, id: int) -> Optional[List]:
-    if len(get_task_by_index(conn, id)) == 0:
+def stop_task(conn: Connection, id: int) -> Optional[List["Task"]]:
+    """
+    Closes the open session of the selected task at the current datetime, with a single UPDATE.
+
+    :param conn Connection: Current sqlite3 connection.
+    :param id int: ID of the selected task.
+    :rtype Optional[List[Task]]: List of tasks with the selected index, or None if the task doesn't exist or wasn't started.
+    """
+    from taskminal.repository import task_exists
+    sql = "UPDATE time SET end_date = ? WHERE task_id = ? AND end_date IS NULL"
+    now = int(datetime.now().timestamp())
+    try:
+        begin_immediate(conn)
+        closed = conn.execute(sql, (now, id)).rowcount == 1
+        exists = closed or task_exists(conn, id)
+        conn.commit()
+    except Error as e:
+        conn.rollback()
+        print(e)
+        return
+    if exists is False:
         print("Task does not exist.")
         return
-    sql = "SELECT * from time WHERE task_id=? AND end_date is null"
-    cursor = conn.cursor()
-    cursor.execute(sql, (id,))
-    result = cursor.fetchall()
-    if len(result) == 0:
+    if closed is False:
         print("This task isn't open")
         return
-    sql = "UPDATE time set end_date = ? where task_id=? and end_date is null"
-    now = datetime.now()
-    now = now.strftime("%m/%d/%Y, %H:%M:%S")
-    cursor.execute(sql, (now, id))
-    conn.commit()
     print("This task is now closed.")
     return get_task_by_index(conn, id)
 
 
+def parse_ids(value: str) -> Optional[List[Tuple[int, int]]]:
+    """
+    Parses a list of task ids and ranges of ids, such as 1,4,7-200.
+
+    :param value str: Comma separated ids and ranges. Both ends of a range are included.
+    :rtype Optional[List[Tuple[int, int]]]: (first, last) of each id or range, or None if the list is invalid.
+    """
+    ranges = []
+    for part in value.split(","):
+        first, _, last = part.strip().partition("-")
+        try:
+            first, last = int(first), int(last or first)
+        except ValueError:
+            print(f"Invalid task ids: {value}. Use ids and ranges such as 1,4,7-200.")
+            return None
+        ranges.append((min(first, last), max(first, last)))
+    return ranges
+
+
+def _ids_condition(ranges: Optional[List[Tuple[int, int]]], column: str = "id") -> Tuple[str, List[int]]:
+    """
+    Returns the condition matching a list of id ranges, so every id is handled by a single statement.
+    Each range is a BETWEEN, which SQLite serves with a range scan of the primary key or index.
+
+    :param ranges Optional[List[Tuple[int, int]]]: Ranges returned by parse_ids. None matches every id.
+    :param column str: Column holding the task id.
+    :rtype Tuple[str, List[int]]: Condition for a WHERE clause and its parameters.
+    """
+    if ranges is None:
+        return "1", []
+    condition = " OR ".join(f"{column} BETWEEN ? AND ?" for _ in ranges)
+    return f"({condition})", [bound for pair in ranges for bound in pair]
+
+
+def _count_tasks(count: int) -> str:
+    return f"{count} task{'' if count == 1 else 's'}"
+
+
+def _run_bulk(conn: Connection, statements: List[Tuple[str, List]]) -> Optional[List[int]]:
+    """
+    Runs statements in a single write transaction.
+
+    :param conn Connection: Current sqlite3 connection.
+    :param statements List[Tuple[str, List]]: SQL statements and their parameters.
+    :rtype Optional[List[int]]: Number of rows changed by each statement, or None if the transaction was rolled back.
+    """
+    try:
+        begin_immediate(conn)
+        counts = [conn.execute(sql, params).rowcount for sql, params in statements]
+        conn.commit()
+        return counts
+    except Error as e:
+        conn.rollback()
+        print(e)
+        return None
+
+
+def delete_tasks(conn: Connection, ranges: List[Tuple[int, int]]) -> Optional[int]:
+    """
+    Deletes every task in the ranges, with their time logs and comments, in one statement.
+
+    :param conn Connection: Current sqlite3 connection.
+    :param ranges List[Tuple[int, int]]: Ranges of task ids, as returned by parse_ids. Ids without a task are skipped.
+    :rtype Optional[int]: Number of tasks deleted, or None if it failed.
+    """
+    condition, params = _ids_condition(ranges)
+    counts = _run_bulk(conn, [(f"DELETE FROM tasks WHERE {condition}", params)])
+    if counts is None:
+        return None
+    print(f"{_count_tasks(counts[0])} deleted.")
+    return counts[0]
+
+
+def start_tasks(conn: Connection, ranges: List[Tuple[int, int]]) -> Optional[int]:
+    """
+    Opens a session on every task in the ranges that doesn't have one yet, in one statement.
+
+    :param conn Connection: Current sqlite3 connection.
+    :param ranges List[Tuple[int, int]]: Ranges of task ids, as returned by parse_ids. Ids without a task are skipped.
+    :rtype Optional[int]: Number of tasks started, or None if it failed.
+    """
+    condition, params = _ids_condition(ranges)
+    sql = f"INSERT OR IGNORE INTO time(start_date, task_id) SELECT ?, id FROM tasks WHERE {condition}"
+    counts = _run_bulk(conn, [(sql, [int(datetime.now().timestamp())] + params)])
+    if counts is None:
+        return None
+    print(f"{_count_tasks(counts[0])} started.")
+    return counts[0]
+
+
+def stop_tasks(conn: Connection, ranges: Optional[List[Tuple[int, int]]] = None) -> Optional[int]:
+    """
+    Closes the open session of every task in the ranges, in one statement.
+
+    :param conn Connection: Current sqlite3 connection.
+    :param ranges Optional[List[Tuple[int, int]]]: Ranges of task ids, as returned by parse_ids. None stops every running task.
+    :rtype Optional[int]: Number of tasks stopped, or None if it failed.
+    """
+    condition, params = _ids_condition(ranges, "task_id")
+    sql = f"UPDATE time SET end_date = ? WHERE end_date IS NULL AND {condition}"
+    counts = _run_bulk(conn, [(sql, [int(datetime.now().timestamp())] + params)])
+    if counts is None:
+        return None
+    print(f"{_count_tasks(counts[0])} stopped.")
+    return counts[0]
+
+
+def done_tasks(conn: Connection, ranges: List[Tuple[int, int]], toggle: bool = False) -> Optional[Tuple[int, int]]:
+    """
+    Closes the open sessions of every task in the ranges and marks them as completed, with one statement each, in a single transaction.
+    Tasks that are already completed stay completed, unless toggle is set.
+
+    :param conn Connection: Current sqlite3 connection.
+    :param ranges List[Tuple[int, int]]: Ranges of task ids, as returned by parse_ids. Ids without a task are skipped.
+    :param toggle bool: Toggle whether each task is completed instead, like toggle_task, marking completed tasks as not completed.
+    :rtype Optional[Tuple[int, int]]: Number of tasks marked as completed and as not completed, or None if it failed.
+    """
+    condition, params = _ids_condition(ranges)
+    try:
+        begin_immediate(conn)
+        total, completed = conn.execute(f"SELECT COUNT(*), COALESCE(SUM(completed = 0), 0) FROM tasks WHERE {condition}", params).fetchone()
+        conn.execute(f"UPDATE time SET end_date = ? WHERE end_date IS NULL AND {_ids_condition(ranges, 'task_id')[0]}",
+                     [int(datetime.now().timestamp())] + params)
+        if toggle:
+            conn.execute(f"UPDATE tasks SET completed = CASE WHEN completed = 0 THEN 1 ELSE 0 END WHERE {condition}", params)
+        else:
+            conn.execute(f"UPDATE tasks SET completed = 1 WHERE completed = 0 AND ({condition})", params)
+        conn.commit()
+    except Error as e:
+        conn.rollback()
+        print(e)
+        return None
+    reopened = total - completed if toggle else 0
+    if total == 0:
+        print("No tasks found.")
+    if completed:
+        print(f"{_count_tasks(completed)} marked as completed.")
+    if reopened:
+        print(f"{_count_tasks(reopened)} marked as not completed.")
+    elif total - completed:
+        print(f"{_count_tasks(total - completed)} already completed.")
+    return completed, reopened
+
+
 # FIXME: Should return just a single task, no two tasks have the same ID.
-def get_task_by_index(conn: Connection, id: int) -> List:
+def get_task_by_index(conn: Connection, id: int) -> List["Task"]:
     """
     Returns list of tasks with the selected index.
 
     :param conn Connection: Current sqlite3 connection.
     :param id int: ID of the task to find.
-    :rtype List: List of tasks with the selected index.
+    :rtype List[Task]: List of tasks with the selected index.
     """
-    sql = "SELECT * from tasks WHERE id=?"
-    cursor = conn.cursor()
-    cursor.execute(sql, (id,))
-    return cursor.fetchall()
+    from taskminal.repository import get_task
+    task = get_task(conn, id)
+    return [] if task is None else [task]
 
 
 def get_time(conn: Connection, id: int) -> str:
     """
     Returns total time spent on a task, if it has been started and stopped at least once.
+    Reads the totals stored in the task, so it doesn't depend on the number of sessions.
 
     :param conn Connection: Current sqlite3 connection.
     :param id int: ID of the chosen task.
     :rtype str: Total time spent as a string formatted as H:MM:SS, or Not Started.
     """
-    sql = "SELECT * from time WHERE task_id=?"
+    sql = "SELECT sessions, total_seconds from tasks WHERE id=?"
     cursor = conn.cursor()
     cursor.execute(sql, (id,))
-    result = cursor.fetchall()
-    diff = timedelta()
-    if len(result) != 0:
-        for r in result:
-            (_, _, start_date, end_date) = r
-            startTime = datetime.strptime(start_date, "%m/%d/%Y, %H:%M:%S") if start_date else timedelta()
-            endTime = datetime.strptime(end_date, "%m/%d/%Y, %H:%M:%S") if end_date else startTime
-            diff += endTime-startTime
-        return str(diff)
-    else:
-        return "Not started"
+    result = cursor.fetchone()
+    if result is None or result[0] == 0:
+        return format_seconds(None)
+    return format_seconds(result[1])
 
 
-def get_all_tasks(conn: Connection) -> List:
+def rebuild_totals(conn: Connection):
     """
-    Returns list of all tasks.
+    Recomputes the total time, number of sessions and last activity of every task from the time table.
+    They are kept up to date by triggers, so this is only needed if the time table was modified with the triggers disabled.
+
+    :param conn Connection: Current sqlite3 connection.
+    """
+    sql = f"""UPDATE tasks SET
+              total_seconds = COALESCE((SELECT SUM(end_date - start_date) FROM time WHERE time.task_id = tasks.id), 0),
+              sessions = (SELECT COUNT(*) FROM time WHERE time.task_id = tasks.id),
+              last_active = COALESCE({LATEST_ACTIVITY}, 0)"""
+    conn.execute(sql)
+    conn.commit()
+
+
+def get_all_tasks(conn: Connection) -> List["Task"]:
+    """
+    Returns list of all tasks. Use repository.iter_tasks to walk them without loading them all at once.
 
     :param conn Connection: Current sqlite3 connection
-    :rtype List: List of all tasks in the current database.
+    :rtype List[Task]: List of all tasks in the current database, in id order.
     """
-    sql = "SELECT * FROM tasks"
-    cursor = conn.cursor()
-    cursor.execute(sql)
-    return cursor.fetchall()
+    from taskminal.repository import iter_tasks
+    return list(iter_tasks(conn))
+
+
+# Columns each way to sort tasks orders by, and whether the order is descending.
+SORTS: Dict[str, Tuple[Tuple[str, ...], bool]] = {
+    "id": (("id",), False),
+    "time": (("total_seconds", "id"), True),
+    "activity": (("last_active", "id"), True),
+}
+
+
+def _order_by(columns: Tuple[str, ...], descending: bool, prefix: str = "") -> str:
+    """
+    Returns the ORDER BY terms of a sort from SORTS.
+
+    :param columns Tuple[str, ...]: Columns to order by.
+    :param descending bool: Order every column in descending order.
+    :param prefix str: Table name, with a trailing dot, to qualify the columns with.
+    :rtype str: Comma separated ORDER BY terms.
+    """
+    return ", ".join(f"{prefix}{column}{' DESC' if descending else ''}" for column in columns)
+
+
+def list_tasks(conn: Connection, completed: Optional[bool] = None, comments: bool = True, name: Optional[str] = None,
+               sort: str = "id", limit: Optional[int] = None, after: Optional[int] = None) -> Cursor:
+    """
+    Returns a cursor over tasks joined with their total time and, optionally, their comments, in a single query.
+    Each row is a TaskListing. Tasks with several comments span several consecutive rows.
+    Filters, sorting and pagination are done by SQLite, so only the tasks of the requested page are read.
+
+    :param conn Connection: Current sqlite3 connection.
+    :param completed Optional[bool]: Only return completed (True) or unfinished (False) tasks. None returns every task.
+    :param comments bool: Join the comments of each task. If False, comment_id and comment_body are always None.
+    :param name Optional[str]: Only return tasks whose name contains this text, ignoring case.
+    :param sort str: "id" sorts by ascending id, "time" by most time spent and "activity" by most recently worked on.
+    :param limit Optional[int]: Maximum number of tasks returned. None returns every task.
+    :param after Optional[int]: Only return tasks that come after the task with this id in the chosen order.
+    :rtype Cursor: Cursor over the resulting TaskListing rows, in the chosen order and then by comment id.
+    """
+    from taskminal.repository import TaskListing, records
+    columns, descending = SORTS[sort]
+    conditions = ["1"]
+    params: List = []
+    if completed is not None:
+        conditions.append("completed = ?")
+        params.append(completed)
+    if name:
+        conditions.append("name LIKE ? ESCAPE '\\'")
+        params.append("%" + name.replace("\\", "\\\\").replace("%", "\\%").replace("_", "\\_") + "%")
+    if after is not None:
+        comparison = "<" if descending else ">"
+        if columns == ("id",):
+            conditions.append(f"id {comparison} ?")
+        else:
+            conditions.append(f"({', '.join(columns)}) {comparison} (SELECT {', '.join(columns)} FROM tasks WHERE id = ?)")
+        params.append(after)
+    params.append(-1 if limit is None else limit)
+    comment_columns = "comments.id, comments.body" if comments else "NULL, NULL"
+    comment_join = "LEFT JOIN comments ON comments.task_id = page.id" if comments else ""
+    sql = f"""SELECT page.id, page.name, page.completed,
+                     CASE WHEN page.sessions > 0 THEN page.total_seconds END,
+                     {comment_columns}
+              FROM (SELECT id, name, completed, total_seconds, sessions, last_active FROM tasks
+                    WHERE {" AND ".join(conditions)}
+                    ORDER BY {_order_by(columns, descending)} LIMIT ?) AS page
+              {comment_join}
+              ORDER BY {_order_by(columns, descending, "page.")}{", comments.id" if comments else ""}"""
+    return records(conn.execute(sql, params), TaskListing)
+
+
+def format_seconds(seconds: Optional[int]) -> str:
+    """
+    Formats an amount of seconds the same way get_time does.
+
+    :param seconds Optional[int]: Total seconds, or None if the task was never started.
+    :rtype str: Total time spent as a string formatted as H:MM:SS, or Not started.
+    """
+    if seconds is None:
+        return "Not started"
+    return str(timedelta(seconds=seconds))
+
+
+def print_task_list(conn: Connection, completed: Optional[bool] = None, comments: bool = True, name: Optional[str] = None,
+                    sort: str = "id", limit: Optional[int] = None, after: Optional[int] = None):
+    """
+    Prints tasks, their time spent and their comments, streaming the rows from list_tasks as they are read.
+    If a limit is set and there may be more tasks, tells how to see the next page.
+
+    :param conn Connection: Current sqlite3 connection.
+    :param completed Optional[bool]: Only show completed (True) or unfinished (False) tasks. None shows every task.
+    :param comments bool: Show the comments of each task.
+    :param name Optional[str]: Only show tasks whose name contains this text, ignoring case.
+    :param sort str: "id", "time" or "activity", see list_tasks.
+    :param limit Optional[int]: Maximum number of tasks shown. None shows every task.
+    :param after Optional[int]: Only show tasks that come after the task with this id in the chosen order.
+    """
+    current = None
+    count = 0
+    for row in list_tasks(conn, completed, comments, name, sort, limit, after):
+        if row.id != current:
+            if current is not None:
+                print("---------")
+            current = row.id
+            count += 1
+            checkmark = "✔" if row.completed else ""
+            print(('[{0}] - {1} [{2}]\nTime spent: {3}').format(row.id, row.name, checkmark, format_seconds(row.seconds)))
+            if row.comment_id is not None:
+                print("Comments:")
+        if row.comment_id is not None:
+            print(('[{0}] {1}').format(row.comment_id, row.comment_body))
+    if current is not None:
+        print("---------")
+    if current is not None and count == limit:
+        print(f"Use --after {current} to see the next page.")
+
+
+def open_sessions(conn: Connection) -> List["OpenSession"]:
+    """
+    Returns the sessions still running, oldest first. A single query, served by the time_open index, which only holds open sessions.
+
+    :param conn Connection: Current sqlite3 connection.
+    :rtype List[OpenSession]: Every open session, with the name of its task.
+    """
+    from taskminal.repository import OpenSession, records
+    sql = """SELECT tasks.id, tasks.name, time.start_date FROM time JOIN tasks ON tasks.id = time.task_id
+             WHERE time.end_date IS NULL ORDER BY time.start_date, tasks.id"""
+    return records(conn.execute(sql), OpenSession).fetchall()
+
+
+def format_status(sessions: List["OpenSession"], now: int) -> str:
+    """
+    Formats open sessions with their elapsed time, one per line.
+
+    :param sessions List[OpenSession]: Open sessions, as returned by open_sessions.
+    :param now int: Current unix timestamp.
+    :rtype str: Text to print, without a trailing newline.
+    """
+    if len(sessions) == 0:
+        return "No timers running."
+    today = datetime.fromtimestamp(now).date()
+    lines = []
+    for session in sessions:
+        started = datetime.fromtimestamp(session.start_date)
+        since = started.strftime("%H:%M" if started.date() == today else "%Y-%m-%d %H:%M")
+        lines.append(f"[{session.task_id}] - {session.name}\nRunning: {format_seconds(max(now - session.start_date, 0))} (since {since})")
+    return "\n".join(lines)
+
+
+def print_status(conn: Connection, watch: bool = False, interval: float = 1.0):
+    """
+    Prints the running timers. In watch mode, redraws them every interval until interrupted with Ctrl+C.
+    The open sessions are only queried again when another connection has committed since the last time,
+    which PRAGMA data_version tells without reading the database, so in between only the elapsed times are recomputed.
+
+    :param conn Connection: Current sqlite3 connection.
+    :param watch bool: Keep refreshing instead of printing once.
+    :param interval float: Seconds between refreshes in watch mode.
+    """
+    version = conn.execute("PRAGMA data_version").fetchone()[0]
+    sessions = open_sessions(conn)
+    if watch is False:
+        print(format_status(sessions, int(datetime.now().timestamp())))
+        return
+    clear = "\033[H\033[J" if sys.stdout.isatty() else ""
+    try:
+        while True:
+            current = conn.execute("PRAGMA data_version").fetchone()[0]
+            if current != version:
+                version = current
+                sessions = open_sessions(conn)
+            print(clear + format_status(sessions, int(datetime.now().timestamp())), flush=True)
+            sleep(interval)
+    except KeyboardInterrupt:
+        pass
+
+
+def has_search_index(conn: Connection) -> bool:
+    """
+    Checks whether the database has the FTS5 search index. It's missing if SQLite was built without FTS5.
+
+    :param conn Connection: Current sqlite3 connection.
+    :rtype bool: True if tasks_fts and comments_fts exist.
+    """
+    sql = "SELECT COUNT(*) FROM sqlite_master WHERE type = 'table' AND name IN ('tasks_fts', 'comments_fts')"
+    return conn.execute(sql).fetchone()[0] == 2
+
+
+def _match_query(query: str) -> str:
+    """
+    Turns free text into an FTS5 query matching every word, each one as a prefix, so punctuation can't cause syntax errors.
+
+    :param query str: Text to search for.
+    :rtype str: FTS5 MATCH expression.
+    """
+    return " ".join('"' + word.replace('"', '""') + '"*' for word in query.split())
+
+
+def search(conn: Connection, query: str, limit: int = 20, raw: bool = False) -> List[Tuple[str, int, str, Optional[int], str]]:
+    """
+    Searches task names and comment bodies, best matches first, ranked by bm25.
+    Without the FTS5 search index, falls back to a case insensitive LIKE scan in id order.
+
+    :param conn Connection: Current sqlite3 connection.
+    :param query str: Words to search for. Every word must appear, as a whole word or a word prefix.
+    :param limit int: Maximum number of results.
+    :param raw bool: Pass query to FTS5 as is, allowing its full query syntax (OR, NOT, "phrases", NEAR...).
+    :rtype List[Tuple[str, int, str, Optional[int], str]]: (kind, task id, task name, comment id, matched text) rows, kind being "task" or "comment".
+        Matched terms are wrapped in square brackets. comment id is None for task matches.
+    """
+    if has_search_index(conn) is False:
+        pattern = "%" + query.replace("\\", "\\\\").replace("%", "\\%").replace("_", "\\_") + "%"
+        sql = """SELECT * FROM (SELECT 'task', id, name, NULL, name FROM tasks WHERE name LIKE :pattern ESCAPE '\\' ORDER BY id LIMIT :limit)
+                 UNION ALL
+                 SELECT * FROM (SELECT 'comment', tasks.id, tasks.name, comments.id, comments.body
+                                FROM comments JOIN tasks ON tasks.id = comments.task_id
+                                WHERE comments.body LIKE :pattern ESCAPE '\\' ORDER BY comments.id LIMIT :limit)
+                 LIMIT :limit"""
+        return conn.execute(sql, {"pattern": pattern, "limit": limit}).fetchall()
+    match = query if raw else _match_query(query)
+    if match.strip() == "":
+        return []
+    # Each index returns its own best matches first, so FTS5 only ranks and reads up to limit rows from each.
+    sql = """SELECT kind, task_id, name, comment_id, text FROM (
+              SELECT * FROM (SELECT 'task' AS kind, tasks.id AS task_id, tasks.name AS name, NULL AS comment_id,
+                                    highlight(tasks_fts, 0, '[', ']') AS text, tasks_fts.rank AS rank
+                             FROM tasks_fts JOIN tasks ON tasks.id = tasks_fts.rowid
+                             WHERE tasks_fts MATCH :match ORDER BY tasks_fts.rank LIMIT :limit)
+              UNION ALL
+              SELECT * FROM (SELECT 'comment', tasks.id, tasks.name, comments.id,
+                                    snippet(comments_fts, 0, '[', ']', '...', 16), comments_fts.rank
+                             FROM comments_fts JOIN comments ON comments.id = comments_fts.rowid
+                             JOIN tasks ON tasks.id = comments.task_id
+                             WHERE comments_fts MATCH :match ORDER BY comments_fts.rank LIMIT :limit))
+             ORDER BY rank LIMIT :limit"""
+    try:
+        return conn.execute(sql, {"match": match, "limit": limit}).fetchall()
+    except Error as e:
+        print(e)
+        return []
+
+
+def print_search(conn: Connection, query: str, limit: int = 20, raw: bool = False) -> bool:
+    """
+    Prints the results of a search, one per line, with the id of the task they belong to.
+
+    :param conn Connection: Current sqlite3 connection.
+    :param query str: Words to search for, see search.
+    :param limit int: Maximum number of results.
+    :param raw bool: Pass query to FTS5 as is.
+    :rtype bool: True if anything was found.
+    """
+    results = search(conn, query, limit, raw)
+    for kind, task_id, task_name, comment_id, text in results:
+        if kind == "task":
+            print(f"[{task_id}] {text}")
+        else:
+            print(f"[{task_id}] {task_name}\n    Comment [{comment_id}]: {text}")
+    if len(results) == 0:
+        print("No matches found.")
+    return len(results) != 0
+
+
+def rebuild_search_index(conn: Connection) -> bool:
+    """
+    Rebuilds the search index from the tasks and comments tables.
+    It's kept up to date by triggers, so this is only needed if those tables were modified with the triggers disabled.
+
+    :param conn Connection: Current sqlite3 connection.
+    :rtype bool: False if the database has no search index.
+    """
+    if has_search_index(conn) is False:
+        return False
+    conn.execute("INSERT INTO tasks_fts(tasks_fts) VALUES('rebuild')")
+    conn.execute("INSERT INTO comments_fts(comments_fts) VALUES('rebuild')")
+    conn.commit()
+    return True
 
 
 def add_comment(conn: Connection, id: int, comment: str) -> Optional[int]:
@@ -273,7 +775,8 @@ def add_comment(conn: Connection, id: int, comment: str) -> Optional[int]:
     :param comment str: Content of the comment you want to add.
     :rtype Optional[int]: id of the created comment, or None if task doesn't exist.
     """
-    if len(get_task_by_index(conn, id)) == 0:
+    from taskminal.repository import task_exists
+    if task_exists(conn, id) is False:
         print("Task does not exist.")
         return
     sql = """INSERT INTO comments(task_id,body) VALUES(?,?)"""
@@ -285,21 +788,19 @@ def add_comment(conn: Connection, id: int, comment: str) -> Optional[int]:
     return id
 
 
-def get_comments_by_task_index(conn: Connection, id: int) -> List:
+def get_comments_by_task_index(conn: Connection, id: int) -> List["Comment"]:
     """
     Returns all comments of a single task.
 
     :param conn Connection: Current sqlite3 connection.
     :param id int: ID of the chosen task.
-    :rtype List: List of all comments from the chosen task.
+    :rtype List[Comment]: List of all comments from the chosen task, in the order they were added.
     """
-    if len(get_task_by_index(conn, id)) == 0:
+    from taskminal.repository import iter_comments, task_exists
+    if task_exists(conn, id) is False:
         print("Task does not exist.")
         return []
-    sql = "SELECT * FROM comments WHERE task_id = ?"
-    cursor = conn.cursor()
-    cursor.execute(sql, (id,))
-    return cursor.fetchall()
+    return list(iter_comments(conn, id))
 
 
 # FIXME: Do error handling.
@@ -333,165 +834,693 @@ def close_connection(conn: Connection):
 
 def cleanup():
     """
-    Deletes all .db files on the main folder, plus the db.txt file if it exists.
+    Deletes all .db files on the main folder, along with their -wal and -shm files and their archives, plus the config and db.txt files if they exist.
 
     """
+    from taskminal.config import config_path
     print("This will delete all databases, active or otherwise. Do you wish to continue? [y/N]")
     answer = input().lower()
     if answer == "n":
         return
     if os.path.isfile(Path(__file__).with_name("db.txt")):
         os.remove(Path(__file__).with_name("db.txt"))
+    if os.path.isfile(config_path()):
+        os.remove(config_path())
     dir = Path(__file__).parents[0]
-    files = list(Path(dir).glob('*.db'))
+    files = list(Path(dir).glob('*.db')) + list(Path(dir).glob('*.db-wal')) + list(Path(dir).glob('*.db-shm')) + list(Path(dir).glob('*.archive'))
     for f in files:
         os.remove(f)
 
 
-# TODO: Rewrite this with Jinja2.
-def generate_month_report(conn: Connection):
+def _date_range(start: Optional[int], end: Optional[int], column: str = "time.start_date") -> Tuple[str, List[int]]:
     """
-    Deprecated: Will be rewritten.
+    Returns the conditions and parameters that keep the sessions starting within a date range.
 
-    :param conn Connection: [TODO:description]
+    :param start Optional[int]: Earliest start date, as a unix timestamp. None sets no lower bound.
+    :param end Optional[int]: Start dates must be before this unix timestamp. None sets no upper bound.
+    :param column str: Column holding the start date.
+    :rtype Tuple[str, List[int]]: Conditions to add to a WHERE clause, each one starting with AND, and their parameters.
     """
-    print("Generating report...")
-    dates = []
-    sql = "SELECT * from time WHERE start_date is not null and end_date is not null"
-    cursor = conn.cursor()
-    cursor.execute(sql)
-    result = cursor.fetchall()
-    for _, task_id, start, end in result:
-        startTime = datetime.strptime(start, "%m/%d/%Y, %H:%M:%S")
-        endTime = datetime.strptime(end, "%m/%d/%Y, %H:%M:%S")
-        month = startTime.strftime("%B")
-        diff = endTime - startTime
-        dates.append((month, task_id, startTime, endTime, diff))
-    dates = sorted(dates, key=lambda month: month[0], reverse=True)
-    months = set([a[0] for a in dates])
-    rep = Report()
-    month_lookup = list(month_name)
-    for m in sorted(months, key=month_lookup.index):
-        tasks = [a for a in dates if a[0] == m]
-        monthtotal = timedelta()
-        rep.add_month(m.upper())
-        for t in tasks:
-            task = get_task_by_index(conn, t[1])[0]
-            total = t[3] - t[2]
-            monthtotal += total
-            rep.add_task(task[1], t[2], t[3], total)
-        rep.add_total(monthtotal)
-        rep.close_report()
-    print("Report generated. Opening now.")
-    webbrowser.open('file://' + os.path.realpath('report.html'))
+    conditions = ""
+    params = []
+    if start is not None:
+        conditions += f" AND {column} >= ?"
+        params.append(start)
+    if end is not None:
+        conditions += f" AND {column} < ?"
+        params.append(end)
+    return conditions, params
+
+
+def month_report_rows(conn: Connection, start: Optional[int] = None, end: Optional[int] = None) -> Cursor:
+    """
+    Returns a cursor over every closed session joined with its task, ordered by start date, as ReportSession rows.
 
+    :param conn Connection: Current sqlite3 connection.
+    :param start Optional[int]: Only return sessions started at or after this unix timestamp.
+    :param end Optional[int]: Only return sessions started before this unix timestamp.
+    :rtype Cursor: Cursor over the resulting rows.
+    """
+    from taskminal.repository import ReportSession, records
+    conditions, params = _date_range(start, end)
+    sql = f"""SELECT strftime('%Y-%m', time.start_date, 'unixepoch', 'localtime'), tasks.name,
+                     time.start_date, time.end_date, time.end_date - time.start_date
+              FROM time JOIN tasks ON tasks.id = time.task_id
+              WHERE time.start_date IS NOT NULL AND time.end_date IS NOT NULL{conditions}
+              ORDER BY time.start_date"""
+    return records(conn.execute(sql, params), ReportSession)
 
-def main():
-    parser = argparse.ArgumentParser(prog='taskminal')
-    subparsers = parser.add_subparsers(title="Action", help="The action to run.", required=True, dest="command")
 
-    parser_create = subparsers.add_parser("createdb", help="Create a new database")
-    parser_create.add_argument("name", help="Name of the new database.")
-    parser_create.add_argument("-f", action="store_true", help="Force the creation of this database even if it already exists.")
+def refresh_report_cache(conn: Connection) -> int:
+    """
+    Recomputes the rows of report_cache marked as stale by the triggers on time, and drops the ones left without sessions.
+    Each row only reads the sessions of its task within its month, through the time_task index.
 
-    parser_connect = subparsers.add_parser("set", help="Sets an active database.")
-    parser_connect.add_argument("name", help="Name of the database you want to use.")
+    :param conn Connection: Current sqlite3 connection.
+    :rtype int: Number of rows recomputed.
+    """
+    sql = """UPDATE report_cache SET (seconds, sessions) = (
+              SELECT COALESCE(SUM(end_date - start_date), 0), COUNT(*) FROM time
+              WHERE time.task_id = report_cache.task_id AND end_date IS NOT NULL
+              AND start_date >= CAST(strftime('%s', report_cache.month || '-01', 'utc') AS INTEGER)
+              AND start_date < CAST(strftime('%s', report_cache.month || '-01', '+1 month', 'utc') AS INTEGER))
+             WHERE seconds IS NULL"""
+    # Checking first avoids taking the write lock when nothing changed.
+    if conn.execute("SELECT EXISTS(SELECT 1 FROM report_cache WHERE seconds IS NULL)").fetchone()[0] == 0:
+        return 0
+    count = conn.execute(sql).rowcount
+    conn.execute("DELETE FROM report_cache WHERE sessions = 0")
+    conn.commit()
+    return count
 
-    subparsers.add_parser("listdb", help="Shows all created databases")
 
-    parser_add_task = subparsers.add_parser("new", aliases=["add"], help="Adds a new task")
-    parser_add_task.add_argument("title", help="Name of the task")
-    parser_add_task.add_argument("-s", action="store_true", help="Automatically start the task after adding it.")
+def rebuild_report_cache(conn: Connection):
+    """
+    Throws away report_cache and computes it again from the time table.
+    It's kept up to date by triggers, so this is only needed if the time table was modified with the triggers disabled,
+    or after changing time zones, since months are stored in local time.
 
-    parser_list = subparsers.add_parser("list", help="Lists all tasks")
-    group = parser_list.add_mutually_exclusive_group()
-    group.add_argument("-c", action="store_true", help="Show only completed tasks.")
-    group.add_argument("-u", action="store_true", help="Show only unfinished tasks.")
-    parser_list.add_argument("-nc", action="store_true", help="Don't show comments.")
+    :param conn Connection: Current sqlite3 connection.
+    """
+    conn.execute("DELETE FROM report_cache")
+    conn.execute("""INSERT INTO report_cache(month, task_id)
+                    SELECT DISTINCT strftime('%Y-%m', start_date, 'unixepoch', 'localtime'), task_id FROM time
+                    WHERE start_date IS NOT NULL AND end_date IS NOT NULL""")
+    conn.commit()
+    refresh_report_cache(conn)
 
-    parser_delete = subparsers.add_parser("delete", aliases=['remove'], help="Removes a task by its index.")
-    parser_delete.add_argument("index", help="Index of the task you want to remove.")
 
-    parser_start = subparsers.add_parser("start", help="Marks the current date/time as the start point for this session. Call stop when you're done with this task for now.")
-    parser_start.add_argument("index", help="Index of the task you want to update.")
+def month_totals(conn: Connection, start: Optional[int] = None, end: Optional[int] = None) -> Dict[str, int]:
+    """
+    Returns the total time logged on closed sessions per month.
+    Without a date range they are read from report_cache, where only the months changed since the last call are recomputed,
+    unless the archive is attached, since the cache only covers the active database.
 
-    parser_stop = subparsers.add_parser("stop", help="Stops working on this task.")
-    parser_stop.add_argument("index", help="Task index")
+    :param conn Connection: Current sqlite3 connection.
+    :param start Optional[int]: Only count sessions started at or after this unix timestamp.
+    :param end Optional[int]: Only count sessions started before this unix timestamp.
+    :rtype Dict[str, int]: Total seconds keyed by month, formatted as YYYY-MM in local time.
+    """
+    from taskminal.archive import has_archive
+    if start is None and end is None and has_archive(conn) is False:
+        refresh_report_cache(conn)
+        return dict(conn.execute("SELECT month, SUM(seconds) FROM report_cache GROUP BY month ORDER BY month"))
+    conditions, params = _date_range(start, end, "start_date")
+    sql = f"""SELECT strftime('%Y-%m', start_date, 'unixepoch', 'localtime') AS month, SUM(end_date - start_date)
+              FROM time
+              WHERE end_date IS NOT NULL{conditions}
+              GROUP BY month ORDER BY month"""
+    return dict(conn.execute(sql, params))
+
+
+def month_task_totals(conn: Connection, start: Optional[int] = None, end: Optional[int] = None) -> Cursor:
+    """
+    Returns a cursor over the time logged on each task per month, as TaskMonth rows, ordered by month and then by most time spent.
+    Without a date range they are read from report_cache, unless the archive is attached.
 
-    parser_complete = subparsers.add_parser("done", help="Completes the task with the given index.")
-    parser_complete.add_argument("index", help="Index of the task.")
+    :param conn Connection: Current sqlite3 connection.
+    :param start Optional[int]: Only count sessions started at or after this unix timestamp.
+    :param end Optional[int]: Only count sessions started before this unix timestamp.
+    :rtype Cursor: Cursor over the resulting rows.
+    """
+    from taskminal.archive import has_archive
+    from taskminal.repository import TaskMonth, records
+    if start is None and end is None and has_archive(conn) is False:
+        refresh_report_cache(conn)
+        sql = """SELECT report_cache.month, tasks.name, report_cache.seconds, report_cache.sessions
+                 FROM report_cache JOIN tasks ON tasks.id = report_cache.task_id
+                 ORDER BY report_cache.month, report_cache.seconds DESC, tasks.id"""
+        return records(conn.execute(sql), TaskMonth)
+    conditions, params = _date_range(start, end)
+    sql = f"""SELECT strftime('%Y-%m', time.start_date, 'unixepoch', 'localtime') AS month, tasks.name,
+                     SUM(time.end_date - time.start_date) AS seconds, COUNT(*)
+              FROM time JOIN tasks ON tasks.id = time.task_id
+              WHERE time.end_date IS NOT NULL{conditions}
+              GROUP BY month, tasks.id
+              ORDER BY month, seconds DESC, tasks.id"""
+    return records(conn.execute(sql, params), TaskMonth)
+
+
+def generate_month_report(conn: Connection, output: Optional[str] = None, summary: bool = False, fmt: str = "html",
+                          start: Optional[int] = None, end: Optional[int] = None):
+    """
+    Writes a report with every closed session grouped by month, plus the total time of each month.
+    The report is streamed to the output as the sessions are read. HTML reports written to a file are opened in the browser afterwards.
+    Archived sessions are included when the date range reaches them.
 
-    parser_comment = subparsers.add_parser("comment", help="Adds or removes comments from your tasks.")
-    comment_action = parser_comment.add_subparsers(title="Action", help="Add or remove comments from your tasks.", required=True, dest="comment_action")
-    parser_comment_add = comment_action.add_parser("add", help="Add a new comment to the selected task.")
-    parser_comment_add.add_argument("id", help="ID of the desired task.")
-    parser_comment_add.add_argument("body", help="Text of the comment you want to add.")
+    :param conn Connection: Current sqlite3 connection.
+    :param output Optional[str]: Path of the report file, or "-" to write it to stdout. None writes HTML to report.html and every other format to stdout.
+    :param summary bool: Show the total time of each task per month instead of every session.
+    :param fmt str: "html", "json", "csv" or "ndjson". Other formats than html write one record per session, or per task and month with summary.
+    :param start Optional[int]: Only report sessions started at or after this unix timestamp.
+    :param end Optional[int]: Only report sessions started before this unix timestamp.
+    """
+    from taskminal.archive import attach_archive, detach_archive
+    from taskminal.report import SESSION_COLUMNS, SUMMARY_COLUMNS, Report, write_report
 
-    parser_comment_delete = comment_action.add_parser("delete", help="Delete a comment by its unique id.")
-    parser_comment_delete.add_argument("comment", help="Index of the comment you want to delete.")
+    def html(report: Report):
+        totals = month_totals(conn, start, end)
+        if summary:
+            report.write_summary(month_task_totals(conn, start, end), totals)
+        else:
+            report.write_months(month_report_rows(conn, start, end), totals)
 
-    subparsers.add_parser("cleanup", help="Deletes every database file. Run this before uninstalling.")
+    def rows():
+        if summary:
+            return month_task_totals(conn, start, end)
+        return ((month, name, datetime.fromtimestamp(begin).isoformat(), datetime.fromtimestamp(finish).isoformat(), seconds)
+                for month, name, begin, finish, seconds in month_report_rows(conn, start, end))
 
-    subparsers.add_parser("report", help="Generates a monthly time report")
+    archived = attach_archive(conn, start)
+    try:
+        write_report(output, fmt, html, SUMMARY_COLUMNS if summary else SESSION_COLUMNS, rows)
+    finally:
+        if archived:
+            detach_archive(conn)
 
-    conn = None
 
-    args = parser.parse_args(args=None if sys.argv[1:] else ['--help'])
+def hour_histogram(conn: Connection, start: Optional[int] = None, end: Optional[int] = None) -> List[Tuple[int, int, int]]:
+    """
+    Returns the time logged in each hour of each weekday, in local time. Sessions are split at every hour boundary,
+    so a session from 23:30 to 01:15 adds 30 minutes to 23:00 of its first day, an hour to 00:00 and 15 minutes to 01:00 of the next one.
+    Each session is moved to local time with the UTC offset it started at.
+
+    Instead of splitting every session, SQLite only groups session starts and ends by hour of the week.
+    The time a session adds to an hour is how much of that hour has gone by, counting from a fixed Monday, at its end minus at its start,
+    and those amounts add up, so the 168 hours are computed from the grouped starts and ends.
+    This costs the same however long sessions are.
+
+    :param conn Connection: Current sqlite3 connection.
+    :param start Optional[int]: Only count sessions started at or after this unix timestamp.
+    :param end Optional[int]: Only count sessions started before this unix timestamp.
+    :rtype List[Tuple[int, int, int]]: (weekday, hour, seconds) for every hour with time logged, in order, weekday going from 0 (Monday) to 6.
+    """
+    week = 7 * 24 * 3600
+    conditions, params = _date_range(start, end, "start_date")
+    # Timestamps are counted from Monday 1969-12-29, 3 days before the unix epoch.
+    sql = f"""WITH local(s, e) AS (
+               SELECT start_date + offset + 259200, end_date + offset + 259200 FROM (
+                SELECT start_date, end_date, CAST(strftime('%s', start_date, 'unixepoch', 'localtime') AS INTEGER) - start_date AS offset
+                FROM time WHERE end_date > start_date{conditions}))
+              SELECT -1, s % {week} / 3600 AS hour, COUNT(*), SUM(s % 3600), SUM(s / {week}) FROM local GROUP BY hour
+              UNION ALL
+              SELECT 1, e % {week} / 3600 AS hour, COUNT(*), SUM(e % 3600), SUM(e / {week}) FROM local GROUP BY hour"""
+    totals = [0] * 168
+    for sign, hour, count, seconds, weeks in conn.execute(sql, params):
+        # Every earlier week filled each hour, and so did this week's earlier hours.
+        for earlier in range(168):
+            totals[earlier] += sign * 3600 * (weeks + (count if earlier < hour else 0))
+        totals[hour] += sign * seconds
+    return [(hour // 24, hour % 24, seconds) for hour, seconds in enumerate(totals) if seconds]
+
+
+def generate_histogram_report(conn: Connection, output: Optional[str] = None, fmt: str = "html",
+                              start: Optional[int] = None, end: Optional[int] = None):
+    """
+    Writes a report with the time logged in each hour of each weekday, to see when you work the most.
+    Archived sessions are included when the date range reaches them.
+
+    :param conn Connection: Current sqlite3 connection.
+    :param output Optional[str]: Path of the report file, or "-" to write it to stdout. None writes HTML to report.html and every other format to stdout.
+    :param fmt str: "html", "json", "csv" or "ndjson". Other formats than html write one record per weekday and hour with time logged.
+    :param start Optional[int]: Only count sessions started at or after this unix timestamp.
+    :param end Optional[int]: Only count sessions started before this unix timestamp.
+    """
+    from taskminal.archive import attach_archive, detach_archive
+    from taskminal.report import HISTOGRAM_COLUMNS, WEEKDAYS, write_report
+
+    def rows():
+        return ((WEEKDAYS[weekday], hour, seconds) for weekday, hour, seconds in hour_histogram(conn, start, end))
+
+    archived = attach_archive(conn, start)
+    try:
+        write_report(output, fmt, lambda report: report.write_histogram(hour_histogram(conn, start, end)), HISTOGRAM_COLUMNS, rows)
+    finally:
+        if archived:
+            detach_archive(conn)
+
+
+def parse_date(value: str) -> int:
+    """
+    Parses a YYYY-MM-DD date in local time, for the --from and --to arguments.
+
+    :param value str: Date to parse.
+    :rtype int: Unix timestamp of the start of that day.
+    """
+    import argparse
+    try:
+        return int(datetime.strptime(value, "%Y-%m-%d").timestamp())
+    except ValueError:
+        raise argparse.ArgumentTypeError(f"invalid date: {value}, expected YYYY-MM-DD")
+
+
+def positive_int(value: str) -> int:
+    """
+    Parses a whole number of at least 1, for the arguments where 0 or less would do nothing.
+
+    :param value str: Number to parse.
+    :rtype int: The parsed number.
+    """
+    import argparse
+    try:
+        number = int(value)
+    except ValueError:
+        raise argparse.ArgumentTypeError(f"invalid number: {value}")
+    if number < 1:
+        raise argparse.ArgumentTypeError(f"must be at least 1: {value}")
+    return number
+
+
+def date_range(args: "argparse.Namespace") -> Tuple[Optional[int], Optional[int]]:
+    """
+    Returns the range of start dates chosen with --from and --to. Both days are included.
+
+    :param args argparse.Namespace: Parsed command line arguments.
+    :rtype Tuple[Optional[int], Optional[int]]: Earliest start date, and the timestamp start dates must be before, or None if not set.
+    """
+    end = None
+    if args.to is not None:
+        end = int((datetime.fromtimestamp(args.to) + timedelta(days=1)).timestamp())
+    return args.start, end
+
+
+# Every command, its aliases and its help line. Their arguments are added by _add_arguments.
+COMMANDS: Dict[str, Tuple[List[str], str]] = {
+    "createdb": ([], "Create a new database"),
+    "set": ([], "Sets an active database."),
+    "listdb": ([], "Shows all created databases"),
+    "new": (["add"], "Adds a new task"),
+    "list": ([], "Lists all tasks"),
+    "delete": (["remove"], "Removes a task by its index."),
+    "start": ([], "Marks the current date/time as the start point for this session. Call stop when you're done with this task for now."),
+    "stop": ([], "Stops working on this task."),
+    "done": ([], "Completes the task with the given index."),
+    "comment": ([], "Adds or removes comments from your tasks."),
+    "cleanup": ([], "Deletes every database file. Run this before uninstalling."),
+    "report": ([], "Generates a monthly time report"),
+    "export": ([], "Exports a table as CSV or JSON lines."),
+    "import": ([], "Imports a table from CSV or JSON lines. Import tasks before their time and comments."),
+    "batch": ([], "Runs newline-delimited commands from a file or stdin on a single connection."),
+    "daemon": ([], "Runs a background server that keeps the active database open, making later commands faster."),
+    "tuning": ([], "Shows or sets the SQLite tuning profile used by every connection."),
+    "search": ([], "Searches task names and comments."),
+    "rebuild": ([], "Recomputes the stored time totals, the report cache and the search index."),
+    "status": ([], "Shows the running timers and how long they've been running."),
+    "backup": ([], "Copies the active database to a file while it's in use."),
+    "restore": ([], "Replaces the active database with a backup."),
+    "sync": ([], "Merges the changes made to the active database and to another one since they last synced, both ways."),
+    "archive": ([], "Moves completed tasks not worked on lately, with their sessions and comments, to an archive database."),
+}
+
+
+def _add_arguments(command: str, parser: "argparse.ArgumentParser"):
+    """
+    Adds the arguments of a single command to its subparser.
+
+    :param command str: Name of the command, as in COMMANDS.
+    :param parser argparse.ArgumentParser: Subparser of the command.
+    """
+    if command == "createdb":
+        parser.add_argument("name", help="Name of the new database.")
+        parser.add_argument("-f", action="store_true", help="Force the creation of this database even if it already exists.")
+    elif command == "set":
+        parser.add_argument("name", help="Name of the database you want to use.")
+    elif command == "new":
+        parser.add_argument("title", help="Name of the task")
+        parser.add_argument("-s", action="store_true", help="Automatically start the task after adding it.")
+    elif command == "list":
+        group = parser.add_mutually_exclusive_group()
+        group.add_argument("-c", action="store_true", help="Show only completed tasks.")
+        group.add_argument("-u", action="store_true", help="Show only unfinished tasks.")
+        parser.add_argument("-nc", action="store_true", help="Don't show comments.")
+        parser.add_argument("-n", "--name", help="Show only tasks whose name contains this text.")
+        parser.add_argument("--sort", choices=["id", "time", "activity"], default="id", help="Sort by id, by most time spent or by most recent activity. Defaults to id.")
+        parser.add_argument("--limit", type=int, help="Show at most this many tasks.")
+        parser.add_argument("--after", type=int, help="Show only the tasks after the one with this id, in the chosen order.")
+    elif command == "search":
+        parser.add_argument("query", nargs="+", help="Words to search for. Every word must match the start of a word in the task name or comment.")
+        parser.add_argument("--limit", type=int, default=20, help="Show at most this many results. Defaults to 20.")
+        parser.add_argument("--raw", action="store_true", help="Use the FTS5 query syntax: OR, NOT, \"phrases\", prefix*...")
+    elif command == "delete":
+        parser.add_argument("index", help="Index of the task you want to remove, or a list of ids and ranges such as 1,4,7-200.")
+    elif command == "start":
+        parser.add_argument("index", help="Index of the task you want to update, or a list of ids and ranges such as 1,4,7-200.")
+    elif command == "stop":
+        group = parser.add_mutually_exclusive_group(required=True)
+        group.add_argument("index", nargs="?", help="Task index, or a list of ids and ranges such as 1,4,7-200.")
+        group.add_argument("--all", action="store_true", help="Stop every running task.")
+    elif command == "done":
+        parser.add_argument("index", help="Index of the task, or a list of ids and ranges such as 1,4,7-200.")
+        parser.add_argument("-t", "--toggle", action="store_true", help="Mark completed tasks in a list or range as not completed, instead of leaving them completed. A single id always toggles.")
+    elif command == "comment":
+        comment_action = parser.add_subparsers(title="Action", help="Add or remove comments from your tasks.", required=True, dest="comment_action")
+        parser_comment_add = comment_action.add_parser("add", help="Add a new comment to the selected task.")
+        parser_comment_add.add_argument("id", help="ID of the desired task.")
+        parser_comment_add.add_argument("body", help="Text of the comment you want to add.")
+        parser_comment_delete = comment_action.add_parser("delete", help="Delete a comment by its unique id.")
+        parser_comment_delete.add_argument("comment", help="Index of the comment you want to delete.")
+    elif command == "report":
+        from taskminal.report import FORMATS
+        parser.add_argument("-o", "--output", help="Path of the report file, or - to write it to stdout. Defaults to report.html for html, stdout otherwise.")
+        parser.add_argument("-f", "--format", choices=FORMATS, default="html", help="Output format. Defaults to html.")
+        parser.add_argument("--from", dest="start", type=parse_date, metavar="YYYY-MM-DD", help="Only report sessions started on or after this day.")
+        parser.add_argument("--to", type=parse_date, metavar="YYYY-MM-DD", help="Only report sessions started on or before this day.")
+        kind = parser.add_mutually_exclusive_group()
+        kind.add_argument("-s", "--summary", action="store_true", help="Show the total time of each task per month instead of every session.")
+        kind.add_argument("--histogram", action="store_true", help="Show the time logged in each hour of each weekday instead.")
+        group = parser.add_mutually_exclusive_group()
+        group.add_argument("--all", action="store_true", help="Report the time per month of every database instead of the active one.")
+        group.add_argument("--databases", nargs="+", metavar="NAME", help="Report the time per month of these databases instead of the active one.")
+    elif command == "export":
+        from taskminal.transfer import FORMATS, TABLES
+        parser.add_argument("table", choices=TABLES, help="Table to export.")
+        parser.add_argument("-o", "--output", default="-", help="File to write to, or - for stdout. Defaults to stdout.")
+        parser.add_argument("-f", "--format", choices=FORMATS, help="Output format. Guessed from the output extension if not set, csv otherwise.")
+    elif command == "import":
+        from taskminal.transfer import FORMATS, TABLES
+        parser.add_argument("table", choices=TABLES, help="Table to import into.")
+        parser.add_argument("input", help="File to read from, or - for stdin.")
+        parser.add_argument("-f", "--format", choices=FORMATS, help="Input format. Guessed from the input extension if not set, csv otherwise.")
+        parser.add_argument("-b", "--batch-size", type=positive_int, default=10000, help="Rows inserted per transaction. Defaults to 10000.")
+    elif command == "batch":
+        parser.add_argument("input", nargs="?", default="-", help="File with one command per line, or - for stdin. Defaults to stdin.")
+        parser.add_argument("-t", "--transaction-size", type=int, default=0, help="Commands per transaction. Defaults to 0, a single transaction for the whole batch.")
+        parser.add_argument("--stop-on-error", action="store_true", help="Stop at the first failing command and roll back the open transaction.")
+    elif command == "daemon":
+        parser.add_argument("action", choices=["start", "stop", "status"], help="start runs the daemon in the foreground until it's stopped.")
+    elif command == "status":
+        parser.add_argument("-w", "--watch", action="store_true", help="Keep the timers on screen, refreshing them until you press Ctrl+C.")
+        parser.add_argument("-i", "--interval", type=float, default=1.0, help="Seconds between refreshes with --watch. Defaults to 1.")
+    elif command == "backup":
+        group = parser.add_mutually_exclusive_group()
+        group.add_argument("-o", "--output", help="File to write the backup to.")
+        group.add_argument("-d", "--dir", help="Folder to write a timestamped snapshot to. Defaults to the backups folder next to the program.")
+        parser.add_argument("--keep", type=int, help="Only keep this many timestamped snapshots of the database, deleting the oldest ones.")
+        parser.add_argument("--pages", type=int, default=256, help="Pages copied per step. 0 copies everything at once. Defaults to 256.")
+        parser.add_argument("--sleep", type=float, default=0.05, help="Seconds to wait between steps, so other commands can write. Defaults to 0.05.")
+    elif command == "restore":
+        parser.add_argument("input", help="Backup file to restore.")
+        parser.add_argument("-y", "--yes", action="store_true", help="Don't ask for confirmation.")
+        parser.add_argument("--pages", type=int, default=256, help="Pages copied per step. 0 copies everything at once. Defaults to 256.")
+        parser.add_argument("--sleep", type=float, default=0.05, help="Seconds to wait between steps. Defaults to 0.05.")
+    elif command == "sync":
+        parser.add_argument("database", help="Path of the other database, or the name of one listed by listdb.")
+    elif command == "archive":
+        group = parser.add_mutually_exclusive_group()
+        group.add_argument("--days", type=int, default=90, help="Archive completed tasks not worked on in this many days. Defaults to 90.")
+        group.add_argument("--before", type=parse_date, metavar="YYYY-MM-DD", help="Archive completed tasks not worked on since this day.")
+        parser.add_argument("--no-vacuum", action="store_true", help="Don't compact the database file afterwards.")
+    elif command == "tuning":
+        parser.add_argument("tuning_profile", metavar="profile", nargs="?", help="Profile to use from now on: default, wal, bulk, report, or a [tuning:NAME] section of the config file. Shows the active profile if not set.")
+
+
+# Options of the main parser, given before the command, that take a value.
+GLOBAL_OPTIONS_WITH_VALUES = ("--profile-output", "--cprofile")
+
+
+def build_parser(argv: Optional[List[str]] = None) -> "argparse.ArgumentParser":
+    """
+    Builds the command line parser. Every command is listed, but if argv names a known command,
+    only that command gets its arguments, which keeps startup fast.
+
+    :param argv Optional[List[str]]: Command line arguments that will be parsed, without the program name. None builds every command.
+    :rtype argparse.ArgumentParser: The taskminal argument parser.
+    """
+    import argparse
+
+    selected = None
+    if argv:
+        # The command is the first argument, unless global options come before it.
+        words = [word for i, word in enumerate(argv) if i == 0 or argv[i - 1] not in GLOBAL_OPTIONS_WITH_VALUES]
+        first = next((word for word in words if word.startswith("-") is False), None)
+        selected = next((name for name, (aliases, _) in COMMANDS.items() if first == name or first in aliases), None)
+    parser = argparse.ArgumentParser(prog='taskminal')
+    parser.add_argument("--profile", action="store_true", help="Print the wall time and every SQL statement run by the command, with their durations, to stderr.")
+    parser.add_argument("--profile-output", metavar="FILE", help="Write the profile as JSON to this file instead.")
+    parser.add_argument("--cprofile", metavar="FILE", help="Also run cProfile, and write its stats to this file.")
+    subparsers = parser.add_subparsers(title="Action", help="The action to run.", required=True, dest="command")
+    for name, (aliases, description) in COMMANDS.items():
+        subparser = subparsers.add_parser(name, aliases=aliases, help=description)
+        if selected is None or selected == name:
+            _add_arguments(name, subparser)
+    return parser
+
+
+def open_active_database() -> Connection:
+    """
+    Connects to the active database. Finishes execution if there's no active database.
+
+    :rtype Connection: A functional sqlite3 connection to the active database.
+    """
+    from taskminal.config import active_database
+    name = active_database()
+    if name is not None:
+        return connect_to_db(name)
+    print("There's no active database.")
+    sys.exit(0)
+
+
+def run_task_command(conn: Connection, args: "argparse.Namespace") -> bool:
+    """
+    Runs delete, start, stop or done. A single id keeps the messages of the single task functions,
+    while lists and ranges of ids are handled by one statement per step, in a single transaction.
+
+    :param conn Connection: Current sqlite3 connection.
+    :param args argparse.Namespace: Parsed command line arguments.
+    :rtype bool: False if the command failed or didn't change any task.
+    """
+    if args.command == "stop" and args.all:
+        return bool(stop_tasks(conn))
+    ranges = parse_ids(args.index)
+    if ranges is None:
+        return False
+    if len(ranges) == 1 and ranges[0][0] == ranges[0][1]:
+        id = ranges[0][0]
+        if args.command == "done":
+            # A single id toggles the task, as it always has.
+            stop_task(conn, id)
+            return len(toggle_task(conn, id)) != 0
+        if args.command == "start":
+            return start_task(conn, id) is not None
+        if args.command == "stop":
+            return stop_task(conn, id) is not None
+        return remove_task_by_index(conn, id)
+    if args.command == "start":
+        return bool(start_tasks(conn, ranges))
+    if args.command == "stop":
+        return bool(stop_tasks(conn, ranges))
+    if args.command == "done":
+        result = done_tasks(conn, ranges, args.toggle)
+        return result is not None and sum(result) != 0
+    return bool(delete_tasks(conn, ranges))
+
+
+def run_command(conn: Connection, args: "argparse.Namespace") -> bool:
+    """
+    Runs a command that works on the active database.
+
+    :param conn Connection: Current sqlite3 connection.
+    :param args argparse.Namespace: Parsed command line arguments.
+    :rtype bool: False if the command reported a failure, True otherwise.
+    """
+    if args.command == "new" or args.command == "add":
+        id = add_task(conn, args.title)
+        if id == -1:
+            return False
+        if args.s:
+            return start_task(conn, id) is not None
+    elif args.command == "list":
+        if args.limit is not None and args.limit < 1:
+            print("The limit must be at least 1.")
+            return False
+        completed = True if args.c else False if args.u else None
+        print_task_list(conn, completed, not args.nc, args.name, args.sort, args.limit, args.after)
+    elif args.command == "search":
+        print_search(conn, " ".join(args.query), args.limit, args.raw)
+    elif args.command in ("delete", "remove", "start", "stop", "done"):
+        return run_task_command(conn, args)
+    elif args.command == "comment":
+        if args.comment_action == "add":
+            return add_comment(conn, args.id, args.body) is not None
+        elif args.comment_action == "delete":
+            return delete_comment(conn, args.comment)
+    elif args.command == "export":
+        from taskminal.transfer import export_table, guess_format
+        fmt = args.format or guess_format(args.output)
+        if args.output == "-":
+            export_table(conn, args.table, sys.stdout, fmt)
+        else:
+            with open(args.output, "w", newline="", encoding="utf-8") as f:
+                export_table(conn, args.table, f, fmt)
+    elif args.command == "import":
+        from taskminal.transfer import guess_format, import_table
+        fmt = args.format or guess_format(args.input)
+        if args.input == "-":
+            return import_table(conn, args.table, sys.stdin, fmt, args.batch_size) is not None
+        try:
+            with open(args.input, newline="", encoding="utf-8") as f:
+                return import_table(conn, args.table, f, fmt, args.batch_size) is not None
+        except OSError as e:
+            print(e)
+            return False
+    elif args.command == "report":
+        if args.histogram and (args.all or args.databases):
+            print("The histogram can only be generated for the active database.")
+            return False
+        if args.histogram:
+            generate_histogram_report(conn, args.output, args.format, *date_range(args))
+        elif args.all or args.databases:
+            from taskminal.combined import database_names, generate_combined_report
+            generate_combined_report(args.databases or database_names(), args.output, args.format, *date_range(args))
+        else:
+            generate_month_report(conn, args.output, args.summary, args.format, *date_range(args))
+    elif args.command == "rebuild":
+        rebuild_totals(conn)
+        rebuild_report_cache(conn)
+        print("Totals rebuilt.")
+        if rebuild_search_index(conn):
+            print("Search index rebuilt.")
+    elif args.command == "status":
+        if args.interval <= 0:
+            print("The interval must be greater than 0.")
+            return False
+        print_status(conn, args.watch, args.interval)
+    elif args.command == "backup":
+        from taskminal.backup import backup_database
+        if args.keep is not None and (args.keep < 1 or args.output):
+            print("--keep must be at least 1, and only works with timestamped snapshots.")
+            return False
+        output = Path(args.output) if args.output else None
+        folder = Path(args.dir) if args.dir else None
+        return backup_database(conn, output, folder, args.keep, args.pages, args.sleep) is not None
+    elif args.command == "restore":
+        from taskminal.backup import restore_database
+        if args.yes is False:
+            print(f"This will replace every task in the active database with the ones in {args.input}. Do you wish to continue? [y/N]")
+            if input().lower() != "y":
+                return False
+        if restore_database(conn, Path(args.input), args.pages, args.sleep) is False:
+            return False
+        from taskminal.daemon import reconnect
+        reconnect()
+    elif args.command == "sync":
+        from taskminal.sync import sync_databases
+        return sync_databases(conn, args.database) is not None
+    elif args.command == "archive":
+        from taskminal.archive import archive_tasks
+        cutoff = args.before if args.before is not None else int((datetime.now() - timedelta(days=args.days)).timestamp())
+        return archive_tasks(conn, cutoff, args.no_vacuum is False) is not None
+    return True
+
+
+def main():
+    if os.environ.get("TASKMINAL_NO_DAEMON") is None and os.environ.get("TASKMINAL_PROFILE") is None:
+        from taskminal.daemon import forward
+        if forward(sys.argv[1:]):
+            return
+
+    argv = sys.argv[1:] if sys.argv[1:] else ['--help']
+    parser = build_parser(argv)
+
+    args = parser.parse_args(argv)
+    variable = os.environ.get("TASKMINAL_PROFILE")
+    if args.profile or args.profile_output or args.cprofile or variable:
+        global PROFILER
+        from taskminal.profiling import Profiler
+        output = args.profile_output or (variable if variable and variable.endswith(".json") else None)
+        PROFILER = Profiler(args.cprofile)
+        PROFILER.start(args.command)
+        try:
+            dispatch(args)
+        finally:
+            PROFILER.stop()
+            if output:
+                PROFILER.write_json(output)
+            else:
+                PROFILER.print_summary()
+        return
+    dispatch(args)
+
+
+def dispatch(args: "argparse.Namespace"):
+    """
+    Runs the command chosen on the command line.
+
+    :param args argparse.Namespace: Parsed command line arguments.
+    """
     if args.command == "createdb":
-        init_new_database(args.name, args.f)
+        if init_new_database(args.name, args.f) and args.f:
+            from taskminal.daemon import reconnect
+            reconnect()
     elif args.command == "listdb":
         list_databases()
     elif args.command == "set":
         if args.name.endswith(".db") is False:
             args.name += ".db"
         if os.path.isfile(Path(__file__).with_name(args.name)):
-            with open(Path(__file__).with_name("db.txt"), "w") as f:
-                f.write(args.name)
+            from taskminal.config import set_active_database
+            set_active_database(args.name)
             print("Database selected.")
         else:
             print("Can't find database")
     elif args.command == "cleanup":
         cleanup()
-    else:
-        if os.path.isfile(Path(__file__).with_name("db.txt")):
-            with open(Path(__file__).with_name("db.txt"), 'r') as f:
-                conn = connect_to_db(f.read())
+        from taskminal.daemon import reconnect
+        reconnect()
+    elif args.command == "tuning":
+        from taskminal.config import get_tuning, set_tuning, tuning_name
+        if args.tuning_profile is None:
+            settings = get_tuning()
+            if settings is not None:
+                print(f"Active: {tuning_name()}")
+                for key, value in settings.items():
+                    print(f"{key} = {value}")
+        elif set_tuning(args.tuning_profile):
+            print("Tuning profile selected.")
+    elif args.command == "daemon":
+        import taskminal.daemon as daemon
+        if args.action == "start":
+            daemon.serve()
+        elif args.action == "stop":
+            daemon.stop()
         else:
-            print("There's no active database.")
-            sys.exit(0)
-        if args.command == "new" or args.command == "add":
-            id = add_task(conn, args.title)
-            if args.s:
-                start_task(conn, id)
-        elif args.command == "list":
-            tasks = get_all_tasks(conn)
-            for t in tasks:
-                (index, name, completed) = t
-                if completed == 0 and args.c or completed == 1 and args.u:
-                    continue
-                checkmark = "✔" if completed else ""
-                print(('[{0}] - {1} [{2}]\nTime spent: {3}').format(index, name, checkmark, get_time(conn, index)))
-                if len(get_comments_by_task_index(conn, index)) > 0 and args.nc is False:
-                    print("Comments:")
-                    for c in get_comments_by_task_index(conn, index):
-                        print(('[{0}] {1}').format(c[0], c[2]))
-                print("---------")
-        elif args.command == "delete" or args.command == "remove":
-            remove_task_by_index(conn, args.index)
-        elif args.command == "start":
-            start_task(conn, args.index)
-        elif args.command == "stop":
-            stop_task(conn, args.index)
-        elif args.command == "done":
-            stop_task(conn, args.index)
-            toggle_task(conn, args.index)
-        elif args.command == "comment":
-            if args.comment_action == "add":
-                add_comment(conn, args.id, args.body)
-            elif args.comment_action == "delete":
-                delete_comment(conn, args.comment)
-        elif args.command == "report":
-            generate_month_report(conn)
+            daemon.status()
+    elif args.command == "report" and (args.all or args.databases) and args.histogram is False:
+        # Combined reports don't need an active database.
+        run_command(None, args)
+    elif args.command == "batch":
+        from taskminal.batch import run_batch
+        conn = open_active_database()
+        if args.input == "-":
+            failed = run_batch(conn, sys.stdin, build_parser(), args.transaction_size, args.stop_on_error)
+        else:
+            with open(args.input, encoding="utf-8") as f:
+                failed = run_batch(conn, f, build_parser(), args.transaction_size, args.stop_on_error)
+        close_connection(conn)
+        sys.exit(1 if failed else 0)
+    else:
+        conn = open_active_database()
+        run_command(conn, args)
         close_connection(conn)
 
 
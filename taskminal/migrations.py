@@ -0,0 +1,393 @@
+import sqlite3
+from sqlite3 import Connection
+from typing import Callable, List
+
+
+def _epoch(column: str) -> str:
+    """
+    Returns an SQL expression that converts a "%m/%d/%Y, %H:%M:%S" local date column into a unix timestamp.
+
+    :param column str: Name of the column holding the date.
+    :rtype str: SQL expression.
+    """
+    iso = f"substr({column}, 7, 4) || '-' || substr({column}, 1, 2) || '-' || substr({column}, 4, 2) || ' ' || substr({column}, 13)"
+    return f"CAST(strftime('%s', {iso}, 'utc') AS INTEGER)"
+
+
+def _integer_timestamps(conn: Connection):
+    """
+    Rebuilds the time table so start_date and end_date are stored as unix timestamps instead of formatted strings.
+
+    :param conn Connection: Current sqlite3 connection.
+    """
+    conn.execute("""
+                 CREATE TABLE time_new(
+                  id integer PRIMARY KEY,
+                  task_id integer,
+                  start_date integer,
+                  end_date integer,
+                  FOREIGN KEY(task_id) REFERENCES tasks(id) ON DELETE CASCADE);""")
+    conn.execute(f"""INSERT INTO time_new(id, task_id, start_date, end_date)
+                     SELECT id, task_id, {_epoch('start_date')}, {_epoch('end_date')} FROM time""")
+    conn.execute("DROP TABLE time")
+    conn.execute("ALTER TABLE time_new RENAME TO time")
+
+
+def _indexes(conn: Connection):
+    """
+    Adds the indexes used by time and comment lookups.
+    time_task covers per-task totals, time_open only holds open sessions and time_start serves date range scans.
+
+    :param conn Connection: Current sqlite3 connection.
+    """
+    conn.execute("CREATE INDEX IF NOT EXISTS time_task ON time(task_id, start_date, end_date)")
+    conn.execute("CREATE INDEX IF NOT EXISTS time_open ON time(task_id) WHERE end_date IS NULL")
+    conn.execute("CREATE INDEX IF NOT EXISTS time_start ON time(start_date, end_date, task_id)")
+    conn.execute("CREATE INDEX IF NOT EXISTS comments_task ON comments(task_id)")
+
+
+def _task_totals(conn: Connection):
+    """
+    Adds total_seconds and sessions to tasks, filled from the time table and kept up to date by triggers on it.
+    Open sessions count as a session but add no time, like in get_time.
+
+    :param conn Connection: Current sqlite3 connection.
+    """
+    conn.execute("ALTER TABLE tasks ADD COLUMN total_seconds integer NOT NULL DEFAULT 0")
+    conn.execute("ALTER TABLE tasks ADD COLUMN sessions integer NOT NULL DEFAULT 0")
+    conn.execute("""UPDATE tasks SET
+                     total_seconds = COALESCE((SELECT SUM(end_date - start_date) FROM time WHERE time.task_id = tasks.id), 0),
+                     sessions = (SELECT COUNT(*) FROM time WHERE time.task_id = tasks.id)""")
+    conn.execute("""
+                 CREATE TRIGGER time_totals_insert AFTER INSERT ON time BEGIN
+                  UPDATE tasks SET total_seconds = total_seconds + COALESCE(NEW.end_date - NEW.start_date, 0), sessions = sessions + 1
+                  WHERE id = NEW.task_id;
+                 END;""")
+    conn.execute("""
+                 CREATE TRIGGER time_totals_delete AFTER DELETE ON time BEGIN
+                  UPDATE tasks SET total_seconds = total_seconds - COALESCE(OLD.end_date - OLD.start_date, 0), sessions = sessions - 1
+                  WHERE id = OLD.task_id;
+                 END;""")
+    conn.execute("""
+                 CREATE TRIGGER time_totals_update AFTER UPDATE OF task_id, start_date, end_date ON time BEGIN
+                  UPDATE tasks SET total_seconds = total_seconds - COALESCE(OLD.end_date - OLD.start_date, 0), sessions = sessions - 1
+                  WHERE id = OLD.task_id;
+                  UPDATE tasks SET total_seconds = total_seconds + COALESCE(NEW.end_date - NEW.start_date, 0), sessions = sessions + 1
+                  WHERE id = NEW.task_id;
+                 END;""")
+
+
+# Latest start or end date of the sessions of a task. Sessions imported from older versions may have no start date.
+LATEST_ACTIVITY = "(SELECT MAX(MAX(COALESCE(start_date, 0), COALESCE(end_date, 0))) FROM time WHERE time.task_id = tasks.id)"
+
+
+def _task_activity(conn: Connection):
+    """
+    Adds last_active to tasks, the latest start or end date of its sessions, kept up to date by triggers on time.
+    Also indexes the columns tasks can be filtered and sorted by.
+
+    :param conn Connection: Current sqlite3 connection.
+    """
+    conn.execute("ALTER TABLE tasks ADD COLUMN last_active integer NOT NULL DEFAULT 0")
+    conn.execute(f"UPDATE tasks SET last_active = COALESCE({LATEST_ACTIVITY}, 0)")
+    _activity_triggers(conn)
+    conn.execute("CREATE INDEX tasks_completed ON tasks(completed)")
+    conn.execute("CREATE INDEX tasks_total ON tasks(total_seconds)")
+    conn.execute("CREATE INDEX tasks_activity ON tasks(last_active)")
+
+
+def _activity_triggers(conn: Connection):
+    """
+    Creates the triggers on time that keep tasks.last_active up to date.
+
+    :param conn Connection: Current sqlite3 connection.
+    """
+    conn.execute("""
+                 CREATE TRIGGER time_activity_insert AFTER INSERT ON time BEGIN
+                  UPDATE tasks SET last_active = MAX(last_active, COALESCE(NEW.start_date, 0), COALESCE(NEW.end_date, 0))
+                  WHERE id = NEW.task_id;
+                 END;""")
+    # Dates only move forward when a session is stopped, so a full recount is only needed when they move back or change task.
+    conn.execute(f"""
+                 CREATE TRIGGER time_activity_update AFTER UPDATE OF task_id, start_date, end_date ON time BEGIN
+                  UPDATE tasks SET last_active = MAX(last_active, COALESCE(NEW.start_date, 0), COALESCE(NEW.end_date, 0))
+                  WHERE id = NEW.task_id;
+                  UPDATE tasks SET last_active = COALESCE({LATEST_ACTIVITY}, 0)
+                  WHERE id = OLD.task_id
+                  AND (OLD.task_id != NEW.task_id OR COALESCE(NEW.start_date, 0) < COALESCE(OLD.start_date, 0)
+                       OR COALESCE(NEW.end_date, 0) < COALESCE(OLD.end_date, 0));
+                 END;""")
+    conn.execute(f"""
+                 CREATE TRIGGER time_activity_delete AFTER DELETE ON time BEGIN
+                  UPDATE tasks SET last_active = COALESCE({LATEST_ACTIVITY}, 0) WHERE id = OLD.task_id;
+                 END;""")
+
+
+def _search_index(conn: Connection):
+    """
+    Adds FTS5 full-text indexes over task names and comment bodies, kept in sync by triggers.
+    If this SQLite build doesn't include FTS5 nothing is created, and search falls back to scanning with LIKE.
+
+    :param conn Connection: Current sqlite3 connection.
+    """
+    try:
+        conn.execute("CREATE VIRTUAL TABLE tasks_fts USING fts5(name, content='tasks', content_rowid='id')")
+    except sqlite3.OperationalError as e:
+        if "fts5" not in str(e):
+            raise
+        return
+    conn.execute("CREATE VIRTUAL TABLE comments_fts USING fts5(body, content='comments', content_rowid='id')")
+    conn.execute("INSERT INTO tasks_fts(tasks_fts) VALUES('rebuild')")
+    conn.execute("INSERT INTO comments_fts(comments_fts) VALUES('rebuild')")
+    for table, column in (("tasks", "name"), ("comments", "body")):
+        conn.execute(f"""
+                     CREATE TRIGGER {table}_fts_insert AFTER INSERT ON {table} BEGIN
+                      INSERT INTO {table}_fts(rowid, {column}) VALUES(NEW.id, NEW.{column});
+                     END;""")
+        conn.execute(f"""
+                     CREATE TRIGGER {table}_fts_delete AFTER DELETE ON {table} BEGIN
+                      INSERT INTO {table}_fts({table}_fts, rowid, {column}) VALUES('delete', OLD.id, OLD.{column});
+                     END;""")
+        conn.execute(f"""
+                     CREATE TRIGGER {table}_fts_update AFTER UPDATE OF id, {column} ON {table} BEGIN
+                      INSERT INTO {table}_fts({table}_fts, rowid, {column}) VALUES('delete', OLD.id, OLD.{column});
+                      INSERT INTO {table}_fts(rowid, {column}) VALUES(NEW.id, NEW.{column});
+                     END;""")
+
+
+def _unique_open_sessions(conn: Connection):
+    """
+    Makes time_open a unique index, so a task can't have two open sessions even when two processes start it at once.
+    Duplicate open sessions left by earlier versions are deleted, keeping the earliest one of each task.
+
+    :param conn Connection: Current sqlite3 connection.
+    """
+    conn.execute("""DELETE FROM time WHERE end_date IS NULL
+                    AND id != (SELECT first.id FROM time AS first WHERE first.task_id = time.task_id AND first.end_date IS NULL
+                               ORDER BY first.start_date, first.id LIMIT 1)""")
+    conn.execute("DROP INDEX IF EXISTS time_open")
+    conn.execute("CREATE UNIQUE INDEX time_open ON time(task_id) WHERE end_date IS NULL")
+
+
+# Month of a session, in local time, as stored in report_cache.
+SESSION_MONTH = "strftime('%Y-%m', {0}.start_date, 'unixepoch', 'localtime')"
+
+
+def _report_cache(conn: Connection):
+    """
+    Adds report_cache, the time logged on closed sessions per month (in local time) and task, used by reports.
+    Triggers on time mark the rows a change touches as stale by setting seconds and sessions to NULL,
+    and only those are recomputed the next time a report is generated.
+
+    :param conn Connection: Current sqlite3 connection.
+    """
+    conn.execute("""
+                 CREATE TABLE report_cache(
+                  month text,
+                  task_id integer,
+                  seconds integer,
+                  sessions integer,
+                  PRIMARY KEY(month, task_id)) WITHOUT ROWID;""")
+    conn.execute("CREATE INDEX report_cache_stale ON report_cache(month, task_id) WHERE seconds IS NULL")
+    conn.execute(f"""INSERT INTO report_cache(month, task_id)
+                     SELECT DISTINCT {SESSION_MONTH.format('time')}, task_id FROM time WHERE start_date IS NOT NULL AND end_date IS NOT NULL""")
+    _report_triggers(conn)
+
+
+def _report_triggers(conn: Connection):
+    """
+    Creates the triggers on time that mark the rows of report_cache as stale.
+    Sessions without a start date don't belong to any month, and are left out of reports.
+
+    :param conn Connection: Current sqlite3 connection.
+    """
+    closed = "{0}.start_date IS NOT NULL AND {0}.end_date IS NOT NULL"
+    conn.execute(f"""
+                 CREATE TRIGGER time_report_insert AFTER INSERT ON time WHEN {closed.format('NEW')} BEGIN
+                  INSERT OR REPLACE INTO report_cache(month, task_id) VALUES({SESSION_MONTH.format('NEW')}, NEW.task_id);
+                 END;""")
+    conn.execute(f"""
+                 CREATE TRIGGER time_report_update AFTER UPDATE OF task_id, start_date, end_date ON time BEGIN
+                  INSERT OR REPLACE INTO report_cache(month, task_id) SELECT {SESSION_MONTH.format('OLD')}, OLD.task_id WHERE {closed.format('OLD')};
+                  INSERT OR REPLACE INTO report_cache(month, task_id) SELECT {SESSION_MONTH.format('NEW')}, NEW.task_id WHERE {closed.format('NEW')};
+                 END;""")
+    conn.execute(f"""
+                 CREATE TRIGGER time_report_delete AFTER DELETE ON time WHEN {closed.format('OLD')} BEGIN
+                  INSERT OR REPLACE INTO report_cache(month, task_id) VALUES({SESSION_MONTH.format('OLD')}, OLD.task_id);
+                 END;""")
+
+
+def _sync_log(conn: Connection):
+    """
+    Adds what sync needs to exchange only the rows changed since the last sync:
+    a random global id (gid) on every task, session and comment, which identifies it across databases,
+    a random id for the database itself in sync_state, and the changes table, where triggers record the latest change of each row, in order.
+    Changes made while sync_state has a 'local' key, such as archiving, aren't recorded.
+    While sync applies the changes of another database, its id is stored as 'applying', and recorded as the origin of those changes.
+    sync_peers holds, for every database synced with, the last change sent to it and the last one received from it.
+
+    :param conn Connection: Current sqlite3 connection.
+    """
+    gid = "lower(hex(randomblob(16)))"
+    now = "CAST(strftime('%s', 'now') AS INTEGER)"
+    origin = "COALESCE((SELECT value FROM sync_state WHERE key = 'applying'), (SELECT value FROM sync_state WHERE key = 'site'))"
+    logging = "NOT EXISTS(SELECT 1 FROM sync_state WHERE key = 'local')"
+    conn.execute("CREATE TABLE sync_state(key text PRIMARY KEY, value text) WITHOUT ROWID")
+    conn.execute(f"INSERT INTO sync_state(key, value) VALUES('site', {gid})")
+    conn.execute("""
+                 CREATE TABLE changes(
+                  seq integer PRIMARY KEY AUTOINCREMENT,
+                  tbl text NOT NULL,
+                  gid text NOT NULL,
+                  origin text NOT NULL,
+                  changed integer NOT NULL,
+                  UNIQUE(tbl, gid));""")
+    conn.execute("CREATE TABLE sync_peers(site text PRIMARY KEY, sent integer NOT NULL DEFAULT 0, received integer NOT NULL DEFAULT 0)")
+    for table, columns in (("tasks", "name, completed"), ("time", "task_id, start_date, end_date"), ("comments", "task_id, body")):
+        conn.execute(f"ALTER TABLE {table} ADD COLUMN gid text")
+        conn.execute(f"UPDATE {table} SET gid = {gid}")
+        conn.execute(f"CREATE UNIQUE INDEX {table}_gid ON {table}(gid)")
+        conn.execute(f"INSERT INTO changes(tbl, gid, origin, changed) SELECT '{table}', gid, {origin}, {now} FROM {table} ORDER BY id")
+        # Rows inserted without a gid get one first, so the change can refer to it.
+        conn.execute(f"""
+                     CREATE TRIGGER {table}_sync_insert AFTER INSERT ON {table} BEGIN
+                      UPDATE {table} SET gid = {gid} WHERE id = NEW.id AND NEW.gid IS NULL;
+                      INSERT OR REPLACE INTO changes(tbl, gid, origin, changed)
+                      SELECT '{table}', gid, {origin}, {now} FROM {table} WHERE id = NEW.id AND {logging};
+                     END;""")
+        conn.execute(f"""
+                     CREATE TRIGGER {table}_sync_update AFTER UPDATE OF {columns} ON {table} WHEN {logging} BEGIN
+                      INSERT OR REPLACE INTO changes(tbl, gid, origin, changed) VALUES('{table}', NEW.gid, {origin}, {now});
+                     END;""")
+        conn.execute(f"""
+                     CREATE TRIGGER {table}_sync_delete AFTER DELETE ON {table} WHEN OLD.gid IS NOT NULL AND {logging} BEGIN
+                      INSERT OR REPLACE INTO changes(tbl, gid, origin, changed) VALUES('{table}', OLD.gid, {origin}, {now});
+                     END;""")
+
+
+def _activity_without_start(conn: Connection):
+    """
+    Recreates the last_active triggers of _task_activity, which failed to insert sessions without a start date.
+
+    :param conn Connection: Current sqlite3 connection.
+    """
+    for trigger in ("insert", "update", "delete"):
+        conn.execute(f"DROP TRIGGER IF EXISTS time_activity_{trigger}")
+    _activity_triggers(conn)
+    conn.execute(f"""UPDATE tasks SET last_active = COALESCE({LATEST_ACTIVITY}, 0)
+                     WHERE id IN (SELECT task_id FROM time WHERE start_date IS NULL)""")
+
+
+def _report_without_start(conn: Connection):
+    """
+    Recreates the report_cache triggers of _report_cache, which failed on closed sessions without a start date.
+
+    :param conn Connection: Current sqlite3 connection.
+    """
+    for trigger in ("insert", "update", "delete"):
+        conn.execute(f"DROP TRIGGER IF EXISTS time_report_{trigger}")
+    _report_triggers(conn)
+
+
+def _sync_triggers(conn: Connection):
+    """
+    Creates the sync triggers of _sync_log, replacing the ones already there.
+    New gids start with the time in milliseconds, followed by 80 random bits, so inserts land at the end of the gid indexes.
+    Only rows inserted without a gid run the UPDATE that sets it.
+
+    :param conn Connection: Current sqlite3 connection.
+    """
+    gid = "printf('%012x', CAST((julianday('now') - 2440587.5) * 86400000 AS INTEGER)) || lower(hex(randomblob(10)))"
+    now = "CAST(strftime('%s', 'now') AS INTEGER)"
+    origin = "COALESCE((SELECT value FROM sync_state WHERE key = 'applying'), (SELECT value FROM sync_state WHERE key = 'site'))"
+    logging = "NOT EXISTS(SELECT 1 FROM sync_state WHERE key = 'local')"
+    for table, columns in (("tasks", "name, completed"), ("time", "task_id, start_date, end_date"), ("comments", "task_id, body")):
+        for trigger in ("gid", "insert", "update", "delete"):
+            conn.execute(f"DROP TRIGGER IF EXISTS {table}_sync_{trigger}")
+        # Triggers on the same event fire in no documented order, so the gid is set and read by the same one.
+        conn.execute(f"""
+                     CREATE TRIGGER {table}_sync_insert AFTER INSERT ON {table} BEGIN
+                      UPDATE {table} SET gid = {gid} WHERE id = NEW.id AND NEW.gid IS NULL;
+                      INSERT OR REPLACE INTO changes(tbl, gid, origin, changed)
+                      SELECT '{table}', gid, {origin}, {now} FROM {table} WHERE id = NEW.id AND {logging};
+                     END;""")
+        conn.execute(f"""
+                     CREATE TRIGGER {table}_sync_update AFTER UPDATE OF {columns} ON {table} WHEN {logging} BEGIN
+                      INSERT OR REPLACE INTO changes(tbl, gid, origin, changed) VALUES('{table}', NEW.gid, {origin}, {now});
+                     END;""")
+        conn.execute(f"""
+                     CREATE TRIGGER {table}_sync_delete AFTER DELETE ON {table} WHEN OLD.gid IS NOT NULL AND {logging} BEGIN
+                      INSERT OR REPLACE INTO changes(tbl, gid, origin, changed) VALUES('{table}', OLD.gid, {origin}, {now});
+                     END;""")
+
+
+def _sync_defaults(conn: Connection):
+    """
+    Recreates the sync triggers of _sync_log with time ordered gids, which keep inserts at the end of the gid indexes.
+
+    :param conn Connection: Current sqlite3 connection.
+    """
+    _sync_triggers(conn)
+
+
+def _sync_origins(conn: Connection):
+    """
+    Undoes the first version of _sync_defaults, which recorded local changes with a NULL origin and set gids with a column default.
+    The origins are set back to the id of the database and the triggers recreated. The column default, where present, is left in place:
+    the insert trigger only sets gids that are still NULL.
+
+    :param conn Connection: Current sqlite3 connection.
+    """
+    conn.execute("UPDATE changes SET origin = (SELECT value FROM sync_state WHERE key = 'site') WHERE origin IS NULL")
+    _sync_triggers(conn)
+
+
+# Each migration moves the schema one version forward. Never reorder or remove entries, only append.
+MIGRATIONS: List[Callable[[Connection], None]] = [
+    _integer_timestamps,
+    _indexes,
+    _task_totals,
+    _task_activity,
+    _search_index,
+    _unique_open_sessions,
+    _report_cache,
+    _sync_log,
+    _activity_without_start,
+    _report_without_start,
+    _sync_defaults,
+    _sync_origins,
+]
+
+
+def schema_version(conn: Connection) -> int:
+    """
+    Returns the schema version of the database, as stored in PRAGMA user_version.
+
+    :param conn Connection: Current sqlite3 connection.
+    :rtype int: Number of migrations applied to this database.
+    """
+    return conn.execute("PRAGMA user_version").fetchone()[0]
+
+
+def migrate(conn: Connection) -> int:
+    """
+    Applies every pending migration, each one in its own transaction along with the user_version bump.
+
+    :param conn Connection: Current sqlite3 connection.
+    :rtype int: Schema version after migrating.
+    """
+    version = schema_version(conn)
+    while version < len(MIGRATIONS):
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            # Another process may have migrated while we waited for the lock.
+            version = schema_version(conn)
+            if version < len(MIGRATIONS):
+                MIGRATIONS[version](conn)
+                version += 1
+                conn.execute(f"PRAGMA user_version = {version}")
+            conn.commit()
+        except sqlite3.Error:
+            conn.rollback()
+            raise
+    return version
@@ -0,0 +1,158 @@
+import json
+import re
+import sys
+from sqlite3 import Connection
+from time import perf_counter
+from typing import Dict, List, Optional, TextIO, Tuple
+
+# Literals replaced by ? when grouping statements, so the same query run with different values counts as one.
+_LITERALS = re.compile(r"'(?:[^']|'')*'|\b\d+(?:\.\d+)?\b")
+_SPACES = re.compile(r"\s+")
+# Statements SQLite runs on its own, such as FTS5 reading and writing its shadow tables, name their schema in quotes: 'main'.
+_INTERNAL = re.compile(r"'\w+'\.")
+
+
+def normalize(statement: str) -> str:
+    """
+    Returns a statement with its literal values replaced by ? and its whitespace collapsed.
+
+    :param statement str: SQL statement, as passed to the trace callback.
+    :rtype str: Normalized statement.
+    """
+    return _SPACES.sub(" ", _LITERALS.sub("?", statement)).strip()
+
+
+class Profiler:
+    """
+    Records the wall time of a command and every SQL statement run by the connections attached to it.
+    Statements are seen through Connection.set_trace_callback, which is called when each statement starts,
+    so a statement's duration is measured until the next statement starts or the command ends.
+    For queries read one row at a time, that includes the Python code run between rows.
+    Trigger programs are counted apart, by trigger name or by the statement that fired them, and their time is added to that statement.
+    Statements SQLite runs internally, such as the ones FTS5 runs on its shadow tables, are left out, and their time is added to the statement that caused them.
+    """
+    def __init__(self, cprofile: Optional[str] = None) -> None:
+        self.command: Optional[str] = None
+        self.started = 0.0
+        self.wall = 0.0
+        self.statements: List[Tuple[str, float]] = []
+        self.triggers: Dict[str, int] = {}
+        self.current: Optional[str] = None
+        self.current_started = 0.0
+        self.cprofile = cprofile
+        self.profile = None
+
+    def attach(self, conn: Connection):
+        """
+        Starts tracing the statements run on a connection.
+
+        :param conn Connection: Connection to trace.
+        """
+        conn.set_trace_callback(self._trace)
+
+    def _trace(self, statement: str):
+        now = perf_counter()
+        # Internal statements are part of the statement that caused them, and neither count as queries nor end its timing.
+        if _INTERNAL.search(statement):
+            return
+        # Each trigger program run by a statement is traced too: as "-- name" before Python 3.11,
+        # and as the text of the statement that fired it afterwards. Only writes fire triggers.
+        fired = statement == self.current and statement.lstrip()[:6].upper() in ("INSERT", "UPDATE", "DELETE", "REPLAC")
+        if statement.startswith("--") or fired:
+            name = statement[2:].strip() if statement.startswith("--") else normalize(statement)
+            self.triggers[name] = self.triggers.get(name, 0) + 1
+            return
+        self._close(now)
+        self.current = statement
+        self.current_started = now
+
+    def _close(self, now: float):
+        if self.current is not None:
+            self.statements.append((self.current, now - self.current_started))
+            self.current = None
+
+    def start(self, command: str):
+        """
+        Starts timing a command, and cProfile if a dump file was chosen.
+
+        :param command str: Name of the command.
+        """
+        self.command = command
+        if self.cprofile:
+            import cProfile
+            self.profile = cProfile.Profile()
+            self.profile.enable()
+        self.started = perf_counter()
+
+    def stop(self):
+        """
+        Stops timing the command, and writes the cProfile dump if there is one.
+        """
+        now = perf_counter()
+        self.wall = now - self.started
+        self._close(now)
+        if self.profile is not None:
+            self.profile.disable()
+            self.profile.dump_stats(self.cprofile)
+
+    def results(self, top: Optional[int] = None) -> dict:
+        """
+        Returns everything recorded, as a JSON serializable dict.
+
+        :param top Optional[int]: Only list this many statements and statement groups, the slowest first. None lists them all, in the order they ran.
+        :rtype dict: Command name, wall time, number of queries, time spent in SQL, statements, statements grouped by normalized text
+            and the number of trigger programs run, by trigger or by the statement that fired them.
+        """
+        groups: Dict[str, List[float]] = {}
+        for statement, duration in self.statements:
+            group = groups.setdefault(normalize(statement), [0, 0.0])
+            group[0] += 1
+            group[1] += duration
+        grouped = [{"sql": sql, "count": count, "total_s": total} for sql, (count, total) in groups.items()]
+        statements = [{"sql": sql, "duration_s": duration} for sql, duration in self.statements]
+        if top is not None:
+            statements = sorted(statements, key=lambda s: s["duration_s"], reverse=True)[:top]
+            grouped = sorted(grouped, key=lambda g: (g["count"], g["total_s"]), reverse=True)[:top]
+        return {
+            "command": self.command,
+            "argv": sys.argv[1:],
+            "wall_s": self.wall,
+            "queries": len(self.statements),
+            "sql_s": sum(duration for _, duration in self.statements),
+            "statements": statements,
+            "grouped": grouped,
+            "triggers": self.triggers,
+            "cprofile": self.cprofile,
+        }
+
+    def write_json(self, path: str):
+        """
+        Writes every recorded statement and the totals to a JSON file.
+
+        :param path str: Path of the file.
+        """
+        with open(path, "w", encoding="utf-8") as f:
+            json.dump(self.results(), f, indent=2)
+
+    def print_summary(self, out: TextIO = sys.stderr, top: int = 10):
+        """
+        Prints the totals, the slowest statements and the most repeated ones. Repeated statements usually mean a query runs once per row.
+
+        :param out TextIO: Where to print the summary. Defaults to stderr, so it doesn't mix with the command's output.
+        :param top int: Number of statements listed in each section.
+        """
+        results = self.results(top)
+        print(f"Profile of {results['command']}: {results['wall_s']:.4f}s wall, "
+              f"{results['queries']} queries, {results['sql_s']:.4f}s in SQL", file=out)
+        print("Slowest statements:", file=out)
+        for statement in results["statements"]:
+            print(f"  {statement['duration_s']:.6f}s  {normalize(statement['sql'])[:200]}", file=out)
+        print("Most repeated statements:", file=out)
+        for group in results["grouped"]:
+            print(f"  {group['count']:>6}x {group['total_s']:.6f}s  {group['sql'][:200]}", file=out)
+        if results["triggers"]:
+            print("Trigger programs run:", file=out)
+            for name, count in results["triggers"].items():
+                print(f"  {count:>6}x  {name[:200]}", file=out)
+        if self.cprofile:
+            print(f"cProfile stats written to {self.cprofile}", file=out)
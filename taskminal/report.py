@@ -1,29 +1,187 @@
-from datetime import datetime
+import csv
+import json
+import os
+import sys
+from datetime import datetime, timedelta
+from html import escape
+from typing import Callable, Dict, Iterable, Optional, TextIO, Tuple
+
+from taskminal.repository import ReportSession, TaskMonth
+
+# Formats every report can be written in. Everything but html is written row by row by write_records.
+FORMATS = ("html", "json", "csv", "ndjson")
+
+# Columns of each kind of report in the machine readable formats.
+SESSION_COLUMNS = ("month", "task", "start", "end", "seconds")
+SUMMARY_COLUMNS = ("month", "task", "seconds", "sessions")
+COMBINED_COLUMNS = ("month", "database", "seconds")
+HISTOGRAM_COLUMNS = ("weekday", "hour", "seconds")
+
+WEEKDAYS = ("Monday", "Tuesday", "Wednesday", "Thursday", "Friday", "Saturday", "Sunday")
 
 
 class Report:
-    def __init__(self) -> None:
-        self.report = """<html>
+    """
+    Writes an HTML report to an open file handle as it is built, so the whole document is never held in memory.
+    """
+    def __init__(self, out: TextIO) -> None:
+        self.out = out
+        self.out.write("""<html>
         <head>
         <title>Taskminal Monthly Report</title>
         <h1>Taskminal Monthly Report</h1>
         </head>
-        <body>"""
+        <body>""")
 
     def add_month(self, month_name: str):
-        self.report += f"<h2>{month_name}</h2><br>"
+        self.out.write(f"<h2>{month_name}</h2><br>")
 
     def add_task(self, task_name: str, task_start: datetime, task_end: datetime, task_total: int):
         start = f"{task_start.month}-{task_start.day}-{task_start.year}, {task_start.hour:02}:{task_start.minute:02}:{task_start.second:02}"
         end = f"{task_end.month}-{task_end.day}-{task_end.year}, {task_end.hour:02}:{task_end.minute:02}:{task_end.second:02}"
-        self.report += f"<p><b>{task_name}</b><br> {start} -> {end} <b>({task_total})</b></p>"
+        self.out.write(f"<p><b>{escape(task_name)}</b><br> {start} -> {end} <b>({task_total})</b></p>")
 
     def add_total(self, task_total):
-        self.report += f"<br>Total time: <b>{task_total}</b>"
+        self.out.write(f"<br>Total time: <b>{task_total}</b>")
 
     def close_report(self):
-        self.report += """</body>
+        self.out.write("""</body>
                      </html>
+        """)
+        self.out.flush()
+
+    def write_months(self, rows: Iterable[ReportSession], totals: Dict[str, int]):
+        """
+        Writes every session from rows, grouped by month, then closes the report.
+
+        :param rows Iterable[ReportSession]: Sessions ordered by month, as returned by month_report_rows.
+        :param totals Dict[str, int]: Total seconds of each month, as returned by month_totals.
         """
-        with open("report.html", "w") as f:
-            f.write(self.report)
+        current = None
+        for row in rows:
+            if row.month != current:
+                if current is not None:
+                    self.add_total(timedelta(seconds=totals[current]))
+                current = row.month
+                self.add_month(datetime.strptime(row.month, "%Y-%m").strftime("%B %Y").upper())
+            self.add_task(row.name, datetime.fromtimestamp(row.start_date), datetime.fromtimestamp(row.end_date), timedelta(seconds=row.seconds))
+        if current is not None:
+            self.add_total(timedelta(seconds=totals[current]))
+        self.close_report()
+
+    def write_summary(self, rows: Iterable[TaskMonth], totals: Dict[str, int]):
+        """
+        Writes the total time of each task, grouped by month, then closes the report.
+
+        :param rows Iterable[TaskMonth]: Task totals ordered by month, as returned by month_task_totals.
+        :param totals Dict[str, int]: Total seconds of each month, as returned by month_totals.
+        """
+        current = None
+        for row in rows:
+            if row.month != current:
+                if current is not None:
+                    self.add_total(timedelta(seconds=totals[current]))
+                current = row.month
+                self.add_month(datetime.strptime(row.month, "%Y-%m").strftime("%B %Y").upper())
+            self.out.write(f"<p><b>{escape(row.name)}</b><br> {row.sessions} sessions <b>({timedelta(seconds=row.seconds)})</b></p>")
+        if current is not None:
+            self.add_total(timedelta(seconds=totals[current]))
+        self.close_report()
+
+    def write_combined(self, months: Dict[str, Dict[str, int]]):
+        """
+        Writes the time logged per database, grouped by month, then closes the report.
+
+        :param months Dict[str, Dict[str, int]]: Total seconds keyed by month (YYYY-MM) and then by database, as returned by combined_totals.
+        """
+        for month, databases in months.items():
+            self.add_month(datetime.strptime(month, "%Y-%m").strftime("%B %Y").upper())
+            for name, seconds in databases.items():
+                self.out.write(f"<p><b>{escape(name)}</b> <b>({timedelta(seconds=seconds)})</b></p>")
+            self.add_total(timedelta(seconds=sum(databases.values())))
+        self.close_report()
+
+    def write_histogram(self, rows: Iterable[Tuple[int, int, int]]):
+        """
+        Writes a table with the time logged in each hour of each weekday, plus the total of each weekday and hour, then closes the report.
+
+        :param rows Iterable[Tuple[int, int, int]]: (weekday, hour, seconds) rows, weekday going from 0 (Monday) to 6, as returned by hour_histogram.
+        """
+        grid = [[0] * 24 for _ in WEEKDAYS]
+        for weekday, hour, seconds in rows:
+            grid[weekday][hour] = seconds
+
+        def cell(seconds: int) -> str:
+            return f"{seconds // 3600}:{seconds % 3600 // 60:02}" if seconds else ""
+
+        self.out.write("<h2>TIME PER HOUR</h2><table border=\"1\"><tr><th></th>")
+        self.out.write("".join(f"<th>{hour:02}</th>" for hour in range(24)) + "<th>Total</th></tr>")
+        for name, hours in zip(WEEKDAYS, grid):
+            self.out.write(f"<tr><th>{name}</th>" + "".join(f"<td>{cell(seconds)}</td>" for seconds in hours) + f"<td><b>{cell(sum(hours))}</b></td></tr>")
+        totals = [sum(hours[hour] for hours in grid) for hour in range(24)]
+        self.out.write("<tr><th>Total</th>" + "".join(f"<td><b>{cell(seconds)}</b></td>" for seconds in totals) + "</tr></table>")
+        self.add_total(timedelta(seconds=sum(totals)))
+        self.close_report()
+
+
+def write_records(out: TextIO, columns: Tuple[str, ...], rows: Iterable[Tuple], fmt: str) -> int:
+    """
+    Writes report rows as they are read, as CSV with a header row, a JSON array of objects, or one JSON object per line.
+
+    :param out TextIO: Open file handle the rows are written to.
+    :param columns Tuple[str, ...]: Name of each column of the rows.
+    :param rows Iterable[Tuple]: Rows to write.
+    :param fmt str: "csv", "json" or "ndjson".
+    :rtype int: Number of rows written.
+    """
+    count = 0
+    if fmt == "csv":
+        writer = csv.writer(out)
+        writer.writerow(columns)
+        for row in rows:
+            writer.writerow(row)
+            count += 1
+    else:
+        separator = "[\n" if fmt == "json" else ""
+        for row in rows:
+            out.write(separator + json.dumps(dict(zip(columns, row)), ensure_ascii=False))
+            separator = ",\n" if fmt == "json" else "\n"
+            count += 1
+        if fmt == "json":
+            out.write("\n]\n" if count else "[]\n")
+        elif count:
+            out.write("\n")
+    out.flush()
+    return count
+
+
+def write_report(output: Optional[str], fmt: str, html: Callable[[Report], None], columns: Tuple[str, ...], rows: Callable[[], Iterable[Tuple]]):
+    """
+    Writes a report to a file or to stdout. Only HTML reports written to a file are opened in the browser.
+
+    :param output Optional[str]: Path of the report file, or "-" for stdout. None writes HTML to report.html and every other format to stdout.
+    :param fmt str: One of FORMATS.
+    :param html Callable[[Report], None]: Writes the HTML report.
+    :param columns Tuple[str, ...]: Columns of the rows returned by rows.
+    :param rows Callable[[], Iterable[Tuple]]: Returns the rows written in every other format.
+    """
+    if output is None:
+        output = "report.html" if fmt == "html" else "-"
+    if output == "-":
+        if fmt == "html":
+            html(Report(sys.stdout))
+        else:
+            write_records(sys.stdout, columns, rows(), fmt)
+        return
+    print("Generating report...")
+    with open(output, "w", newline="" if fmt == "csv" else None, encoding="utf-8") as f:
+        if fmt == "html":
+            html(Report(f))
+        else:
+            write_records(f, columns, rows(), fmt)
+    if fmt != "html":
+        print(f"Report written to {output}.")
+        return
+    print("Report generated. Opening now.")
+    import webbrowser
+    webbrowser.open('file://' + os.path.realpath(output))
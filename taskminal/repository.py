@@ -0,0 +1,138 @@
+from sqlite3 import Cursor, Connection
+from typing import Iterator, NamedTuple, Optional, Type
+
+# Records are named tuples: they take no more memory than the plain tuples sqlite3 returns, still compare equal to them,
+# and can be unpacked the same way, but their fields can also be read by name.
+
+
+class Task(NamedTuple):
+    id: int
+    name: str
+    completed: int
+
+
+class TimeEntry(NamedTuple):
+    id: int
+    task_id: int
+    start_date: int
+    end_date: Optional[int]
+
+
+class Comment(NamedTuple):
+    id: int
+    task_id: int
+    body: str
+
+
+class TaskListing(NamedTuple):
+    """
+    A row of list_tasks: a task, its total time, None if it was never started, and one of its comments, if any.
+    """
+    id: int
+    name: str
+    completed: int
+    seconds: Optional[int]
+    comment_id: Optional[int]
+    comment_body: Optional[str]
+
+
+class OpenSession(NamedTuple):
+    task_id: int
+    name: str
+    start_date: int
+
+
+class ReportSession(NamedTuple):
+    """
+    A closed session in a monthly report. month is formatted as YYYY-MM in local time.
+    """
+    month: str
+    name: str
+    start_date: int
+    end_date: int
+    seconds: int
+
+
+class TaskMonth(NamedTuple):
+    """
+    The time logged on a task in a month, in a monthly report summary.
+    """
+    month: str
+    name: str
+    seconds: int
+    sessions: int
+
+
+# Every query is a constant, so sqlite3 finds it in the connection's statement cache and doesn't compile it again.
+TASK = "SELECT id, name, completed FROM tasks WHERE id = ?"
+TASK_EXISTS = "SELECT EXISTS(SELECT 1 FROM tasks WHERE id = ?)"
+TASKS = "SELECT id, name, completed FROM tasks ORDER BY id"
+SESSIONS = "SELECT id, task_id, start_date, end_date FROM time WHERE task_id = ? ORDER BY start_date, id"
+COMMENTS = "SELECT id, task_id, body FROM comments WHERE task_id = ? ORDER BY id"
+
+
+def records(cursor: Cursor, record: Type[NamedTuple]) -> Cursor:
+    """
+    Makes a cursor return its rows as records. Rows are still read one at a time as the cursor is iterated.
+
+    :param cursor Cursor: Cursor of an executed query, with its columns in the same order as the record fields.
+    :param record Type[NamedTuple]: Record class, such as Task.
+    :rtype Cursor: The same cursor.
+    """
+    make = record._make
+    cursor.row_factory = lambda _, row: make(row)
+    return cursor
+
+
+def get_task(conn: Connection, id: int) -> Optional[Task]:
+    """
+    Returns a single task.
+
+    :param conn Connection: Current sqlite3 connection.
+    :param id int: ID of the task.
+    :rtype Optional[Task]: The task, or None if it doesn't exist.
+    """
+    return records(conn.execute(TASK, (id,)), Task).fetchone()
+
+
+def task_exists(conn: Connection, id: int) -> bool:
+    """
+    Checks whether a task exists, without reading it.
+
+    :param conn Connection: Current sqlite3 connection.
+    :param id int: ID of the task.
+    :rtype bool: True if the task exists.
+    """
+    return conn.execute(TASK_EXISTS, (id,)).fetchone()[0] == 1
+
+
+def iter_tasks(conn: Connection) -> Iterator[Task]:
+    """
+    Iterates over every task, in id order.
+
+    :param conn Connection: Current sqlite3 connection.
+    :rtype Iterator[Task]: Tasks, read as they are iterated.
+    """
+    return records(conn.execute(TASKS), Task)
+
+
+def iter_sessions(conn: Connection, task_id: int) -> Iterator[TimeEntry]:
+    """
+    Iterates over the sessions of a task, oldest first, through the time_task index.
+
+    :param conn Connection: Current sqlite3 connection.
+    :param task_id int: ID of the task.
+    :rtype Iterator[TimeEntry]: Sessions, read as they are iterated. end_date is None for an open session.
+    """
+    return records(conn.execute(SESSIONS, (task_id,)), TimeEntry)
+
+
+def iter_comments(conn: Connection, task_id: int) -> Iterator[Comment]:
+    """
+    Iterates over the comments of a task, in the order they were added, through the comments_task index.
+
+    :param conn Connection: Current sqlite3 connection.
+    :param task_id int: ID of the task.
+    :rtype Iterator[Comment]: Comments, read as they are iterated.
+    """
+    return records(conn.execute(COMMENTS, (task_id,)), Comment)
@@ -0,0 +1,181 @@
+import sqlite3
+from pathlib import Path
+from sqlite3 import Connection, Error
+from typing import Dict, Optional, Tuple
+
+from taskminal.migrations import migrate
+
+# Columns copied for each synced table, in the order tables are applied, so tasks exist before their sessions and comments.
+# task_id is translated through the gid of the task, since local ids differ between databases.
+SYNCED: Dict[str, Tuple[str, ...]] = {
+    "tasks": ("name", "completed"),
+    "time": ("task_id", "start_date", "end_date"),
+    "comments": ("task_id", "body"),
+}
+
+
+def resolve_database(name: str) -> Path:
+    """
+    Returns the path of the database to sync with: name itself if it's an existing file, otherwise a database next to the program.
+
+    :param name str: Path of the database, or the name of one listed by listdb. ".db" is appended to names without it.
+    :rtype Path: Path of the database, which may not exist.
+    """
+    if Path(name).is_file():
+        return Path(name)
+    return Path(__file__).with_name(name if name.endswith(".db") else name + ".db")
+
+
+def _site(conn: Connection, schema: str) -> str:
+    return conn.execute(f"SELECT value FROM {schema}.sync_state WHERE key = 'site'").fetchone()[0]
+
+
+def _watermarks(conn: Connection, local: str, remote: str) -> Tuple[int, int]:
+    """
+    Returns the last change of each database the other one is known to have. Both databases store it,
+    and the lowest value is used, so if one of them was restored from a backup, changes are sent again rather than missed.
+
+    :param conn Connection: Connection with the other database attached as peer.
+    :param local str: Site id of the main database.
+    :param remote str: Site id of the peer database.
+    :rtype Tuple[int, int]: Last change of main the peer has, and last change of the peer main has.
+    """
+    sql = "SELECT sent, received FROM {0}.sync_peers WHERE site = ?"
+    main = conn.execute(sql.format("main"), (remote,)).fetchone() or (0, 0)
+    peer = conn.execute(sql.format("peer"), (local,)).fetchone() or (0, 0)
+    return min(main[0], peer[1]), min(main[1], peer[0])
+
+
+def _source_rows(table: str, source: str, target: str) -> str:
+    """
+    Returns a query over the changed rows of a table in source that have to be applied to target, with the target's task ids.
+    Sessions and comments of tasks that don't exist in target are left out.
+
+    :param table str: Table in SYNCED.
+    :param source str: Schema the rows are read from, main or peer.
+    :param target str: Schema the rows are applied to.
+    :rtype str: SQL query, with one gid column followed by the columns of SYNCED.
+    """
+    changed = f"SELECT gid FROM temp.sync_delta WHERE target = '{target}' AND tbl = '{table}'"
+    if table == "tasks":
+        return f"SELECT r.gid AS gid, r.name AS name, r.completed AS completed FROM {source}.tasks r WHERE r.gid IN ({changed})"
+    columns = ", ".join(f"r.{column} AS {column}" for column in SYNCED[table][1:])
+    return f"""SELECT r.gid AS gid, t.id AS task_id, {columns} FROM {source}.{table} r
+               JOIN {source}.tasks s ON s.id = r.task_id JOIN {target}.tasks t ON t.gid = s.gid
+               WHERE r.gid IN ({changed})"""
+
+
+def _upsert(conn: Connection, table: str, source: str, target: str):
+    """
+    Updates the rows of target that changed in source, and inserts the ones it doesn't have.
+    Rows that would break a constraint, like a second open session of a task, are skipped.
+
+    :param conn Connection: Connection with the other database attached as peer.
+    :param table str: Table in SYNCED.
+    :param source str: Schema the rows are read from.
+    :param target str: Schema the rows are written to.
+    """
+    columns = ", ".join(SYNCED[table])
+    differs = " OR ".join(f"r.{column} IS NOT {table}.{column}" for column in SYNCED[table])
+    conn.execute("DROP TABLE IF EXISTS temp.sync_rows")
+    conn.execute(f"CREATE TEMP TABLE sync_rows AS {_source_rows(table, source, target)}")
+    conn.execute("CREATE UNIQUE INDEX temp.sync_rows_gid ON sync_rows(gid)")
+    conn.execute(f"""UPDATE OR IGNORE {target}.{table} SET ({columns}) = (SELECT {columns} FROM temp.sync_rows r WHERE r.gid = {table}.gid)
+                     WHERE gid IN (SELECT gid FROM temp.sync_rows)
+                     AND EXISTS(SELECT 1 FROM temp.sync_rows r WHERE r.gid = {table}.gid AND ({differs}))""")
+    conn.execute(f"""INSERT OR IGNORE INTO {target}.{table}(gid, {columns})
+                     SELECT r.gid, {columns} FROM temp.sync_rows r
+                     WHERE NOT EXISTS(SELECT 1 FROM {target}.{table} existing WHERE existing.gid = r.gid)""")
+    conn.execute("DROP TABLE temp.sync_rows")
+
+
+def _delete(conn: Connection, table: str, source: str, target: str):
+    """
+    Deletes the rows of target that were deleted in source.
+
+    :param conn Connection: Connection with the other database attached as peer.
+    :param table str: Table in SYNCED.
+    :param source str: Schema the rows were deleted from.
+    :param target str: Schema the rows are deleted from.
+    """
+    changed = "SELECT gid FROM temp.sync_delta WHERE target = ? AND tbl = ?"
+    conn.execute(f"""DELETE FROM {target}.{table} WHERE gid IN ({changed})
+                     AND gid NOT IN (SELECT r.gid FROM {source}.{table} r WHERE r.gid IN ({changed}))""",
+                 (target, table, target, table))
+
+
+def sync_databases(conn: Connection, name: str) -> Optional[Tuple[int, int]]:
+    """
+    Merges the active database with another one, both ways, in a single transaction.
+    Only the rows changed since the two databases last synced are read, through the changes table of each one,
+    so the cost depends on the number of changes rather than on the size of the history. The first sync merges everything.
+    If a row changed in both databases, the latest change wins.
+
+    :param conn Connection: Current sqlite3 connection.
+    :param name str: Path of the other database, or the name of one listed by listdb.
+    :rtype Optional[Tuple[int, int]]: Number of changes received and sent, or None if it failed.
+    """
+    from taskminal.main import begin_immediate
+
+    path = resolve_database(name)
+    if path.is_file() is False:
+        print(f"Can't find database {name}")
+        return None
+    if conn.in_transaction:
+        print("Can't sync while a transaction is open.")
+        return None
+    try:
+        other = sqlite3.connect(path)
+        try:
+            migrate(other)
+        finally:
+            other.close()
+        conn.execute("ATTACH DATABASE ? AS peer", (str(path),))
+        # Attached databases start with the default page cache, whatever the tuning profile chose for main.
+        conn.execute(f"PRAGMA peer.cache_size = {conn.execute('PRAGMA main.cache_size').fetchone()[0]}")
+    except Error as e:
+        print(e)
+        return None
+    try:
+        begin_immediate(conn)
+        local, remote = _site(conn, "main"), _site(conn, "peer")
+        if local == remote:
+            # One database is a copy of the other, so the copy gets an id of its own.
+            remote = conn.execute("SELECT lower(hex(randomblob(16)))").fetchone()[0]
+            conn.execute("UPDATE peer.sync_state SET value = ? WHERE key = 'site'", (remote,))
+            conn.execute("UPDATE peer.changes SET origin = ? WHERE origin = ?", (remote, local))
+        sent, received = _watermarks(conn, local, remote)
+        conn.execute("DROP TABLE IF EXISTS temp.sync_delta")
+        conn.execute("""CREATE TEMP TABLE sync_delta(
+                         target text, tbl text, gid text, changed integer, site text, PRIMARY KEY(tbl, gid, target))""")
+        # Changes received from the other database are never sent back to it.
+        collect = """INSERT INTO temp.sync_delta(target, tbl, gid, changed, site)
+                     SELECT ?, tbl, gid, changed, ? FROM {0}.changes WHERE seq > ? AND origin != ?"""
+        conn.execute(collect.format("peer"), ("main", remote, received, local))
+        conn.execute(collect.format("main"), ("peer", local, sent, remote))
+        conn.execute("""DELETE FROM temp.sync_delta WHERE rowid IN (
+                         SELECT d.rowid FROM temp.sync_delta d JOIN temp.sync_delta o ON o.tbl = d.tbl AND o.gid = d.gid AND o.target != d.target
+                         WHERE o.changed > d.changed OR (o.changed = d.changed AND o.site > d.site))""")
+        counts = dict(conn.execute("SELECT target, COUNT(*) FROM temp.sync_delta GROUP BY target"))
+        for source, target, site in (("peer", "main", remote), ("main", "peer", local)):
+            conn.execute(f"INSERT OR REPLACE INTO {target}.sync_state(key, value) VALUES('applying', ?)", (site,))
+            for table in SYNCED:
+                _upsert(conn, table, source, target)
+            for table in reversed(SYNCED):
+                _delete(conn, table, source, target)
+            conn.execute(f"DELETE FROM {target}.sync_state WHERE key = 'applying'")
+        latest = "SELECT COALESCE(MAX(seq), 0) FROM {0}.changes"
+        main_seq, peer_seq = conn.execute(latest.format("main")).fetchone()[0], conn.execute(latest.format("peer")).fetchone()[0]
+        conn.execute("INSERT OR REPLACE INTO main.sync_peers(site, sent, received) VALUES(?, ?, ?)", (remote, main_seq, peer_seq))
+        conn.execute("INSERT OR REPLACE INTO peer.sync_peers(site, sent, received) VALUES(?, ?, ?)", (local, peer_seq, main_seq))
+        conn.commit()
+        conn.execute("DROP TABLE temp.sync_delta")
+    except Error as e:
+        conn.rollback()
+        print(e)
+        return None
+    finally:
+        conn.execute("DETACH DATABASE peer")
+    result = (counts.get("main", 0), counts.get("peer", 0))
+    print(f"Received {result[0]} changes and sent {result[1]} changes.")
+    return result
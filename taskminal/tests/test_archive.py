@@ -0,0 +1,75 @@
+import os
+from datetime import datetime
+from pathlib import Path
+
+import taskminal.main
+from taskminal.main import (init_new_database, connect_to_db, add_task, add_comment, toggle_task, month_totals,
+                            month_report_rows, search, close_connection)
+from taskminal.archive import archive_path, archive_tasks, attach_archive, detach_archive, has_archive
+
+OLD = int(datetime(2020, 1, 6, 9).timestamp())
+RECENT = int(datetime(2021, 6, 7, 9).timestamp())
+CUTOFF = int(datetime(2021, 1, 1).timestamp())
+
+
+def setup_module():
+    init_new_database("archive_test.db", True)
+    conn = connect_to_db("archive_test.db")
+    if archive_path(conn).exists():
+        archive_path(conn).unlink()
+    old = add_task(conn, "Old report")
+    recent = add_task(conn, "Recent report")
+    unfinished = add_task(conn, "Unfinished")
+    conn.executemany("INSERT INTO time(task_id, start_date, end_date) VALUES(?, ?, ?)", [
+        (old, OLD, OLD + 3600),
+        (recent, RECENT, RECENT + 600),
+        (unfinished, OLD, OLD + 60),
+    ])
+    conn.commit()
+    add_comment(conn, old, "Sent to accounting")
+    toggle_task(conn, old)
+    toggle_task(conn, recent)
+    close_connection(conn)
+
+
+def test_archives_old_completed_tasks():
+    conn = connect_to_db("archive_test.db")
+    assert archive_tasks(conn, CUTOFF) == (1, 1, 1)
+    assert [row[0] for row in conn.execute("SELECT name FROM tasks ORDER BY id")] == ["Recent report", "Unfinished"]
+    assert conn.execute("SELECT COUNT(*) FROM comments").fetchone()[0] == 0
+    assert [row[2] for row in search(conn, "report")] == ["Recent report"]
+    assert archive_tasks(conn, CUTOFF) == (0, 0, 0)
+    archive = connect_to_db(archive_path(conn).name)
+    assert archive.execute("SELECT name, completed, total_seconds, sessions FROM tasks").fetchall() == [("Old report", 1, 3600, 1)]
+    assert [row[2] for row in search(archive, "accounting")] == ["Old report"]
+    close_connection(archive)
+
+
+def test_reports_include_archive():
+    conn = connect_to_db("archive_test.db")
+    assert month_totals(conn) == {"2021-06": 600, "2020-01": 60}
+    assert attach_archive(conn)
+    assert has_archive(conn)
+    assert month_totals(conn) == {"2020-01": 3660, "2021-06": 600}
+    assert sorted(row[1] for row in month_report_rows(conn)) == ["Old report", "Recent report", "Unfinished"]
+    detach_archive(conn)
+    assert has_archive(conn) is False
+    assert attach_archive(conn, CUTOFF) is False
+
+
+def test_archived_ids_dont_clash():
+    conn = connect_to_db("archive_test.db")
+    # The archived task's id is free again, so a new task reuses it.
+    reused = add_task(conn, "Reused id")
+    conn.execute("INSERT INTO time(task_id, start_date, end_date) VALUES(?, ?, ?)", (reused, OLD, OLD + 120))
+    conn.commit()
+    toggle_task(conn, reused)
+    assert archive_tasks(conn, CUTOFF, vacuum=False) == (1, 1, 0)
+    archive = connect_to_db(archive_path(conn).name)
+    assert archive.execute("SELECT name, total_seconds FROM tasks ORDER BY id").fetchall() == [("Old report", 3600), ("Reused id", 120)]
+    close_connection(archive)
+
+
+def teardown_module():
+    for name in ("archive_test.db", "archive_test.archive"):
+        os.remove(Path(taskminal.main.__file__).with_name(name))
@@ -0,0 +1,71 @@
+import os
+import sqlite3
+import threading
+from pathlib import Path
+
+import taskminal.main
+from taskminal.main import init_new_database, connect_to_db, add_task, start_task, stop_task, get_all_tasks, close_connection
+from taskminal.backup import backup_database, restore_database, snapshots
+
+
+def setup_module():
+    init_new_database("backup_test.db", True)
+    conn = connect_to_db("backup_test.db")
+    for i in range(200):
+        add_task(conn, f"Task {i} " + "x" * 200)
+    close_connection(conn)
+
+
+def test_can_back_up_while_tasks_are_started(tmp_path):
+    conn = connect_to_db("backup_test.db")
+    done = threading.Event()
+    stopped = []
+
+    def work():
+        # Keeps starting and stopping a task while the backup copies a page at a time.
+        writer = connect_to_db("backup_test.db")
+        while not done.is_set():
+            start_task(writer, 1)
+            stopped.append(stop_task(writer, 1) is not None)
+        close_connection(writer)
+
+    thread = threading.Thread(target=work)
+    thread.start()
+    try:
+        output = backup_database(conn, tmp_path / "copy.db", pages=1, sleep=0.001)
+    finally:
+        done.set()
+        thread.join()
+    assert output == tmp_path / "copy.db" and not (tmp_path / "copy.db.partial").exists()
+    copy = sqlite3.connect(output)
+    assert copy.execute("PRAGMA integrity_check").fetchone()[0] == "ok"
+    assert copy.execute("SELECT COUNT(*) FROM tasks").fetchone()[0] == 200
+    copy.close()
+    assert len(stopped) > 0 and all(stopped)
+
+
+def test_rotates_snapshots(tmp_path):
+    conn = connect_to_db("backup_test.db")
+    for stamp in ("20200101-000000", "20210101-000000"):
+        (tmp_path / f"backup_test-{stamp}.db").write_bytes(b"")
+    (tmp_path / "other-20200101-000000.db").write_bytes(b"")
+    latest = backup_database(conn, folder=tmp_path, keep=2)
+    assert snapshots(tmp_path, "backup_test") == [tmp_path / "backup_test-20210101-000000.db", latest]
+    assert (tmp_path / "other-20200101-000000.db").exists()
+
+
+def test_can_restore(tmp_path):
+    conn = connect_to_db("backup_test.db")
+    output = backup_database(conn, tmp_path / "before.db")
+    add_task(conn, "Added after the backup")
+    assert len(get_all_tasks(conn)) == 201
+    assert restore_database(conn, output, pages=16, sleep=0)
+    assert len(get_all_tasks(conn)) == 200
+    (tmp_path / "bogus.db").write_bytes(b"")
+    assert restore_database(conn, tmp_path / "bogus.db") is False
+    assert restore_database(conn, tmp_path / "missing.db") is False
+    assert len(get_all_tasks(conn)) == 200
+
+
+def teardown_module():
+    os.remove(Path(taskminal.main.__file__).with_name("backup_test.db"))
@@ -0,0 +1,49 @@
+import os
+from io import StringIO
+from pathlib import Path
+
+import taskminal.main
+from taskminal.main import init_new_database, connect_to_db, build_parser, get_all_tasks, get_comments_by_task_index
+from taskminal.batch import run_batch
+
+
+def setup_module():
+    init_new_database("batch_test.db", True)
+
+
+def test_can_run_batch():
+    conn = connect_to_db("batch_test.db")
+    commands = StringIO("""
+# Comments and blank lines are skipped.
+add "First task" -s
+add Second
+comment add 1 "A comment"
+stop 1
+done 2
+""")
+    failed = run_batch(conn, commands, build_parser())
+    assert failed == 0
+    assert get_all_tasks(conn) == [(1, "First task", 0), (2, "Second", 1)]
+    assert len(get_comments_by_task_index(conn, 1)) == 1
+
+
+def test_can_report_failed_commands():
+    conn = connect_to_db("batch_test.db")
+    failed = run_batch(conn, StringIO("stop 2\nnotacommand\nadd Third\nset other.db\n"), build_parser())
+    assert failed == 3
+    assert len(get_all_tasks(conn)) == 3
+    assert run_batch(conn, StringIO("status --watch\n"), build_parser()) == 1
+    assert run_batch(conn, StringIO("tuning wal\ndaemon status\n"), build_parser()) == 2
+    assert run_batch(conn, StringIO("add Kept\nimport tasks /missing/tasks.csv\n"), build_parser()) == 1
+    assert get_all_tasks(conn)[-1].name == "Kept"
+
+
+def test_can_roll_back_on_error():
+    conn = connect_to_db("batch_test.db")
+    failed = run_batch(conn, StringIO("add Fourth\nstart 99\nadd Fifth\n"), build_parser(), stop_on_error=True)
+    assert failed == 1
+    assert len(get_all_tasks(conn)) == 4
+
+
+def teardown_module():
+    os.remove(Path(taskminal.main.__file__).with_name("batch_test.db"))
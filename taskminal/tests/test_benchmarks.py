@@ -0,0 +1,25 @@
+import os
+from pathlib import Path
+
+import benchmarks.run
+import taskminal.main
+from benchmarks.generate import generate_database
+from benchmarks.run import BENCHMARKS, DATABASE, run
+
+
+def test_can_generate_same_database_from_seed():
+    first = generate_database(DATABASE, tasks=50, sessions=5, comments=2, seed=1)
+    second = generate_database(DATABASE, tasks=50, sessions=5, comments=2, seed=1)
+    assert first == second
+    assert first["tasks"] == 50 and first["time"] > 0 and first["comments"] > 0
+
+
+def test_can_run_every_benchmark(monkeypatch):
+    monkeypatch.setattr(benchmarks.run, "SINGLE_OPERATIONS", 5)
+    results = run(list(BENCHMARKS), tasks=50, repeat=1)
+    assert set(results) == set(BENCHMARKS)
+    assert all(result["min_s"] >= 0 for result in results.values())
+
+
+def teardown_module():
+    os.remove(Path(taskminal.main.__file__).with_name(DATABASE))
@@ -0,0 +1,66 @@
+import os
+from pathlib import Path
+
+import taskminal.main
+from taskminal.main import (init_new_database, connect_to_db, add_task, build_parser, parse_ids, run_command, start_tasks, stop_tasks,
+                            done_tasks, delete_tasks, open_sessions, get_all_tasks, close_connection)
+
+
+def setup_module():
+    init_new_database("bulk_test.db", True)
+    conn = connect_to_db("bulk_test.db")
+    for i in range(10):
+        add_task(conn, f"Task {i + 1}")
+    close_connection(conn)
+
+
+def run(conn, *argv) -> bool:
+    return run_command(conn, build_parser(list(argv)).parse_args(list(argv)))
+
+
+def test_can_parse_ids():
+    assert parse_ids("3") == [(3, 3)]
+    assert parse_ids("1, 4,7-200,9-8") == [(1, 1), (4, 4), (7, 200), (8, 9)]
+    assert parse_ids("1,x") is None
+    assert parse_ids("-3") is None
+
+
+def test_can_start_and_stop_many_tasks():
+    conn = connect_to_db("bulk_test.db")
+    assert start_tasks(conn, [(1, 3), (9, 20)]) == 5
+    assert start_tasks(conn, [(1, 4)]) == 1
+    assert [session.task_id for session in open_sessions(conn)] == [1, 2, 3, 4, 9, 10]
+    assert stop_tasks(conn, [(2, 3)]) == 2
+    assert run(conn, "stop", "--all")
+    assert open_sessions(conn) == []
+    assert run(conn, "stop", "--all") is False
+
+
+def test_done_completes_in_one_transaction(capsys):
+    conn = connect_to_db("bulk_test.db")
+    assert run(conn, "start", "5-6")
+    assert done_tasks(conn, [(4, 6)]) == (3, 0)
+    assert open_sessions(conn) == []
+    assert run(conn, "done", "1,5")
+    assert [task.id for task in get_all_tasks(conn) if task.completed] == [1, 4, 5, 6]
+    assert done_tasks(conn, [(1, 2)], toggle=True) == (1, 1)
+    assert run(conn, "done", "4")
+    assert [task.id for task in get_all_tasks(conn) if task.completed] == [2, 5, 6]
+    # A single id goes through toggle_task, with its own messages.
+    capsys.readouterr()
+    assert run(conn, "done", "4")
+    assert "marked as completed" not in capsys.readouterr().out
+    assert [task.id for task in get_all_tasks(conn) if task.completed] == [2, 4, 5, 6]
+    assert run(conn, "done", "50-60") is False
+
+
+def test_can_delete_many_tasks():
+    conn = connect_to_db("bulk_test.db")
+    assert delete_tasks(conn, [(1, 2), (8, 100)]) == 5
+    assert run(conn, "delete", "3,4")
+    assert [task.id for task in get_all_tasks(conn)] == [5, 6, 7]
+    assert conn.execute("SELECT COUNT(*) FROM time WHERE task_id NOT IN (5, 6, 7)").fetchone()[0] == 0
+
+
+def teardown_module():
+    os.remove(Path(taskminal.main.__file__).with_name("bulk_test.db"))
@@ -0,0 +1,45 @@
+import subprocess
+import sys
+from pathlib import Path
+
+import pytest
+
+from taskminal.main import build_parser
+
+
+def test_can_parse_with_lazy_parser():
+    args = build_parser(["start", "3"]).parse_args(["start", "3"])
+    assert args.command == "start" and args.index == "3"
+
+
+def test_can_parse_aliases_with_lazy_parser():
+    args = build_parser(["add", "Title", "-s"]).parse_args(["add", "Title", "-s"])
+    assert args.title == "Title" and args.s is True
+
+
+def test_can_parse_every_command_with_full_parser():
+    parser = build_parser()
+    assert parser.parse_args(["comment", "add", "1", "body"]).body == "body"
+    assert parser.parse_args(["export", "tasks"]).table == "tasks"
+
+
+def test_rejects_batch_sizes_below_one():
+    parser = build_parser()
+    assert parser.parse_args(["import", "tasks", "tasks.csv", "-b", "1"]).batch_size == 1
+    for size in ("0", "-5", "ten"):
+        with pytest.raises(SystemExit):
+            parser.parse_args(["import", "tasks", "tasks.csv", "-b", size])
+
+
+def test_doesnt_import_optional_modules_on_startup():
+    code = "import sys, taskminal.main; print(sorted({'argparse', 'webbrowser', 'taskminal.archive', 'taskminal.config', 'taskminal.report', 'taskminal.repository', 'taskminal.transfer'} & set(sys.modules)))"
+    output = subprocess.run([sys.executable, "-c", code], capture_output=True, text=True, check=True, cwd=Path(__file__).resolve().parents[2]).stdout
+    assert output.strip() == "[]"
+
+
+def test_can_parse_global_options_before_the_command():
+    argv = ["--profile-output", "list", "start", "3"]
+    args = build_parser(argv).parse_args(argv)
+    assert args.command == "start" and args.index == "3" and args.profile_output == "list"
+    args = build_parser(["tuning", "wal"]).parse_args(["tuning", "wal"])
+    assert args.tuning_profile == "wal" and args.profile is False
@@ -0,0 +1,47 @@
+import os
+from datetime import datetime
+from io import StringIO
+from pathlib import Path
+
+import taskminal.main
+from taskminal.main import init_new_database, connect_to_db, add_task, close_connection
+from taskminal.combined import combined_totals, database_names
+from taskminal.report import Report
+
+JANUARY = int(datetime(2021, 1, 15, 12).timestamp())
+FEBRUARY = int(datetime(2021, 2, 15, 12).timestamp())
+
+
+def setup_module():
+    for name, sessions in (("combined_a_test.db", [(JANUARY, 600), (FEBRUARY, 60)]), ("combined_b_test.db", [(JANUARY, 30)])):
+        init_new_database(name, True)
+        conn = connect_to_db(name)
+        id = add_task(conn, "Task")
+        conn.executemany("INSERT INTO time(task_id, start_date, end_date) VALUES(?, ?, ?)",
+                         [(id, start, start + seconds) for start, seconds in sessions])
+        conn.commit()
+        close_connection(conn)
+
+
+def test_can_combine_databases():
+    months = combined_totals(["combined_a_test.db", "combined_b_test", "combined_missing_test.db"], workers=2)
+    assert months == {
+        "2021-01": {"combined_a_test.db": 600, "combined_b_test.db": 30},
+        "2021-02": {"combined_a_test.db": 60},
+    }
+    assert not Path(taskminal.main.__file__).with_name("combined_missing_test.db").exists()
+    assert {"combined_a_test.db", "combined_b_test.db"} <= set(database_names())
+
+
+def test_can_write_combined_report():
+    out = StringIO()
+    Report(out).write_combined(combined_totals(["combined_a_test.db", "combined_b_test.db"]))
+    html = out.getvalue()
+    assert html.index("JANUARY 2021") < html.index("FEBRUARY 2021")
+    assert "<b>combined_b_test.db</b> <b>(0:00:30)</b>" in html
+    assert "Total time: <b>0:10:30</b>" in html
+
+
+def teardown_module():
+    os.remove(Path(taskminal.main.__file__).with_name("combined_a_test.db"))
+    os.remove(Path(taskminal.main.__file__).with_name("combined_b_test.db"))
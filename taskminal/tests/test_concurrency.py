@@ -0,0 +1,76 @@
+import os
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+from contextlib import redirect_stdout
+from io import StringIO
+from multiprocessing import get_context
+from pathlib import Path
+
+import pytest
+
+import taskminal.main
+from taskminal.main import init_new_database, connect_to_db, add_task, start_task, stop_task, close_connection
+from taskminal.migrations import _unique_open_sessions
+
+TASKS = 3
+PROCESSES = 4
+THREADS = 4
+ROUNDS = 25
+MESSAGES = {"This task is now open", "This task is already open", "This task is now closed.", "This task isn't open"}
+
+
+def _toggle(name, tuning, worker):
+    """Starts and stops every task in turn on its own connection. Returns the number of successful starts and stops."""
+    conn = connect_to_db(name, tuning)
+    starts = stops = 0
+    for round in range(ROUNDS):
+        id = (worker + round) % TASKS + 1
+        starts += start_task(conn, id) is not None
+        stops += stop_task(conn, (worker + round + 1) % TASKS + 1) is not None
+    close_connection(conn)
+    return starts, stops
+
+
+def _process(name, tuning, process):
+    out = StringIO()
+    with redirect_stdout(out), ThreadPoolExecutor(THREADS) as pool:
+        results = list(pool.map(lambda thread: _toggle(name, tuning, process * THREADS + thread), range(THREADS)))
+    return [sum(counts) for counts in zip(*results)], out.getvalue()
+
+
+@pytest.mark.parametrize("tuning", ["default", "wal"])
+def test_concurrent_start_and_stop(tuning):
+    name = f"concurrency_{tuning}_test.db"
+    init_new_database(name, True)
+    conn = connect_to_db(name, tuning)
+    for id in range(TASKS):
+        add_task(conn, f"Task {id}")
+    with ProcessPoolExecutor(PROCESSES, mp_context=get_context("spawn")) as pool:
+        results = list(pool.map(_process, [name] * PROCESSES, [tuning] * PROCESSES, range(PROCESSES)))
+    starts = sum(counts[0] for counts, _ in results)
+    stops = sum(counts[1] for counts, _ in results)
+    output = {line for _, out in results for line in out.splitlines()}
+    # No lock errors or unexpected messages, and every reported start and stop matches exactly one session.
+    assert output <= MESSAGES
+    assert conn.execute("SELECT COUNT(*) FROM time").fetchone()[0] == starts
+    assert conn.execute("SELECT COUNT(*) FROM time WHERE end_date IS NOT NULL").fetchone()[0] == stops
+    assert conn.execute("SELECT MAX(open) FROM (SELECT COUNT(*) AS open FROM time WHERE end_date IS NULL GROUP BY task_id)").fetchone()[0] in (None, 1)
+    assert conn.execute("SELECT SUM(sessions) FROM tasks").fetchone()[0] == starts
+    close_connection(conn)
+    for suffix in ("", "-wal", "-shm"):
+        path = Path(taskminal.main.__file__).with_name(name + suffix)
+        if path.exists():
+            os.remove(path)
+
+
+def test_duplicate_open_sessions_are_removed_by_migration():
+    init_new_database("concurrency_test.db", True)
+    conn = connect_to_db("concurrency_test.db")
+    id = add_task(conn, "Task")
+    conn.execute("DROP INDEX time_open")
+    conn.executemany("INSERT INTO time(task_id, start_date) VALUES(?, ?)", [(id, 300), (id, 100), (id, 200)])
+    _unique_open_sessions(conn)
+    conn.commit()
+    assert conn.execute("SELECT start_date FROM time").fetchall() == [(100,)]
+    assert start_task(conn, id) is None
+    close_connection(conn)
+    os.remove(Path(taskminal.main.__file__).with_name("concurrency_test.db"))
@@ -0,0 +1,71 @@
+import os
+from pathlib import Path
+
+import taskminal.main
+from taskminal.config import active_database, get_tuning, set_active_database, set_tuning, tuning_name
+from taskminal.main import init_new_database, connect_to_db
+
+
+def setup_module():
+    init_new_database("config_test.db", True)
+
+
+def test_can_store_active_database(monkeypatch, tmp_path):
+    monkeypatch.setenv("TASKMINAL_CONFIG", str(tmp_path / "taskminal.ini"))
+    monkeypatch.delenv("TASKMINAL_DB", raising=False)
+    set_active_database("config_test.db")
+    assert active_database() == "config_test.db"
+    monkeypatch.setenv("TASKMINAL_DB", "other.db")
+    assert active_database() == "other.db"
+
+
+def test_can_select_tuning_profile(monkeypatch, tmp_path):
+    monkeypatch.setenv("TASKMINAL_CONFIG", str(tmp_path / "taskminal.ini"))
+    monkeypatch.delenv("TASKMINAL_TUNING", raising=False)
+    assert tuning_name() == "default"
+    assert set_tuning("wal") is True
+    assert tuning_name() == "wal"
+    assert set_tuning("missing") is False
+    monkeypatch.setenv("TASKMINAL_TUNING", "bulk")
+    assert get_tuning()["synchronous"] == "off"
+
+
+def test_can_read_custom_tuning_profile(monkeypatch, tmp_path):
+    config = tmp_path / "taskminal.ini"
+    config.write_text("[tuning:custom]\nsynchronous = NORMAL\ncache_size = -4096\n")
+    monkeypatch.setenv("TASKMINAL_CONFIG", str(config))
+    assert get_tuning("custom") == {"synchronous": "normal", "busy_timeout": 5000, "cache_size": -4096}
+
+
+def test_can_reject_invalid_tuning(monkeypatch, tmp_path):
+    config = tmp_path / "taskminal.ini"
+    config.write_text("[tuning:broken]\njournal_mode = wal; DROP TABLE tasks\n")
+    monkeypatch.setenv("TASKMINAL_CONFIG", str(config))
+    assert get_tuning("broken") is None
+
+
+def test_can_apply_tuning_on_connect(monkeypatch, tmp_path):
+    monkeypatch.setenv("TASKMINAL_CONFIG", str(tmp_path / "taskminal.ini"))
+    conn = connect_to_db("config_test.db", "report")
+    assert conn.execute("PRAGMA journal_mode").fetchone()[0] == "wal"
+    assert conn.execute("PRAGMA cache_size").fetchone()[0] == -262144
+    assert conn.execute("PRAGMA busy_timeout").fetchone()[0] == 5000
+    conn.close()
+
+
+def test_can_connect_while_a_wal_connection_is_open(monkeypatch, tmp_path):
+    monkeypatch.setenv("TASKMINAL_CONFIG", str(tmp_path / "taskminal.ini"))
+    wal = connect_to_db("config_test.db", "wal")
+    conn = connect_to_db("config_test.db", "default")
+    assert conn.execute("PRAGMA journal_mode").fetchone()[0] == "wal"
+    custom = tmp_path / "custom.ini"
+    custom.write_text("[tuning:rollback]\njournal_mode = delete\n")
+    monkeypatch.setenv("TASKMINAL_CONFIG", str(custom))
+    rollback = connect_to_db("config_test.db", "rollback")
+    assert rollback.execute("PRAGMA journal_mode").fetchone()[0] == "wal"
+    for connection in (wal, conn, rollback):
+        connection.close()
+
+
+def teardown_module():
+    os.remove(Path(taskminal.main.__file__).with_name("config_test.db"))
@@ -0,0 +1,103 @@
+import os
+import threading
+import time
+from pathlib import Path
+
+import pytest
+
+import taskminal.config
+import taskminal.daemon
+import taskminal.main
+from taskminal.main import init_new_database, connect_to_db, get_all_tasks
+from taskminal.daemon import forward, reconnect, serve, stop
+
+pytestmark = pytest.mark.skipif(not hasattr(taskminal.daemon.socket, "AF_UNIX"), reason="Unix domain sockets not available")
+
+
+@pytest.fixture(scope="module")
+def daemon(tmp_path_factory):
+    os.environ["TASKMINAL_SOCKET"] = str(tmp_path_factory.mktemp("daemon") / "taskminal.sock")
+    init_new_database("daemon_test.db", True)
+    original = taskminal.config.active_database
+    taskminal.config.active_database = lambda: "daemon_test.db"
+    thread = threading.Thread(target=serve, daemon=True)
+    thread.start()
+    while not taskminal.daemon.socket_path().exists():
+        time.sleep(0.01)
+    yield
+    stop()
+    thread.join(5)
+    taskminal.config.active_database = original
+    del os.environ["TASKMINAL_SOCKET"]
+    os.remove(Path(taskminal.main.__file__).with_name("daemon_test.db"))
+
+
+def test_can_forward_commands(daemon, capsys):
+    assert forward(["add", "From the daemon"]) is True
+    assert "Task added sucessfully" in capsys.readouterr().out
+    assert get_all_tasks(connect_to_db("daemon_test.db")) == [(1, "From the daemon", 0)]
+
+
+def test_uses_the_client_database(daemon, monkeypatch):
+    init_new_database("daemon_other_test.db", True)
+    monkeypatch.setenv("TASKMINAL_DB", "daemon_other_test.db")
+    try:
+        assert forward(["add", "Meant for the other database"]) is True
+        assert get_all_tasks(connect_to_db("daemon_other_test.db")) == [(1, "Meant for the other database", 0)]
+        monkeypatch.setenv("TASKMINAL_CONFIG", "other.ini")
+        assert forward(["list"]) is False
+    finally:
+        os.remove(Path(taskminal.main.__file__).with_name("daemon_other_test.db"))
+    monkeypatch.delenv("TASKMINAL_DB")
+    monkeypatch.delenv("TASKMINAL_CONFIG")
+    assert forward(["add", "Back to the active one"]) is True
+    assert len(get_all_tasks(connect_to_db("daemon_test.db"))) == 2
+
+
+def test_can_switch_tuning_profiles(daemon, monkeypatch):
+    monkeypatch.setenv("TASKMINAL_TUNING", "wal")
+    assert forward(["add", "With WAL"]) is True
+    monkeypatch.setenv("TASKMINAL_TUNING", "default")
+    assert forward(["add", "Back to the default profile"]) is True
+    assert get_all_tasks(connect_to_db("daemon_test.db"))[-1].name == "Back to the default profile"
+
+
+def test_reopens_replaced_databases(daemon):
+    assert forward(["add", "Before replacing"]) is True
+    init_new_database("daemon_test.db", True)
+    assert forward(["add", "After replacing"]) is True
+    assert get_all_tasks(connect_to_db("daemon_test.db")) == [(1, "After replacing", 0)]
+    reconnect()
+    assert forward(["add", "After reconnecting"]) is True
+    assert len(get_all_tasks(connect_to_db("daemon_test.db"))) == 2
+
+
+def test_runs_local_commands_locally(daemon):
+    assert forward(["report"]) is False
+
+
+def test_falls_back_when_not_running(monkeypatch, tmp_path):
+    monkeypatch.setenv("TASKMINAL_SOCKET", str(tmp_path / "missing.sock"))
+    assert forward(["list"]) is False
+
+
+def test_socket_is_private(monkeypatch, tmp_path, capsys):
+    monkeypatch.delenv("TASKMINAL_SOCKET", raising=False)
+    monkeypatch.setenv("XDG_RUNTIME_DIR", str(tmp_path))
+    path = taskminal.daemon.socket_path()
+    path.parent.mkdir(mode=0o755)
+    path.parent.chmod(0o755)
+    serve()
+    assert "must be a folder only you can access" in capsys.readouterr().out
+    path.parent.chmod(0o700)
+    path.write_text("")
+    assert forward(["list"]) is False
+    serve()
+    assert "isn't your daemon's socket" in capsys.readouterr().out
+    path.unlink()
+    thread = threading.Thread(target=serve, daemon=True)
+    thread.start()
+    while not path.exists():
+        time.sleep(0.01)
+    assert stop()
+    thread.join(5)
@@ -1,7 +1,7 @@
 from datetime import datetime
 import os
 
-from taskminal.main import init_new_database, list_databases, connect_to_db, add_task, get_all_tasks, start_task, get_time, remove_task_by_index, stop_task, toggle_task, add_comment, get_comments_by_task_index, delete_comment, close_connection
+from taskminal.main import init_new_database, list_databases, connect_to_db, add_task, get_all_tasks, start_task, get_time, remove_task_by_index, stop_task, toggle_task, add_comment, get_comments_by_task_index, delete_comment, close_connection, list_tasks
 
 
 def test_can_create_a_new_database():
@@ -33,8 +33,8 @@ def test_can_connect_to_db():
 def test_can_create_table():
     conn = connect_to_db("test.db")
     cursor = conn.cursor()
-    cursor.execute("SELECT name FROM sqlite_master WHERE type='table';")
-    assert cursor.fetchall() == [('tasks',), ('time',), ('comments',), ]
+    cursor.execute("SELECT name FROM sqlite_master WHERE type='table' AND name NOT LIKE '%_fts%';")
+    assert sorted(cursor.fetchall()) == [('changes',), ('comments',), ('report_cache',), ('sqlite_sequence',), ('sync_peers',), ('sync_state',), ('tasks',), ('time',), ]
 
 
 def test_can_add_task():
@@ -102,6 +102,19 @@ def test_can_delete_comments():
     assert len(comments) == 0
 
 
+def test_can_list_tasks():
+    conn = connect_to_db("test.db")
+    ids = set(row[0] for row in list_tasks(conn))
+    assert ids == set(task[0] for task in get_all_tasks(conn))
+
+
+def test_can_list_only_completed_tasks():
+    conn = connect_to_db("test.db")
+    rows = list(list_tasks(conn, completed=True, comments=False))
+    assert len(rows) != 0
+    assert all(row[2] == 1 for row in rows)
+
+
 def test_can_close_connection():
     conn = connect_to_db("test.db")
     conn = close_connection(conn)
@@ -0,0 +1,72 @@
+import os
+from pathlib import Path
+
+import taskminal.main
+from taskminal.main import init_new_database, connect_to_db, add_task, add_comment, toggle_task, list_tasks, build_parser, run_command
+
+
+def setup_module():
+    init_new_database("list_test.db", True)
+    conn = connect_to_db("list_test.db")
+    for name in ("Write docs", "Fix 100% CPU bug", "Review docs", "Plan sprint", "Write tests"):
+        add_task(conn, name)
+    toggle_task(conn, 2)
+    add_comment(conn, 1, "first")
+    add_comment(conn, 1, "second")
+    conn.executemany("INSERT INTO time(task_id, start_date, end_date) VALUES(?,?,?)", [
+        (1, 1000, 1100), (3, 2000, 2500), (4, 500, 800), (5, 4000, None),
+    ])
+    conn.commit()
+    conn.close()
+
+
+def ids(rows):
+    return list(dict.fromkeys(row[0] for row in rows))
+
+
+def test_can_filter_by_status_and_name():
+    conn = connect_to_db("list_test.db")
+    assert ids(list_tasks(conn, completed=False, name="DOCS")) == [1, 3]
+    assert ids(list_tasks(conn, completed=True, comments=False)) == [2]
+    assert ids(list_tasks(conn, name="100%")) == [2]
+
+
+def test_can_sort_by_time_and_activity():
+    conn = connect_to_db("list_test.db")
+    assert ids(list_tasks(conn, comments=False, sort="time")) == [3, 4, 1, 5, 2]
+    assert ids(list_tasks(conn, comments=False, sort="activity")) == [5, 3, 1, 4, 2]
+
+
+def test_can_paginate():
+    conn = connect_to_db("list_test.db")
+    first = list_tasks(conn, limit=2).fetchall()
+    assert ids(first) == [1, 2]
+    assert len(first) == 3
+    assert ids(list_tasks(conn, limit=2, after=2)) == [3, 4]
+    assert ids(list_tasks(conn, comments=False, sort="time", limit=2, after=4)) == [1, 5]
+
+
+def test_can_keep_last_activity():
+    conn = connect_to_db("list_test.db")
+    conn.execute("UPDATE time SET end_date = 4200 WHERE task_id = 5")
+    conn.execute("DELETE FROM time WHERE task_id = 3")
+    conn.commit()
+    activity = dict(conn.execute("SELECT id, last_active FROM tasks"))
+    assert activity == {1: 1100, 2: 0, 3: 0, 4: 800, 5: 4200}
+
+
+def test_can_keep_sessions_without_start():
+    conn = connect_to_db("list_test.db")
+    conn.execute("INSERT INTO time(task_id, start_date, end_date) VALUES(4, NULL, NULL)")
+    conn.commit()
+    assert conn.execute("SELECT last_active FROM tasks WHERE id = 4").fetchone()[0] == 800
+
+
+def test_rejects_limits_below_one(capsys):
+    conn = connect_to_db("list_test.db")
+    assert run_command(conn, build_parser(["list"]).parse_args(["list", "--limit", "0"])) is False
+    assert capsys.readouterr().out == "The limit must be at least 1.\n"
+
+
+def teardown_module():
+    os.remove(Path(taskminal.main.__file__).with_name("list_test.db"))
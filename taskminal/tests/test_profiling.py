@@ -0,0 +1,70 @@
+import json
+import os
+from io import StringIO
+from pathlib import Path
+
+import taskminal.main
+from taskminal.main import init_new_database, connect_to_db, add_task, add_comment, get_task_by_index, start_task, close_connection
+from taskminal.profiling import Profiler, normalize
+from taskminal.repository import TASK
+
+
+def setup_module():
+    init_new_database("profiling_test.db", True)
+
+
+def test_can_normalize_statements():
+    assert normalize("SELECT * FROM tasks\n  WHERE id=12 AND name = 'it''s'") == "SELECT * FROM tasks WHERE id=? AND name = ?"
+
+
+def test_can_record_statements(tmp_path):
+    profiler = Profiler(str(tmp_path / "stats.pstats"))
+    profiler.start("test")
+    conn = connect_to_db("profiling_test.db")
+    profiler.attach(conn)
+    id = add_task(conn, "Task")
+    for _ in range(5):
+        get_task_by_index(conn, id)
+    start_task(conn, id)
+    close_connection(conn)
+    profiler.stop()
+    results = profiler.results()
+    grouped = {group["sql"]: group["count"] for group in results["grouped"]}
+    assert grouped[normalize(TASK)] >= 5
+    assert results["queries"] == len(results["statements"]) >= 8
+    assert results["wall_s"] >= results["sql_s"] > 0
+    assert sum(results["triggers"].values()) > 0
+    assert (tmp_path / "stats.pstats").exists()
+    profiler.write_json(str(tmp_path / "profile.json"))
+    assert json.loads((tmp_path / "profile.json").read_text())["command"] == "test"
+    out = StringIO()
+    profiler.print_summary(out, top=3)
+    assert out.getvalue().startswith("Profile of test:")
+
+
+def test_ignores_internal_statements():
+    conn = connect_to_db("profiling_test.db")
+    id = add_task(conn, "Task")
+    profiler = Profiler()
+    profiler.start("comment")
+    profiler.attach(conn)
+    add_comment(conn, id, "Searchable")
+    profiler.stop()
+    results = profiler.results()
+    assert [normalize(statement) for statement, _ in profiler.statements][-2:] == ["INSERT INTO comments(task_id,body) VALUES(?,?)", "COMMIT"]
+    assert all("'main'." not in sql for sql in [s["sql"] for s in results["statements"]] + list(results["triggers"]))
+    close_connection(conn)
+
+
+def test_connect_to_db_attaches_profiler():
+    taskminal.main.PROFILER = Profiler()
+    try:
+        close_connection(connect_to_db("profiling_test.db"))
+    finally:
+        profiler, taskminal.main.PROFILER = taskminal.main.PROFILER, None
+    profiler.stop()
+    assert any(statement.startswith("PRAGMA foreign_keys") for statement, _ in profiler.statements)
+
+
+def teardown_module():
+    os.remove(Path(taskminal.main.__file__).with_name("profiling_test.db"))
@@ -0,0 +1,151 @@
+import json
+import os
+from datetime import datetime
+from io import StringIO
+from pathlib import Path
+
+import taskminal.main
+from taskminal.main import (init_new_database, connect_to_db, add_task, month_report_rows, month_totals, month_task_totals,
+                            refresh_report_cache, rebuild_report_cache, stop_task, remove_task_by_index, hour_histogram)
+from taskminal.report import Report, write_records
+
+
+def timestamp(*args) -> int:
+    return int(datetime(*args).timestamp())
+
+
+def setup_module():
+    init_new_database("report_test.db", True)
+    conn = connect_to_db("report_test.db")
+    first = add_task(conn, "First")
+    second = add_task(conn, "Second")
+    conn.executemany("INSERT INTO time(task_id, start_date, end_date) VALUES(?,?,?)", [
+        (first, timestamp(2020, 3, 2, 10), timestamp(2020, 3, 2, 11)),
+        (second, timestamp(2021, 3, 5, 9), timestamp(2021, 3, 5, 9, 30)),
+        (first, timestamp(2021, 3, 6, 9), timestamp(2021, 3, 6, 10)),
+        (second, timestamp(2021, 4, 1, 9), None),
+    ])
+    conn.commit()
+    conn.close()
+
+
+def test_can_group_totals_by_year_and_month():
+    conn = connect_to_db("report_test.db")
+    assert month_totals(conn) == {"2020-03": 3600, "2021-03": 5400}
+
+
+def test_can_get_report_rows_in_order():
+    conn = connect_to_db("report_test.db")
+    rows = list(month_report_rows(conn))
+    assert [(month, name, seconds) for month, name, _, _, seconds in rows] == [
+        ("2020-03", "First", 3600),
+        ("2021-03", "Second", 1800),
+        ("2021-03", "First", 3600),
+    ]
+
+
+def test_can_stream_report():
+    conn = connect_to_db("report_test.db")
+    out = StringIO()
+    Report(out).write_months(month_report_rows(conn), month_totals(conn))
+    html = out.getvalue()
+    assert html.count("</html>") == 1
+    assert html.index("MARCH 2020") < html.index("MARCH 2021")
+    assert "Total time: <b>1:30:00</b>" in html
+
+
+def test_can_filter_by_date_range():
+    conn = connect_to_db("report_test.db")
+    start, end = timestamp(2021, 3, 1), timestamp(2021, 3, 6)
+    assert [row[1] for row in month_report_rows(conn, start, end)] == ["Second"]
+    assert month_totals(conn, start=timestamp(2021, 1, 1)) == {"2021-03": 5400}
+    assert month_totals(conn, end=timestamp(2021, 1, 1)) == {"2020-03": 3600}
+    assert list(month_task_totals(conn, start, end)) == [("2021-03", "Second", 1800, 1)]
+
+
+def test_can_write_records():
+    rows = [("2021-03", "Second", 1800, 1), ("2021-03", 'Quoted "name"', 60, 2)]
+    columns = ("month", "task", "seconds", "sessions")
+    out = StringIO()
+    assert write_records(out, columns, rows, "csv") == 2
+    assert out.getvalue().splitlines() == ["month,task,seconds,sessions", "2021-03,Second,1800,1", '2021-03,"Quoted ""name""",60,2']
+    out = StringIO()
+    write_records(out, columns, rows, "json")
+    assert json.loads(out.getvalue())[1] == {"month": "2021-03", "task": 'Quoted "name"', "seconds": 60, "sessions": 2}
+    out = StringIO()
+    write_records(out, columns, iter(()), "json")
+    assert json.loads(out.getvalue()) == []
+    out = StringIO()
+    write_records(out, columns, rows, "ndjson")
+    assert [json.loads(line)["seconds"] for line in out.getvalue().splitlines()] == [1800, 60]
+
+
+def test_can_summarize_tasks_per_month():
+    conn = connect_to_db("report_test.db")
+    assert list(month_task_totals(conn)) == [
+        ("2020-03", "First", 3600, 1),
+        ("2021-03", "First", 3600, 1),
+        ("2021-03", "Second", 1800, 1),
+    ]
+    out = StringIO()
+    Report(out).write_summary(month_task_totals(conn), month_totals(conn))
+    assert "<b>Second</b><br> 1 sessions <b>(0:30:00)</b>" in out.getvalue()
+
+
+def test_cache_only_recomputes_changed_months():
+    conn = connect_to_db("report_test.db")
+    month_totals(conn)
+    assert refresh_report_cache(conn) == 0
+    conn.execute("UPDATE time SET end_date = end_date + 60 WHERE start_date = ?", (timestamp(2021, 3, 5, 9),))
+    conn.commit()
+    assert conn.execute("SELECT month, task_id FROM report_cache WHERE seconds IS NULL").fetchall() == [("2021-03", 2)]
+    assert month_totals(conn) == {"2020-03": 3600, "2021-03": 5460}
+    stop_task(conn, 2)
+    assert month_totals(conn)["2021-04"] > 0
+    remove_task_by_index(conn, 2)
+    assert month_totals(conn) == {"2020-03": 3600, "2021-03": 3600}
+    conn.execute("UPDATE report_cache SET seconds = 0")
+    conn.commit()
+    rebuild_report_cache(conn)
+    assert month_totals(conn) == {"2020-03": 3600, "2021-03": 3600}
+
+
+def test_skips_sessions_without_start():
+    conn = connect_to_db("report_test.db")
+    conn.execute("INSERT INTO time(task_id, start_date, end_date) VALUES(1, NULL, ?)", (timestamp(2021, 3, 7),))
+    conn.commit()
+    assert month_totals(conn) == {"2020-03": 3600, "2021-03": 3600}
+    conn.execute("UPDATE time SET start_date = end_date - 60 WHERE start_date IS NULL")
+    conn.commit()
+    assert month_totals(conn) == {"2020-03": 3600, "2021-03": 3660}
+    conn.execute("DELETE FROM time WHERE end_date = ?", (timestamp(2021, 3, 7),))
+    conn.commit()
+    assert month_totals(conn) == {"2020-03": 3600, "2021-03": 3600}
+
+
+def test_can_split_sessions_into_hours():
+    init_new_database("histogram_test.db", True)
+    conn = connect_to_db("histogram_test.db")
+    id = add_task(conn, "Task")
+    # Monday 23:30 to Tuesday 01:15, and Wednesday 10:10 to 10:40.
+    conn.executemany("INSERT INTO time(task_id, start_date, end_date) VALUES(?,?,?)", [
+        (id, timestamp(2021, 3, 1, 23, 30), timestamp(2021, 3, 2, 1, 15)),
+        (id, timestamp(2021, 3, 3, 10, 10), timestamp(2021, 3, 3, 10, 40)),
+    ])
+    conn.commit()
+    assert list(hour_histogram(conn)) == [(0, 23, 1800), (1, 0, 3600), (1, 1, 900), (2, 10, 1800)]
+    assert list(hour_histogram(conn, start=timestamp(2021, 3, 2))) == [(2, 10, 1800)]
+    out = StringIO()
+    Report(out).write_histogram(hour_histogram(conn))
+    assert "<tr><th>Tuesday</th><td>1:00</td><td>0:15</td>" in out.getvalue()
+    # Eight days from Monday 00:00 fill every hour of the week once, and Monday twice.
+    conn.execute("INSERT INTO time(task_id, start_date, end_date) VALUES(?,?,?)", (id, timestamp(2021, 5, 3), timestamp(2021, 5, 11)))
+    conn.commit()
+    week = hour_histogram(conn, start=timestamp(2021, 5, 1))
+    assert len(week) == 168 and all(seconds == (7200 if weekday == 0 else 3600) for weekday, _, seconds in week)
+    conn.close()
+    os.remove(Path(taskminal.main.__file__).with_name("histogram_test.db"))
+
+
+def teardown_module():
+    os.remove(Path(taskminal.main.__file__).with_name("report_test.db"))
@@ -0,0 +1,43 @@
+import os
+from pathlib import Path
+
+import taskminal.main
+from taskminal.main import init_new_database, connect_to_db, add_task, add_comment, start_task, stop_task, list_tasks, close_connection
+from taskminal.repository import Comment, Task, TaskListing, get_task, iter_comments, iter_sessions, iter_tasks, task_exists
+
+
+def setup_module():
+    init_new_database("repository_test.db", True)
+    conn = connect_to_db("repository_test.db")
+    first = add_task(conn, "First")
+    add_task(conn, "Second")
+    add_comment(conn, first, "A comment")
+    start_task(conn, first)
+    stop_task(conn, first)
+    close_connection(conn)
+
+
+def test_records_behave_like_tuples():
+    conn = connect_to_db("repository_test.db")
+    task = get_task(conn, 1)
+    assert task == (1, "First", 0) and isinstance(task, Task)
+    assert task.name == "First"
+    (id, name, completed) = task
+    assert id == 1 and get_task(conn, 3) is None
+    assert task_exists(conn, 2) and task_exists(conn, 3) is False
+
+
+def test_queries_return_iterators():
+    conn = connect_to_db("repository_test.db")
+    tasks = iter_tasks(conn)
+    assert next(tasks) == Task(1, "First", 0)
+    assert [task.name for task in tasks] == ["Second"]
+    assert list(iter_comments(conn, 1)) == [Comment(1, 1, "A comment")]
+    (session,) = iter_sessions(conn, 1)
+    assert session.task_id == 1 and session.end_date >= session.start_date
+    row = next(list_tasks(conn))
+    assert isinstance(row, TaskListing) and row.comment_body == "A comment"
+
+
+def teardown_module():
+    os.remove(Path(taskminal.main.__file__).with_name("repository_test.db"))
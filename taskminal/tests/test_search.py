@@ -0,0 +1,61 @@
+import os
+from pathlib import Path
+
+import taskminal.main
+from taskminal.main import (init_new_database, connect_to_db, add_task, add_comment, delete_comment, remove_task_by_index,
+                            search, rebuild_search_index)
+
+
+def setup_module():
+    init_new_database("search_test.db", True)
+    conn = connect_to_db("search_test.db")
+    for name in ("Write documentation", "Fix login bug", "Review pull requests"):
+        add_task(conn, name)
+    add_comment(conn, 2, "The login form crashes on empty passwords")
+    add_comment(conn, 3, "Ask about the documentation style")
+    conn.close()
+
+
+def test_finds_tasks_and_comments():
+    conn = connect_to_db("search_test.db")
+    results = search(conn, "login")
+    assert [(kind, task_id, comment_id) for kind, task_id, _, comment_id, _ in results] in (
+        [("task", 2, None), ("comment", 2, 1)], [("comment", 2, 1), ("task", 2, None)])
+    assert results[0][4].count("[login]") == 1 or results[0][4].count("[Login]") == 1
+
+
+def test_matches_prefixes_and_every_word():
+    conn = connect_to_db("search_test.db")
+    assert {row[1] for row in search(conn, "doc")} == {1, 3}
+    assert [row[1] for row in search(conn, "doc style")] == [3]
+    assert search(conn, 'unknown "quote') == []
+
+
+def test_index_follows_changes():
+    conn = connect_to_db("search_test.db")
+    id = add_task(conn, "Deploy release")
+    comment = add_comment(conn, id, "Tag the release first")
+    assert len(search(conn, "release")) == 2
+    delete_comment(conn, comment)
+    assert len(search(conn, "release")) == 1
+    conn.execute("UPDATE tasks SET name = 'Ship it' WHERE id = ?", (id,))
+    conn.commit()
+    assert search(conn, "release") == []
+    remove_task_by_index(conn, id)
+    assert search(conn, "ship") == []
+
+
+def test_limit_and_rebuild():
+    conn = connect_to_db("search_test.db")
+    assert len(search(conn, "doc", limit=1)) == 1
+    assert rebuild_search_index(conn)
+    assert {row[1] for row in search(conn, "doc")} == {1, 3}
+
+
+def test_raw_queries():
+    conn = connect_to_db("search_test.db")
+    assert {row[1] for row in search(conn, "login OR review", raw=True)} == {2, 3}
+
+
+def teardown_module():
+    os.remove(Path(taskminal.main.__file__).with_name("search_test.db"))
@@ -0,0 +1,56 @@
+import os
+from datetime import datetime
+from pathlib import Path
+
+import taskminal.main
+from taskminal.main import (init_new_database, connect_to_db, add_task, start_task, stop_task, open_sessions, format_status,
+                            print_status, close_connection)
+
+
+def setup_module():
+    init_new_database("status_test.db", True)
+    conn = connect_to_db("status_test.db")
+    add_task(conn, "Idle")
+    add_task(conn, "Busy")
+    close_connection(conn)
+
+
+def test_shows_only_open_sessions():
+    conn = connect_to_db("status_test.db")
+    assert format_status(open_sessions(conn), 0) == "No timers running."
+    start_task(conn, 2)
+    sessions = open_sessions(conn)
+    assert [(index, name) for index, name, _ in sessions] == [(2, "Busy")]
+    start = sessions[0][2]
+    since = datetime.fromtimestamp(start).strftime("%H:%M")
+    assert format_status(sessions, start + 3725) == f"[2] - Busy\nRunning: 1:02:05 (since {since})"
+    stop_task(conn, 2)
+    assert open_sessions(conn) == []
+
+
+def test_watch_refreshes_after_other_connections_commit(monkeypatch, capsys):
+    conn = connect_to_db("status_test.db")
+    other = connect_to_db("status_test.db")
+    refreshes = []
+
+    def fake_sleep(interval):
+        refreshes.append(interval)
+        if len(refreshes) == 1:
+            other.execute("INSERT INTO time(task_id, start_date) VALUES(1, ?)", (int(datetime.now().timestamp()),))
+            other.commit()
+        elif len(refreshes) == 2:
+            other.execute("UPDATE time SET end_date = start_date WHERE end_date IS NULL")
+            other.commit()
+        else:
+            raise KeyboardInterrupt
+
+    monkeypatch.setattr(taskminal.main, "sleep", fake_sleep)
+    print_status(conn, watch=True, interval=5)
+    frames = capsys.readouterr().out.split("\n")
+    assert refreshes == [5, 5, 5]
+    assert frames[0] == "No timers running." and frames[1] == "[1] - Idle" and frames[-2] == "No timers running."
+    close_connection(other)
+
+
+def teardown_module():
+    os.remove(Path(taskminal.main.__file__).with_name("status_test.db"))
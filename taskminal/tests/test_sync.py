@@ -0,0 +1,105 @@
+import os
+import shutil
+import sqlite3
+from pathlib import Path
+
+import taskminal.main
+from taskminal.main import (init_new_database, connect_to_db, add_task, add_comment, start_task, stop_task, toggle_task,
+                            remove_task_by_index, close_connection)
+from taskminal.migrations import MIGRATIONS, _sync_defaults, migrate
+from taskminal.sync import sync_databases
+
+NAMES = ("sync_a_test.db", "sync_b_test.db", "sync_c_test.db")
+
+
+def setup_module():
+    for name, tasks in ((NAMES[0], ["Laptop task", "Shared name"]), (NAMES[1], ["Desktop task"])):
+        init_new_database(name, True)
+        conn = connect_to_db(name)
+        for task in tasks:
+            id = add_task(conn, task)
+            start_task(conn, id)
+            stop_task(conn, id)
+        add_comment(conn, 1, f"Written in {name}")
+        close_connection(conn)
+
+
+def contents(name):
+    conn = connect_to_db(name)
+    tasks = sorted(conn.execute("SELECT name, completed, sessions FROM tasks"))
+    comments = sorted(conn.execute("SELECT tasks.name, body FROM comments JOIN tasks ON tasks.id = comments.task_id"))
+    close_connection(conn)
+    return tasks, comments
+
+
+def test_first_sync_merges_everything():
+    conn = connect_to_db(NAMES[0])
+    assert sync_databases(conn, NAMES[1]) == (3, 5)
+    assert contents(NAMES[0]) == contents(NAMES[1]) == (
+        [("Desktop task", 0, 1), ("Laptop task", 0, 1), ("Shared name", 0, 1)],
+        [("Desktop task", "Written in sync_b_test.db"), ("Laptop task", "Written in sync_a_test.db")],
+    )
+    assert sync_databases(conn, NAMES[1]) == (0, 0)
+
+
+def test_only_changes_are_exchanged():
+    a, b = connect_to_db(NAMES[0]), connect_to_db(NAMES[1])
+    toggle_task(a, 1)
+    start_task(a, 2)
+    remove_task_by_index(b, 1)
+    assert sync_databases(a, str(Path(taskminal.main.__file__).with_name(NAMES[1]))) == (3, 2)
+    assert contents(NAMES[0]) == contents(NAMES[1])
+    tasks, comments = contents(NAMES[0])
+    assert tasks == [("Laptop task", 1, 1), ("Shared name", 0, 2)]
+    assert comments == [("Laptop task", "Written in sync_a_test.db")]
+    assert b.execute("SELECT COUNT(*) FROM time WHERE end_date IS NULL").fetchone()[0] == 1
+    assert sync_databases(b, NAMES[0]) == (0, 0)
+
+
+def test_latest_change_wins():
+    a, b = connect_to_db(NAMES[0]), connect_to_db(NAMES[1])
+    a.execute("UPDATE tasks SET name = 'Renamed on the laptop' WHERE name = 'Shared name'")
+    a.execute("UPDATE changes SET changed = changed - 60 WHERE seq = (SELECT MAX(seq) FROM changes)")
+    a.commit()
+    b.execute("UPDATE tasks SET name = 'Renamed on the desktop' WHERE name = 'Shared name'")
+    b.commit()
+    assert sync_databases(a, NAMES[1]) == (1, 0)
+    assert contents(NAMES[0])[0] == contents(NAMES[1])[0] == [("Laptop task", 1, 1), ("Renamed on the desktop", 0, 2)]
+
+
+def test_can_sync_with_a_copy():
+    folder = Path(taskminal.main.__file__).parent
+    shutil.copy(folder / NAMES[0], folder / NAMES[2])
+    c = connect_to_db(NAMES[2])
+    add_task(c, "Added to the copy")
+    close_connection(c)
+    a = connect_to_db(NAMES[0])
+    assert sync_databases(a, NAMES[2]) is not None
+    assert contents(NAMES[0]) == contents(NAMES[2])
+    assert ("Added to the copy", 0, 0) in contents(NAMES[0])[0]
+    assert a.execute("SELECT COUNT(DISTINCT value) FROM sync_state WHERE key = 'site'").fetchone()[0] == 1
+    assert sync_databases(a, "missing_test.db") is None
+
+
+def test_upgrades_the_change_log():
+    conn = sqlite3.connect(":memory:")
+    conn.execute("CREATE TABLE tasks(id integer PRIMARY KEY, name text NOT NULL, completed integer DEFAULT FALSE)")
+    conn.execute("CREATE TABLE time(id integer PRIMARY KEY, task_id integer, start_date text, end_date text)")
+    conn.execute("CREATE TABLE comments(id integer PRIMARY KEY, task_id integer, body text)")
+    for migration in MIGRATIONS[:MIGRATIONS.index(_sync_defaults)]:
+        migration(conn)
+    conn.execute(f"PRAGMA user_version = {MIGRATIONS.index(_sync_defaults)}")
+    conn.execute("INSERT INTO tasks(name) VALUES('Before')")
+    conn.commit()
+    migrate(conn)
+    conn.execute("INSERT INTO tasks(name) VALUES('After')")
+    conn.commit()
+    site = conn.execute("SELECT value FROM sync_state WHERE key = 'site'").fetchone()[0]
+    assert conn.execute("SELECT COUNT(*) FROM tasks WHERE gid IS NULL").fetchone()[0] == 0
+    assert conn.execute("SELECT COUNT(*) FROM changes WHERE tbl = 'tasks' AND origin = ?", (site,)).fetchone()[0] == 2
+    assert conn.execute("PRAGMA integrity_check").fetchone()[0] == "ok"
+
+
+def teardown_module():
+    for name in NAMES:
+        os.remove(Path(taskminal.main.__file__).with_name(name))
@@ -0,0 +1,60 @@
+import os
+from pathlib import Path
+
+import taskminal.main
+from taskminal.main import init_new_database, connect_to_db, add_task, get_time, rebuild_totals, remove_task_by_index
+
+
+def setup_module():
+    init_new_database("totals_test.db", True)
+    conn = connect_to_db("totals_test.db")
+    add_task(conn, "First")
+    add_task(conn, "Second")
+    conn.close()
+
+
+def totals(conn, id):
+    return conn.execute("SELECT total_seconds, sessions FROM tasks WHERE id = ?", (id,)).fetchone()
+
+
+def test_can_keep_totals_on_insert():
+    conn = connect_to_db("totals_test.db")
+    conn.executemany("INSERT INTO time(task_id, start_date, end_date) VALUES(?,?,?)", [(1, 1000, 1600), (1, 2000, 2060), (1, 3000, None)])
+    conn.commit()
+    assert totals(conn, 1) == (660, 3)
+    assert get_time(conn, 1) == "0:11:00"
+    assert get_time(conn, 2) == "Not started"
+
+
+def test_can_keep_totals_on_update():
+    conn = connect_to_db("totals_test.db")
+    conn.execute("UPDATE time SET end_date = 3100 WHERE end_date IS NULL")
+    conn.execute("UPDATE time SET task_id = 2 WHERE start_date = 1000")
+    conn.commit()
+    assert totals(conn, 1) == (160, 2)
+    assert totals(conn, 2) == (600, 1)
+
+
+def test_can_keep_totals_on_delete():
+    conn = connect_to_db("totals_test.db")
+    conn.execute("DELETE FROM time WHERE start_date = 2000")
+    conn.commit()
+    assert totals(conn, 1) == (100, 1)
+    remove_task_by_index(conn, 2)
+    assert totals(conn, 1) == (100, 1)
+
+
+def test_can_rebuild_totals():
+    conn = connect_to_db("totals_test.db")
+    conn.execute("UPDATE tasks SET total_seconds = 0, sessions = 0")
+    rebuild_totals(conn)
+    assert totals(conn, 1) == (100, 1)
+    # A session without a start date still counts towards the last activity.
+    conn.execute("INSERT INTO time(task_id, start_date, end_date) VALUES(1, NULL, 5000)")
+    conn.execute("UPDATE tasks SET last_active = 0")
+    rebuild_totals(conn)
+    assert conn.execute("SELECT last_active FROM tasks WHERE id = 1").fetchone()[0] == 5000
+
+
+def teardown_module():
+    os.remove(Path(taskminal.main.__file__).with_name("totals_test.db"))
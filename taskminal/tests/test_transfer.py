@@ -0,0 +1,58 @@
+import os
+from io import StringIO
+from pathlib import Path
+
+import taskminal.main
+from taskminal.main import init_new_database, connect_to_db, add_task, add_comment, start_task, stop_task, build_parser, run_command
+from taskminal.transfer import TABLES, export_table, import_table
+
+
+def setup_module():
+    init_new_database("transfer_source.db", True)
+    init_new_database("transfer_target.db", True)
+    conn = connect_to_db("transfer_source.db")
+    first = add_task(conn, "First")
+    add_task(conn, "Second, with a comma")
+    add_comment(conn, first, "Multi\nline")
+    start_task(conn, first)
+    stop_task(conn, first)
+    conn.close()
+
+
+def transfer(fmt: str, batch_size: int):
+    source = connect_to_db("transfer_source.db")
+    init_new_database("transfer_target.db", True)
+    target = connect_to_db("transfer_target.db")
+    for table in ("tasks", "time", "comments"):
+        out = StringIO()
+        export_table(source, table, out, fmt)
+        out.seek(0)
+        assert import_table(target, table, out, fmt, batch_size) is not None
+        sql = f"SELECT {', '.join(TABLES[table])} FROM {table} ORDER BY id"
+        assert target.execute(sql).fetchall() == source.execute(sql).fetchall()
+    sql = "SELECT total_seconds, sessions FROM tasks ORDER BY id"
+    assert target.execute(sql).fetchall() == source.execute(sql).fetchall()
+
+
+def test_can_transfer_csv():
+    transfer("csv", 1)
+
+
+def test_can_transfer_jsonl():
+    transfer("jsonl", 10000)
+
+
+def test_can_reject_unknown_columns():
+    conn = connect_to_db("transfer_target.db")
+    assert import_table(conn, "tasks", StringIO("id,title\n1,Test\n"), "csv") is None
+
+
+def test_can_report_a_missing_input_file():
+    conn = connect_to_db("transfer_target.db")
+    args = build_parser().parse_args(["import", "tasks", "/missing/tasks.csv"])
+    assert run_command(conn, args) is False
+
+
+def teardown_module():
+    os.remove(Path(taskminal.main.__file__).with_name("transfer_source.db"))
+    os.remove(Path(taskminal.main.__file__).with_name("transfer_target.db"))
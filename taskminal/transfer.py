@@ -0,0 +1,124 @@
+import csv
+import json
+from itertools import islice
+from sqlite3 import Connection, Error
+from typing import Dict, Iterator, Optional, TextIO, Tuple
+
+# Columns exported and accepted on import for each table, in export order.
+TABLES: Dict[str, Tuple[str, ...]] = {
+    "tasks": ("id", "name", "completed"),
+    "time": ("id", "task_id", "start_date", "end_date"),
+    "comments": ("id", "task_id", "body"),
+}
+
+# Columns whose empty CSV values are kept as empty strings instead of being read as NULL.
+TEXT_COLUMNS = {"name", "body"}
+
+FORMATS = ("csv", "jsonl")
+
+
+def guess_format(path: str, default: str = "csv") -> str:
+    """
+    Returns the transfer format matching the extension of a path.
+
+    :param path str: Path of the file, or "-" for stdin/stdout.
+    :param default str: Format returned if the extension isn't recognized.
+    :rtype str: Either "csv" or "jsonl".
+    """
+    for fmt in FORMATS:
+        if path.endswith("." + fmt):
+            return fmt
+    return default
+
+
+def export_table(conn: Connection, table: str, out: TextIO, fmt: str = "csv") -> int:
+    """
+    Writes every row of a table to out, reading them from the cursor one at a time.
+
+    :param conn Connection: Current sqlite3 connection.
+    :param table str: One of the tables in TABLES.
+    :param out TextIO: Open file handle the rows are written to.
+    :param fmt str: Either "csv" (with a header row) or "jsonl" (one object per line).
+    :rtype int: Number of rows written.
+    """
+    columns = TABLES[table]
+    cursor = conn.execute(f"SELECT {', '.join(columns)} FROM {table} ORDER BY id")
+    count = 0
+    if fmt == "csv":
+        writer = csv.writer(out)
+        writer.writerow(columns)
+        for row in cursor:
+            writer.writerow(row)
+            count += 1
+    else:
+        for row in cursor:
+            out.write(json.dumps(dict(zip(columns, row)), ensure_ascii=False) + "\n")
+            count += 1
+    out.flush()
+    return count
+
+
+def _read_rows(table: str, source: TextIO, fmt: str) -> Tuple[Tuple[str, ...], Iterator[Tuple]]:
+    """
+    Reads the column names of an import file, and returns them along with an iterator over its rows.
+
+    :param table str: Table the rows will be imported into.
+    :param source TextIO: Open file handle to read from.
+    :param fmt str: Either "csv" or "jsonl".
+    :rtype Tuple[Tuple[str, ...], Iterator[Tuple]]: Column names, and an iterator of row tuples in that column order.
+    """
+    if fmt == "csv":
+        reader = csv.reader(source)
+        columns = tuple(next(reader, ()))
+        nullable = [column not in TEXT_COLUMNS for column in columns]
+        rows = (tuple(None if value == "" and nullable[i] else value for i, value in enumerate(row)) for row in reader if row)
+        return columns, rows
+    lines = (line for line in source if line.strip())
+    first = next(lines, None)
+    if first is None:
+        return (), iter(())
+    record = json.loads(first)
+    columns = tuple(record)
+
+    def rows() -> Iterator[Tuple]:
+        yield tuple(record[c] for c in columns)
+        for line in lines:
+            data = json.loads(line)
+            yield tuple(data.get(c) for c in columns)
+    return columns, rows()
+
+
+def import_table(conn: Connection, table: str, source: TextIO, fmt: str = "csv", batch_size: int = 10000) -> Optional[int]:
+    """
+    Inserts every row read from source into a table, with one executemany and one commit per batch.
+    If a batch fails it is rolled back, but earlier batches stay committed.
+
+    :param conn Connection: Current sqlite3 connection.
+    :param table str: One of the tables in TABLES. Import tasks before their sessions and comments.
+    :param source TextIO: Open file handle to read from, in the format written by export_table.
+    :param fmt str: Either "csv" or "jsonl".
+    :param batch_size int: Number of rows inserted per transaction.
+    :rtype Optional[int]: Number of rows imported, or None if the import failed.
+    """
+    columns, rows = _read_rows(table, source, fmt)
+    unknown = [c for c in columns if c not in TABLES[table]]
+    if len(columns) == 0 or unknown:
+        print(f"Can't import into {table}: unexpected columns {', '.join(unknown) or '(none)'}")
+        return None
+    sql = f"INSERT INTO {table}({', '.join(columns)}) VALUES({', '.join('?' * len(columns))})"
+    count = 0
+    try:
+        while True:
+            batch = list(islice(rows, batch_size))
+            if not batch:
+                break
+            conn.executemany(sql, batch)
+            conn.commit()
+            count += len(batch)
+    except (Error, ValueError) as e:
+        conn.rollback()
+        print(e)
+        print(f"Imported {count} rows into {table} before the error.")
+        return None
+    print(f"Imported {count} rows into {table}.")
+    return count